@@ -0,0 +1,199 @@
+"""
+听觉管线基准测试
+在没有麦克风的机器上回放WAV文件或目录，经过与麦克风相同的 采集→语音切分→识别 路径发送到大脑，
+统计从语音结束到文本到达大脑（以及加上模拟的大脑回复耗时后到达嘴巴）的延迟
+
+测试集:
+    --wav 指向WAV文件或目录（目录中每个文件一段话）；未指定时生成带音节起伏的合成语音。
+    默认使用桩识别后端（--asr-delay 模拟识别耗时），也可用 --asr google/vosk 测试真实后端。
+
+用法:
+    python benchmarks/bench_ear_pipeline.py --utterances 20 --speed 4
+    python benchmarks/bench_ear_pipeline.py --wav data/samples/speech --asr-delay 0.3 --workers 1
+    python benchmarks/bench_ear_pipeline.py --fast --utterances 200
+    python benchmarks/bench_ear_pipeline.py --remote --speed 4
+
+--remote 模拟浏览器麦克风：每段话作为一个远程客户端推送，说完立即停止录音（结尾没有静音），
+检查停止录音前的最后一句话也能被切出并识别。
+"""
+import os
+import sys
+import time
+import wave
+import asyncio
+import argparse
+import logging
+import tempfile
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from config import SPEECH_RECOGNITION
+from src.agents.ear_agent import EarAgent
+from src.utils.asr_backends import StubASRBackend, create_asr_backend
+from src.utils.audio_source import StreamAudioSource, WAV_EXTENSIONS, create_audio_source, load_wav
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+)
+# 智能体模块导入时已配置INFO级别日志，这里重新设置
+logging.getLogger().setLevel(logging.WARNING)
+logger = logging.getLogger("Bench-Ear")
+
+
+class BenchmarkEarAgent(EarAgent):
+    """记录发往大脑的文本而不建立网络连接的听觉智能体，并模拟大脑回复到达嘴巴的时间"""
+    def __init__(self, *args, brain_delay: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.brain_delay = brain_delay
+        self.brain_latencies = []
+        self.mouth_latencies = []
+        self.partials = 0
+        self._speech_end_time = None
+
+    def _record_latency(self, utterance):
+        super()._record_latency(utterance)
+        self._speech_end_time = utterance.speech_end_time
+
+    async def _send_text(self, text):
+        latency = time.monotonic() - self._speech_end_time
+        self.brain_latencies.append(latency)
+        self.mouth_latencies.append(latency + self.brain_delay)
+
+    async def send_message(self, receiver_id, message):
+        if message.get("content", {}).get("partial"):
+            self.partials += 1
+        return True
+
+
+def write_synthetic_wavs(directory: str, count: int, sample_rate: int, rng: np.random.Generator) -> None:
+    """生成合成语音：基频加谐波，按约4Hz的音节节奏调幅，叠加少量背景噪声"""
+    for index in range(count):
+        duration = rng.uniform(0.6, 2.5)
+        t = np.arange(int(duration * sample_rate)) / sample_rate
+        pitch = rng.uniform(110, 240)
+        voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 5))
+        syllables = 0.55 + 0.45 * np.sin(2 * np.pi * rng.uniform(3, 5) * t)
+        signal = 4000 * voiced * syllables + rng.normal(0, 40, t.size)
+        with wave.open(os.path.join(directory, f"utterance_{index:04d}.wav"), "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(np.clip(signal, -32768, 32767).astype(np.int16).tobytes())
+
+
+async def push_remote_utterances(agent: EarAgent, path: str, realtime: bool, speed: float) -> list:
+    """把每段话作为一个远程客户端推送：先推送0.5秒静音用于噪声校准，说完立即关闭输入
+
+    Returns:
+        各远程输入的切分线程和推送的音频时长(秒)
+    """
+    sample_rate = SPEECH_RECOGNITION['sample_rate']
+    files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(WAV_EXTENSIONS)) \
+        if os.path.isdir(path) else [path]
+    chunk_bytes = sample_rate // 10 * 2
+    threads = []
+    pushed = 0
+    for index, file in enumerate(files):
+        client_id = f"bench-{index}"
+        audio = bytes(sample_rate) + load_wav(file, sample_rate)
+        pushed += len(audio)
+        for offset in range(0, len(audio), chunk_bytes):
+            agent.push_remote_audio(client_id, audio[offset:offset + chunk_bytes])
+            await asyncio.sleep(0.1 / speed if realtime else 0)
+        threads.append(agent.remote_inputs[client_id][2])
+        agent.close_remote_input(client_id)
+    return threads, pushed / (sample_rate * 2)
+
+
+def percentile_ms(values, q) -> float:
+    return float(np.percentile(values, q) * 1000) if values else 0.0
+
+
+async def run_benchmark(args) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.wav
+        if path is None:
+            write_synthetic_wavs(directory, args.utterances, SPEECH_RECOGNITION['sample_rate'],
+                                 np.random.default_rng(args.seed))
+            path = directory
+        expected = len([name for name in os.listdir(path) if name.lower().endswith(".wav")]) \
+            if os.path.isdir(path) else None
+
+        if args.remote:
+            # 本地音频源立即结束，所有语音都来自远程输入
+            source = StreamAudioSource("local", SPEECH_RECOGNITION['sample_rate'])
+            source.close()
+        else:
+            source = create_audio_source(path, sample_rate=SPEECH_RECOGNITION['sample_rate'],
+                                         chunk_size=SPEECH_RECOGNITION['chunk_size'],
+                                         realtime=not args.fast, speed=args.speed)
+        if args.asr == "stub":
+            backend = StubASRBackend(args.asr_delay, streaming=args.streaming)
+        else:
+            backend = create_asr_backend(args.asr, language=SPEECH_RECOGNITION['language'],
+                                         vosk_model_path=SPEECH_RECOGNITION['vosk_model_path'])
+        if args.workers:
+            SPEECH_RECOGNITION['recognition_workers'] = args.workers
+        agent = BenchmarkEarAgent("ear", "localhost", 0, asr_backend=backend, audio_source=source,
+                                  brain_delay=args.brain_delay)
+
+        start = time.perf_counter()
+        await agent.start()
+        threads = [agent._segment_thread]
+        remote_seconds = 0.0
+        if args.remote:
+            remote_threads, remote_seconds = await push_remote_utterances(agent, path, not args.fast, args.speed)
+            threads += remote_threads
+        deadline = start + args.timeout
+        # 等待回放结束、切分线程读完缓冲区、所有语音段识别并发送完毕
+        while time.perf_counter() < deadline and (
+                any(thread.is_alive() for thread in threads) or not agent.pipeline.idle):
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - start
+        stats = agent.get_stats()
+        await agent.stop()
+
+        audio_seconds = stats["captured_seconds"] + remote_seconds
+        print(f"音频源: {path if args.wav else '合成语音'}{'（远程输入）' if args.remote else ''} (实时: {not args.fast}, 倍速: {args.speed}, "
+              f"识别后端: {backend.name}, 并发识别: {SPEECH_RECOGNITION['recognition_workers']})")
+        print(f"音频时长: {audio_seconds:.1f}s, 耗时: {elapsed:.2f}s, 回放速度: {audio_seconds / elapsed:.1f}x 实时")
+        # 远程输入各自切分，语音段数以发送到大脑的数量为准
+        utterances = len(agent.brain_latencies) if args.remote else stats['utterances']
+        print(f"切分出的语音段: {utterances}" + (f" / 文件数 {expected}" if expected is not None else "")
+              + f", 截断: {stats['truncated_utterances']}, 发送到大脑: {len(agent.brain_latencies)}, "
+              f"中间结果: {agent.partials}")
+        if args.remote and expected is not None and len(agent.brain_latencies) < expected:
+            print(f"警告: 停止录音时有{expected - len(agent.brain_latencies)}段话未被识别")
+        print(f"识别延迟: {stats['asr_latency_ms']:.0f}ms, 最大并发识别: {stats['max_recognizing']}")
+        # 尽可能快地回放时音频的采集时间没有意义，只统计吞吐
+        if not args.fast:
+            print(f"端点检测延迟: {stats['endpoint_ms']:.0f}ms")
+            print(f"语音结束→大脑: 平均 {np.mean(agent.brain_latencies) * 1000:.0f}ms, "
+                  f"P50 {percentile_ms(agent.brain_latencies, 50):.0f}ms, "
+                  f"P95 {percentile_ms(agent.brain_latencies, 95):.0f}ms")
+            print(f"语音结束→嘴巴（模拟大脑回复 {args.brain_delay * 1000:.0f}ms）: "
+                  f"P50 {percentile_ms(agent.mouth_latencies, 50):.0f}ms, "
+                  f"P95 {percentile_ms(agent.mouth_latencies, 95):.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="听觉管线基准测试")
+    parser.add_argument("--wav", default=None, help="WAV文件或目录（每个文件一段话），默认生成合成语音")
+    parser.add_argument("--utterances", type=int, default=20, help="合成语音段数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--speed", type=float, default=1.0, help="实时回放的倍速")
+    parser.add_argument("--fast", action="store_true", help="尽可能快地回放（只统计吞吐，不统计延迟）")
+    parser.add_argument("--asr", choices=["stub", "google", "vosk"], default="stub", help="识别后端")
+    parser.add_argument("--asr-delay", type=float, default=0.2, help="桩后端模拟的识别耗时（秒）")
+    parser.add_argument("--streaming", action="store_true", help="桩后端模拟流式识别")
+    parser.add_argument("--workers", type=int, default=0, help="并发识别数，0表示使用配置")
+    parser.add_argument("--brain-delay", type=float, default=0.0, help="模拟的大脑回复耗时（秒）")
+    parser.add_argument("--remote", action="store_true", help="模拟浏览器麦克风，每段话说完立即停止录音")
+    parser.add_argument("--timeout", type=float, default=600.0, help="最长运行时间（秒）")
+    asyncio.run(run_benchmark(parser.parse_args()))
@@ -0,0 +1,121 @@
+"""
+特征压缩基准测试
+对比全精度余弦匹配与PCA投影+float16/int8量化匹配（可选全精度精排）的准确率、内存和查询延迟
+
+测试集:
+    --faces-dir 指向本地人脸图片目录，每个子目录是一个人（子目录名为人物标签），
+    每人第一张检测到人脸的图片作为库中特征，其余图片作为查询；
+    未指定时使用低秩结构的模拟特征（真实HOG特征高度相关，随机特征无法体现PCA的效果）。
+
+用法:
+    python benchmarks/bench_embedding_compression.py --size 20000 --components 128,256
+    python benchmarks/bench_embedding_compression.py --faces-dir data/faces
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from src.utils.embedding_compression import CompressedIndex
+from src.utils.face_gallery import FaceGallery
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+)
+
+
+def synthetic_set(size: int, dim: int, queries: int, noise: float, rng: np.random.Generator):
+    """模拟特征：非负的低秩结构加噪声，查询为库中特征加噪声"""
+    basis = np.abs(rng.standard_normal((64, dim))).astype(np.float32)
+    latent = rng.standard_normal((size, 64)).astype(np.float32)
+    gallery = np.abs(latent @ basis + 2.0 * rng.standard_normal((size, dim)).astype(np.float32))
+    labels = rng.integers(0, size, queries)
+    probes = gallery[labels] + noise * np.abs(rng.standard_normal((queries, dim))).astype(np.float32)
+    return gallery, probes, labels
+
+
+def faces_dir_set(path: str):
+    """从本地人脸图片目录提取HOG特征"""
+    from src.utils.face_recognition import FaceRecognition
+    recognition = FaceRecognition()
+    gallery, probes, labels = [], [], []
+    for person in sorted(os.listdir(path)):
+        person_dir = os.path.join(path, person)
+        if not os.path.isdir(person_dir):
+            continue
+        label = None
+        for image_name in sorted(os.listdir(person_dir)):
+            image = cv2.imread(os.path.join(person_dir, image_name))
+            if image is None:
+                continue
+            faces, encodings, _ = recognition.process_frame(image)
+            if len(faces) == 0:
+                continue
+            # 每张图片只取最大的人脸
+            encoding = encodings[int(np.argmax([w * h for _, _, w, h in faces]))]
+            if label is None:
+                label = len(gallery)
+                gallery.append(encoding)
+            else:
+                probes.append(encoding)
+                labels.append(label)
+    if not probes:
+        raise SystemExit("测试集中没有可用的查询图片（每人至少需要两张检测到人脸的图片）")
+    return np.stack(gallery), np.stack(probes), np.array(labels)
+
+
+def timed_search(func, queries: np.ndarray):
+    start = time.perf_counter()
+    rows = np.concatenate([func(q[None, :])[0] for q in queries])
+    return rows, (time.perf_counter() - start) / len(queries) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="特征压缩基准测试")
+    parser.add_argument("--faces-dir", default=None, help="本地人脸图片目录（每人一个子目录）")
+    parser.add_argument("--size", type=int, default=20000, help="模拟人物库规模")
+    parser.add_argument("--dim", type=int, default=1024, help="模拟特征维度（HOG为8100）")
+    parser.add_argument("--queries", type=int, default=200, help="模拟查询数量")
+    parser.add_argument("--noise", type=float, default=8.0, help="模拟查询的噪声强度")
+    parser.add_argument("--components", default="128,256", help="PCA主成分数量，逗号分隔")
+    parser.add_argument("--rerank", default="0,10", help="精排候选数，逗号分隔，0表示不精排")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.faces_dir:
+        encodings, probes, labels = faces_dir_set(args.faces_dir)
+    else:
+        encodings, probes, labels = synthetic_set(args.size, args.dim, args.queries, args.noise, rng)
+
+    gallery = FaceGallery(initial_capacity=encodings.shape[0])
+    for person_id, encoding in enumerate(encodings):
+        gallery.add(person_id, encoding)
+    queries = FaceGallery.normalize_queries(probes)
+    print(f"人物库: {len(gallery)}个特征, 维度 {gallery.dim}, 查询 {len(queries)}个")
+
+    exact_rows, exact_ms = timed_search(gallery.search, queries)
+    exact_bytes = gallery.matrix.nbytes
+    print(f"{'方式':>16} {'与精确一致':>10} {'识别准确率':>10} {'内存(MB)':>10} {'压缩比':>8} {'查询(ms)':>10}")
+    print(f"{'float32 精确':>16} {1.0:>10.3f} {(exact_rows == labels).mean():>10.3f} "
+          f"{exact_bytes / 1024 / 1024:>10.1f} {1.0:>7.0f}x {exact_ms:>10.3f}")
+
+    for dtype in ("float16", "int8"):
+        for components in (int(v) for v in args.components.split(",")):
+            index = CompressedIndex(components=components, dtype=dtype)
+            index.train(gallery.matrix)
+            for rerank_k in (int(v) for v in args.rerank.split(",")):
+                index.rerank_k = rerank_k
+                matrix = gallery.matrix if rerank_k > 0 else None
+                rows, ms = timed_search(lambda q: index.search(q, matrix), queries)
+                name = f"{dtype}/{components}" + (f"+精排{rerank_k}" if rerank_k else "")
+                print(f"{name:>16} {(rows == exact_rows).mean():>10.3f} {(rows == labels).mean():>10.3f} "
+                      f"{index.nbytes / 1024 / 1024:>10.1f} {exact_bytes / index.nbytes:>7.0f}x {ms:>10.3f}")
@@ -0,0 +1,107 @@
+"""
+视觉管线基准测试
+在没有摄像头的机器上，使用视频文件、图片目录或合成流驱动 眼睛→大脑 完整路径并统计吞吐量
+
+用法:
+    python benchmarks/bench_eye_pipeline.py --source synthetic --frames 200
+    python benchmarks/bench_eye_pipeline.py --source data/samples/faces --loop --frames 500
+    python benchmarks/bench_eye_pipeline.py --cameras 4 --cpu-budget 2.0
+    python benchmarks/bench_eye_pipeline.py --cameras 4 --worker-mode process --workers 4
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+import tempfile
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from src.agents.eye_agent import EyeAgent
+from src.utils.frame_rate import AdaptiveFrameRateController
+from src.utils.frame_source import create_frame_source, SyntheticFrameSource
+from src.utils.person_database import PersonDatabase
+from src.utils.vision_workers import FaceWorkerPool
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+)
+logger = logging.getLogger("Bench-Eye")
+
+
+class BenchmarkEyeAgent(EyeAgent):
+    """记录发往大脑的消息而不建立网络连接的视觉智能体"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent_messages = []
+
+    async def send_message(self, receiver_id, message):
+        self.sent_messages.append((time.perf_counter(), receiver_id, message))
+        return True
+
+
+def create_source(args, index: int):
+    if args.source == "synthetic":
+        return SyntheticFrameSource(args.width, args.height, frame_count=args.frames,
+                                    fps=args.fps or 30.0, realtime=args.realtime, seed=index)
+    return create_frame_source(args.source, realtime=args.realtime, loop=args.loop, fps=args.fps)
+
+
+async def run_benchmark(args) -> None:
+    sources = {f"cam{i}": create_source(args, i) for i in range(args.cameras)}
+
+    with tempfile.TemporaryDirectory() as database_path:
+        agent = BenchmarkEyeAgent("eye", "localhost", 0, frame_sources=sources,
+                                  person_database=PersonDatabase(database_path))
+        # 基准测试不限制单路帧率，由帧源节奏和全局CPU预算决定
+        for pipeline in agent.pipelines.values():
+            pipeline.frame_rate = AdaptiveFrameRateController(target_fps=1000.0, active_fps=1000.0, idle_fps=1000.0)
+        agent.cpu_budget.budget = args.cpu_budget
+        agent.worker_pool.shutdown()
+        agent.worker_pool = FaceWorkerPool(args.worker_mode, args.workers)
+        agent.stats_interval = float("inf")
+
+        agent.is_capturing = True
+        start = time.perf_counter()
+        tasks = [
+            asyncio.create_task(agent._capture_loop(pipeline))
+            for pipeline in agent.pipelines.values() if pipeline.start()
+        ]
+        if not tasks:
+            logger.error("无法打开帧源")
+            return
+        await asyncio.wait(tasks, timeout=args.timeout)
+        elapsed = time.perf_counter() - start
+        await agent.stop()
+
+        frames = 0
+        for pipeline in agent.pipelines.values():
+            stats = pipeline.get_stats()
+            frames += stats["frames"]
+            print(f"摄像头 {pipeline.camera_id}: {stats}")
+        print(f"帧源: {args.source} x {args.cameras} (实时: {args.realtime}, CPU预算: {args.cpu_budget}, "
+              f"工作池: {args.worker_mode} x {agent.worker_pool.workers})")
+        print(f"处理帧数: {frames}, 耗时: {elapsed:.2f}s, 总吞吐量: {frames / elapsed:.1f} FPS")
+        print(f"发送到大脑的消息数: {len(agent.sent_messages)}")
+        print(f"数据库人物数: {len(agent.person_database.get_all_persons())}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="视觉管线基准测试")
+    parser.add_argument("--source", default="synthetic", help="视频文件、图片目录或synthetic")
+    parser.add_argument("--frames", type=int, default=200, help="每路合成源的帧数")
+    parser.add_argument("--cameras", type=int, default=1, help="并行摄像头数")
+    parser.add_argument("--cpu-budget", type=float, default=1.0, help="全局CPU预算（秒/秒）")
+    parser.add_argument("--timeout", type=float, default=120.0, help="最长运行时间（秒）")
+    parser.add_argument("--worker-mode", choices=["thread", "process"], default="thread", help="人脸检测工作池模式")
+    parser.add_argument("--workers", type=int, default=0, help="工作线程/进程数，0表示CPU核心数")
+    parser.add_argument("--fps", type=float, default=None, help="覆盖源帧率")
+    parser.add_argument("--realtime", action="store_true", help="按源帧率实时输出，默认尽可能快")
+    parser.add_argument("--loop", action="store_true", help="源结束后循环")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    asyncio.run(run_benchmark(parser.parse_args()))
@@ -0,0 +1,112 @@
+"""
+人物库启动基准测试
+对比旧版逐人解析JSON文件与内存映射特征库的启动耗时和启动时分配的内存
+
+内存用tracemalloc统计Python和NumPy的堆分配峰值；内存映射的页面只在访问时读入，
+由操作系统页缓存管理，不计入其中。
+
+用法:
+    python benchmarks/bench_person_startup.py --sizes 1000,5000,20000 --dim 1024
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from src.utils.person_database import PersonDatabase
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+)
+
+# 模拟的人脸缩略图（约6KB的base64字符串）
+THUMBNAIL = "A" * 6000
+
+
+def build_legacy(path: str, encodings: np.ndarray) -> None:
+    """生成旧版 index.json + person_{id}.json 目录结构"""
+    now = time.time()
+    for person_id, encoding in enumerate(encodings, start=1):
+        with open(os.path.join(path, f"person_{person_id}.json"), "w", encoding="utf-8") as f:
+            json.dump({"id": person_id, "name": f"person{person_id}", "face_encoding": encoding.tolist(),
+                       "face_image": THUMBNAIL, "first_seen": now, "last_seen": now, "seen_count": 1}, f)
+    with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as f:
+        json.dump({"next_id": len(encodings) + 1,
+                   "persons": [f"person_{i}.json" for i in range(1, len(encodings) + 1)]}, f)
+
+
+def load_legacy(path: str) -> dict:
+    """旧版加载方式：逐人解析JSON并把特征转换为数组，缩略图全部常驻内存"""
+    persons = {}
+    with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as f:
+        index_data = json.load(f)
+    for person_file in index_data["persons"]:
+        with open(os.path.join(path, person_file), "r", encoding="utf-8") as f:
+            person_data = json.load(f)
+            person_data["face_encoding"] = np.array(person_data["face_encoding"])
+            persons[person_data["id"]] = person_data
+    return persons
+
+
+def build_mapped(path: str, encodings: np.ndarray) -> None:
+    """通过PersonDatabase生成SQLite元数据和内存映射特征库"""
+    database = PersonDatabase(path)
+    now = time.time()
+    records, templates = [], []
+    for person_id, encoding in enumerate(encodings, start=1):
+        database.persons[person_id] = {
+            "id": person_id, "name": f"person{person_id}", "first_seen": now, "last_seen": now, "seen_count": 1
+        }
+        row = database._add_template(person_id, encoding)
+        records.append(dict(database.persons[person_id], face_image=THUMBNAIL, encoding_row=row))
+        templates.append((row, person_id, 1))
+    database.next_id = len(encodings) + 1
+    database.store.save_persons(records, next_id=database.next_id, templates=templates)
+    database.close()
+
+
+def measure(func):
+    """返回函数结果、耗时(秒)和分配内存峰值(MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="人物库启动基准测试")
+    parser.add_argument("--sizes", default="1000,5000,20000", help="人物库规模，逗号分隔")
+    parser.add_argument("--dim", type=int, default=1024, help="特征维度（HOG为8100）")
+    parser.add_argument("--legacy-max", type=int, default=5000, help="超过该规模时跳过旧版JSON加载")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'人物数':>8} {'JSON启动(s)':>12} {'JSON内存(MB)':>13} {'映射启动(s)':>12} {'映射内存(MB)':>13}")
+    for size in (int(v) for v in args.sizes.split(",")):
+        encodings = np.abs(rng.standard_normal((size, args.dim))).astype(np.float32)
+        legacy_s = legacy_mb = None
+        if size <= args.legacy_max:
+            with tempfile.TemporaryDirectory() as path:
+                build_legacy(path, encodings)
+                _, legacy_s, legacy_mb = measure(lambda: load_legacy(path))
+        with tempfile.TemporaryDirectory() as path:
+            build_mapped(path, encodings)
+            database, mapped_s, mapped_mb = measure(lambda: PersonDatabase(path))
+            assert len(database.gallery) == size
+            database.close()
+        legacy = f"{legacy_s:>12.3f} {legacy_mb:>13.1f}" if legacy_s is not None else f"{'-':>12} {'-':>13}"
+        print(f"{size:>8} {legacy} {mapped_s:>12.3f} {mapped_mb:>13.1f}")
@@ -66,11 +66,93 @@ AGENTS = {
 
 # 添加语音识别配置
 SPEECH_RECOGNITION = {
-    "timeout": 3,           # 缩短超时时间
-    "phrase_time_limit": 5, # 缩短单次识别时间
+    "phrase_time_limit": 15,# 单句时长上限（秒），超过时截断送去识别
     "language": "zh-CN",    # 中文识别
+    "asr_backend": "google",# 识别后端："google"（在线）、"vosk"（离线，需安装vosk并下载模型）或"stub"（测试用）
+    "vosk_model_path": "data/models/vosk-model-small-cn-0.22",  # Vosk模型目录
+    "partial_interval_ms": 300,   # 流式识别中间结果的最短发送间隔（毫秒）
+    "stub_delay": 0.0,      # 桩后端模拟的识别耗时（秒）
     "retry_count": 3,       # 重试次数
-    "retry_delay": 1        # 重试延迟（秒）
+    "retry_delay": 1,       # 重试延迟（秒）
+    "recognition_workers": 2,     # 并发识别的语音段数，结果按说话顺序输出
+    "echo_gate": True,      # 嘴巴说话期间开始的语音段直接丢弃；关闭后允许插话，只按文本相似度过滤回声
+    "echo_tail": 0.5,       # 嘴巴停止说话后继续屏蔽的时长（秒），覆盖扬声器余音和混响
+    "echo_similarity": 0.8, # 识别文本与最近说过的某段话或其中某一句的相似度达到该值时视为回声
+    "echo_min_chars": 4,    # 识别文本至少有该字数才做回声比较，避免简短回答被当成回声
+    "echo_recent_seconds": 30.0,  # 参与回声文本比较的最近说过的话的时间范围（秒）
+    "sample_rate": 16000,   # 采集采样率
+    "chunk_size": 1024,     # 每次从麦克风读取的采样数
+    "buffer_seconds": 30.0,  # 环形缓冲区可保存的音频时长（秒），识别落后超过该时长时丢弃最旧的音频
+    "remote_buffer_seconds": 5.0,  # 每个远程客户端（浏览器麦克风）最多排队的音频（秒），超出时丢弃最旧的音频
+    "audio_source": None,   # 音频源：None（默认麦克风）、麦克风设备索引、WAV文件或WAV目录（每个文件一段话）
+    "audio_realtime": True, # WAV回放是否按时间节奏输出；False时尽可能快地输出（用于基准测试）
+    "audio_speed": 1.0,     # 实时回放的倍速
+    "audio_loop": False,    # WAV回放结束后是否循环
+    "energy_ratio": 1.5,    # 语音能量阈值与背景噪声的比例
+    "noise_adapt_rate": 0.05,     # 背景噪声基底的滑动平均系数，越大适应越快
+    "min_energy_threshold": 100.0,# 能量阈值下限
+    "vad": "energy",        # 语音检测方式："energy"（能量加过零率）或"webrtc"（需安装webrtcvad）
+    "vad_frame_ms": 30,     # 语音检测帧长（毫秒），webrtc仅支持10/20/30
+    "vad_max_zcr": 0.35,    # 能量检测中语音帧的最大过零率，用于排除宽带噪声
+    "vad_aggressiveness": 2,# webrtcvad的激进程度（0-3）
+    "speech_start_ms": 90,  # 连续检测到多长时间的语音才判定开始说话（毫秒）
+    "hangover_ms": 400,     # 说话后静音多长时间判定一句话结束（毫秒）
+    "pre_roll_ms": 300,     # 保留语音开始前的音频时长（毫秒），避免切掉第一个字
+    "stats_interval": 60.0  # 听觉统计上报间隔（秒）
+}
+# 语音合成配置
+SPEECH_SYNTHESIS = {
+    "rate": 250,            # 语速
+    "volume": 0.9,          # 音量（0-1）
+    "voice": None,          # 语音ID，None表示自动选择中文语音
+    "cache_enabled": True,  # 是否缓存合成的语音
+    "cache_dir": "data/tts_cache",  # 语音缓存目录，None表示只缓存在内存中
+    "cache_memory_mb": 16,  # 内存中缓存的语音上限（MB）
+    "cache_disk_mb": 200,   # 磁盘上缓存的语音上限（MB）
+    "cache_max_chars": 100, # 只缓存不超过该字数的句子（问候语和简短回复）
+    "sentence_min_chars": 4,  # 短于该字数的句子与下一句合并合成
+    "playback_queue_size": 2, # 合成好等待播放的最大句数，第N句播放时合成第N+1句
+    "stats_interval": 60.0  # 语音输出和缓存统计上报间隔（秒）
+}
+# 视觉配置
+VISION = {
+    "sources": [                # 帧源列表，每个帧源一条独立管线
+        # source: 摄像头索引、视频文件、图片目录或"synthetic"；可单独覆盖target_fps等帧率设置
+        {"camera_id": "front", "source": 0},
+    ],
+    "cpu_budget": 1.0,          # 所有摄像头每秒可用的处理时间（秒），约等于CPU核心数
+    "worker_mode": "thread",    # 人脸检测工作池："thread"（OpenCV释放GIL）或"process"（共享内存传帧）
+    "worker_count": 0,          # 工作线程/进程数，0表示使用CPU核心数
+    "realtime": True,           # 按源帧率实时输出；False时尽可能快地输出（用于基准测试）
+    "loop": False,              # 视频/目录/合成源结束后是否循环
+    "target_fps": 1.0,          # 常规目标帧率
+    "active_fps": 5.0,          # 检测到人脸或运动时的帧率
+    "idle_fps": 0.5,            # 场景空闲时的帧率
+    "min_fps": 0.2,             # CPU不足时的最低帧率
+    "idle_after": 10.0,         # 无活动多少秒后进入空闲状态
+    "motion_threshold": 8.0,    # 运动检测阈值（缩略灰度图平均差值）
+    "max_error_delay": 15.0,    # 出错时最长退避时间（秒）
+    "stats_interval": 30.0      # 帧率统计上报间隔（秒）
+}
+# 人物数据库配置
+PERSON_DATABASE = {
+    "index_type": "exact",      # 检索方式："exact"（矩阵精确匹配）或"ivf"（近似最近邻索引）
+    "ivf_min_size": 5000,       # 人物特征数达到该规模后才启用IVF索引
+    "ivf_nlist": None,          # IVF簇数量，None表示按sqrt(人物数)自动选择
+    "ivf_nprobe": 8,            # 查询时搜索的簇数量，越大召回率越高、速度越慢
+    "ivf_retrain_factor": 4.0,  # 人物数超过训练时规模的该倍数后重新训练IVF索引（压缩特征同样按此重新拟合）
+    "ivf_save_interval": 100,   # 增量插入多少个人物后保存一次索引（压缩特征同样适用）
+    "compression": None,        # 特征压缩：None（全精度匹配）、"float16"或"int8"（PCA投影后量化）
+    "pca_components": 256,      # PCA保留的主成分数量
+    "compression_min_size": 1000,  # 人物特征数达到该规模后才拟合压缩
+    "rerank_top_k": 10,         # 用全精度特征精排的候选数，0表示只用压缩特征匹配
+    "max_templates": 5,         # 每个人物最多保留的特征模板数
+    "template_confidence": 0.7, # 匹配相似度达到该值时才用本次特征更新模板
+    "template_merge": 0.9,      # 与已有模板相似度达到该值时合并进该模板，否则新增模板
+    "template_max_weight": 50,  # 模板权重上限，限制旧特征的影响，使模板能适应外观变化
+    "duplicate_floor": 0.4,     # 新增人物与已有人物的最大相似度达到该值（但低于匹配阈值）时计为疑似重复
+    "visit_gap": 300.0,         # 两次目击间隔超过该秒数才计为再次见到（一次来访）
+    "flush_interval": 5.0       # 目击记录批量写入存储的间隔(秒)
 }
 # Web服务配置
 WEB_SERVER = {
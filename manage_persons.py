@@ -0,0 +1,293 @@
+"""
+人物数据库管理工具
+离线批量录入人物照片，以及在特征提取方式改变后用保存的人脸图像重新编码整个人物库
+
+照片目录结构:
+    每人一个子目录（子目录名为人物名称），或所有照片放在同一目录（文件名为人物名称）；
+    同一人物的多张照片会作为该人物的多个特征模板。
+
+用法:
+    python manage_persons.py enroll photos/staff --workers 8 --batch-size 200
+    python manage_persons.py reencode --workers 8
+
+录入进度记录在人物库目录的 enroll_checkpoint.txt 中，中断后再次运行会跳过已录入的照片；
+已存在的同名人物只会补充特征模板，不会重复创建。
+请在视觉智能体停止运行时使用本工具。
+"""
+import os
+import sys
+import time
+import base64
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from src.utils.face_recognition import FaceRecognition
+from src.utils.face_gallery import FaceGallery
+from src.utils.person_database import PersonDatabase
+from src.utils.person_store import SQLitePersonStore, complete_encodings_swap
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+)
+logger = logging.getLogger("ManagePersons")
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+CHECKPOINT_FILE = "enroll_checkpoint.txt"
+REENCODE_FILE = "encodings.reencode.npy"
+
+# 工作进程中的人脸识别实例，由进程初始化函数创建
+_recognition: Optional[FaceRecognition] = None
+
+
+def _init_worker() -> None:
+    """工作进程初始化：每个进程加载一次检测器，并限制OpenCV内部线程数避免过度订阅"""
+    global _recognition
+    cv2.setNumThreads(1)
+    logging.getLogger("FaceRecognition").setLevel(logging.WARNING)
+    _recognition = FaceRecognition()
+
+
+def _encode_photo(path: str) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """在工作进程中检测照片中最大的人脸并提取特征
+
+    Returns:
+        人脸特征向量和人脸图像base64编码；读取失败或未检测到人脸时均为None
+    """
+    # 用imdecode读取，支持包含中文的路径
+    image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None, None
+    faces, encodings, face_images = _recognition.process_frame(image)
+    if len(faces) == 0:
+        return None, None
+    largest = int(np.argmax([w * h for _, _, w, h in faces]))
+    return encodings[largest], face_images[largest]
+
+
+def _encode_thumbnail(face_image: str) -> Optional[np.ndarray]:
+    """在工作进程中对保存的人脸图像（已裁剪的人脸）重新提取特征
+
+    Returns:
+        人脸特征向量；图像损坏或无法提取特征时为None，不影响同一批的其他人物
+    """
+    try:
+        image = cv2.imdecode(np.frombuffer(base64.b64decode(face_image), np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        height, width = image.shape[:2]
+        return _recognition.extract_face_encoding(image, (0, 0, width, height))
+    except Exception as e:
+        logger.warning(f"解码人脸图像失败: {e}")
+        return None
+
+
+def collect_photos(root: str) -> List[Tuple[str, str]]:
+    """收集照片及其人物名称
+
+    Returns:
+        (相对路径, 人物名称) 列表，按路径排序
+    """
+    photos = []
+    for directory, _, files in os.walk(root):
+        for file_name in files:
+            if not file_name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            relative_path = os.path.relpath(os.path.join(directory, file_name), root)
+            parent = os.path.dirname(relative_path)
+            name = parent.split(os.sep)[0] if parent else os.path.splitext(file_name)[0]
+            photos.append((relative_path, name))
+    return sorted(photos)
+
+
+def load_checkpoint(path: str) -> set:
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def enroll(args) -> None:
+    """批量录入照片目录中的人物"""
+    photos = collect_photos(args.photos)
+    checkpoint_path = os.path.join(args.database, CHECKPOINT_FILE)
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    done = load_checkpoint(checkpoint_path)
+    todo = [photo for photo in photos if photo[0] not in done]
+    logger.info(f"共{len(photos)}张照片，已录入{len(photos) - len(todo)}张，待处理{len(todo)}张")
+    if not todo:
+        return
+
+    database = PersonDatabase(args.database)
+    logging.getLogger("PersonDatabase").setLevel(logging.WARNING)
+    name_to_id = {person["name"]: person_id for person_id, person in database.get_all_persons().items()}
+
+    processed = failed = added = templates = 0
+    start = time.perf_counter()
+    workers = args.workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor, \
+            open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+        paths = [os.path.join(args.photos, relative_path) for relative_path, _ in todo]
+        results = executor.map(_encode_photo, paths, chunksize=max(1, min(32, len(paths) // (workers * 4))))
+        for batch_start in range(0, len(todo), args.batch_size):
+            batch = todo[batch_start:batch_start + args.batch_size]
+            new_persons, new_names, extra = [], {}, []
+            for relative_path, name in batch:
+                encoding, face_image = next(results)
+                if encoding is None:
+                    failed += 1
+                    logger.warning(f"未检测到人脸，已跳过: {relative_path}")
+                elif name in name_to_id or name in new_names:
+                    extra.append((name, encoding))
+                else:
+                    new_names[name] = len(new_persons)
+                    new_persons.append((name, encoding, face_image))
+
+            # 新人物在一个事务中写入，同一人物的其他照片作为补充模板随后批量写入
+            for name, person_id in zip(new_names, database.add_persons(new_persons)):
+                name_to_id[name] = person_id
+            for name, encoding in extra:
+                database.add_face_encoding(name_to_id[name], encoding)
+            database.flush(wait=True)
+
+            # 本批写入完成后才记录进度
+            checkpoint.write("".join(f"{relative_path}\n" for relative_path, _ in batch))
+            checkpoint.flush()
+
+            processed += len(batch)
+            added += len(new_persons)
+            templates += len(extra)
+            elapsed = time.perf_counter() - start
+            logger.info(f"进度 {processed}/{len(todo)}，新增人物{added}，补充模板{templates}，失败{failed}，"
+                        f"吞吐 {processed / elapsed:.1f} 张/秒")
+
+    database.close()
+    elapsed = time.perf_counter() - start
+    logger.info(f"录入完成: {processed}张照片用时{elapsed:.1f}秒（{processed / elapsed:.1f} 张/秒，"
+                f"{workers}个进程），新增人物{added}，补充模板{templates}，失败{failed}")
+
+
+def reencode(args) -> None:
+    """用保存的人脸图像重新编码整个人物库
+
+    每个人物的人脸图像重新编码后替换该人物的主模板（行号最小的模板），其余模板以及没有人脸图像
+    或重新编码失败的人物的模板原样保留。新特征写入单独的文件，在一个事务中替换全部模板并记录待替换的文件，
+    然后才替换正式的特征库文件；在两步之间中断时，下次运行本工具或启动人物库会先完成替换（前滚），
+    因此模板行号总是与特征库文件一致，中途中断时重新运行即可。旧的IVF索引和压缩特征会被删除，下次启动时重新建立。
+    """
+    store = SQLitePersonStore(args.database)
+    complete_encodings_swap(args.database, store)
+    encodings_path = os.path.join(args.database, "encodings.npy")
+    temp_path = os.path.join(args.database, REENCODE_FILE)
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    gallery = FaceGallery(path=temp_path)
+
+    # 原有模板：每个人物行号最小的模板是主模板，由重新编码的特征替换
+    old_templates = store.load_templates()
+    primary_rows = {}
+    for row, person_id, _ in old_templates:
+        primary_rows.setdefault(person_id, row)
+    old_matrix = np.load(encodings_path, mmap_mode="r") if os.path.exists(encodings_path) else None
+
+    templates = []
+    reencoded = {}  # 人物ID -> 新特征库中重新编码的行号
+    processed = failed = 0
+    start = time.perf_counter()
+    workers = args.workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        after_id = 0
+        while True:
+            batch = store.load_face_images(after_id, args.batch_size)
+            if not batch:
+                break
+            after_id = batch[-1][0]
+            for (person_id, _), encoding in zip(batch, executor.map(_encode_thumbnail, [image for _, image in batch])):
+                row = gallery.add(person_id, encoding) if encoding is not None else None
+                if row is None:
+                    failed += 1
+                    logger.warning(f"人物ID {person_id} 的人脸图像无法重新编码，保留原有模板")
+                    continue
+                reencoded[person_id] = row
+            processed += len(batch)
+            elapsed = time.perf_counter() - start
+            logger.info(f"已重新编码{processed}个人物，失败{failed}，吞吐 {processed / elapsed:.1f} 人/秒")
+
+    if not reencoded:
+        gallery.close()
+        logger.warning("没有可重新编码的人物，保留原特征库")
+        store.close()
+        return
+
+    # 重新编码的行替换主模板（沿用原权重），其余模板拷贝到新特征库
+    kept = dropped = 0
+    dropped_persons = set()
+    for old_row, person_id, weight in old_templates:
+        if person_id in reencoded and old_row == primary_rows[person_id]:
+            templates.append((reencoded.pop(person_id), person_id, weight))
+            continue
+        row = None
+        if old_matrix is not None and old_row < old_matrix.shape[0]:
+            row = gallery.add(person_id, old_matrix[old_row])
+        if row is None:
+            dropped += 1
+            dropped_persons.add(person_id)
+            continue
+        templates.append((row, person_id, weight))
+        kept += 1
+    # 原来没有模板的人物
+    templates.extend((row, person_id, 1) for person_id, row in reencoded.items())
+    if dropped:
+        logger.warning(f"{dropped}个原有模板无法保留（特征维度不一致或特征库缺失），涉及人物ID: "
+                       f"{sorted(dropped_persons)}")
+    old_matrix = None
+
+    gallery.close()
+    # 索引基于旧的行号，先删除；无论之后在哪一步中断，下次启动都会重新建立
+    for index_file in ("ann_index.npz", "compressed_index.npz"):
+        index_path = os.path.join(args.database, index_file)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+    # 先提交新模板并记录待替换的文件，再替换特征库文件
+    store.replace_templates(templates, pending_swap=REENCODE_FILE)
+    os.replace(temp_path, encodings_path)
+    store.clear_pending_swap()
+    store.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"重新编码完成: {processed - failed}个人物用时{elapsed:.1f}秒（{processed / elapsed:.1f} 人/秒），"
+                f"失败{failed}，保留原有模板{kept}个")
+
+
+if __name__ == "__main__":
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--database", default="data/persons", help="人物库目录")
+    common.add_argument("--workers", type=int, default=0, help="工作进程数，0表示使用CPU核心数")
+    common.add_argument("--batch-size", type=int, default=200, help="每批写入的数量")
+
+    parser = argparse.ArgumentParser(description="人物数据库管理工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enroll_parser = subparsers.add_parser("enroll", parents=[common], help="从照片目录批量录入人物")
+    enroll_parser.add_argument("photos", help="照片目录")
+    enroll_parser.add_argument("--restart", action="store_true", help="忽略录入进度，从头开始")
+
+    subparsers.add_parser("reencode", parents=[common], help="用保存的人脸图像重新编码整个人物库")
+
+    args = parser.parse_args()
+    os.makedirs(args.database, exist_ok=True)
+    if args.command == "enroll":
+        enroll(args)
+    else:
+        reencode(args)
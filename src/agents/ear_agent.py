@@ -1,107 +1,380 @@
 """
 听觉智能体
 """
-import speech_recognition as sr
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 import asyncio
+import threading
+import time
 
 from config import SPEECH_RECOGNITION
 
 from src.agents.base_agent import BaseAgent
+from src.utils.audio_capture import AudioCapture
+from src.utils.audio_source import AudioSource, StreamAudioSource, create_audio_source
+from src.utils.asr_backends import ASRBackend, RecognitionStream, create_asr_backend
+from src.utils.voice_activity import SpeechSegmenter, Utterance, create_vad
+from src.utils.recognition_pipeline import OrderedRecognitionPipeline
+from src.utils.echo_suppression import EchoSuppressor
 from src.utils.mcp_protocol import AudioMessage, TextMessage
 
+# 供Web服务把浏览器麦克风音频推送给听觉智能体
+ear_instance = None
+
 class EarAgent(BaseAgent):
-    def __init__(self, agent_id: str, host: str, port: int):
+    def __init__(self, agent_id: str, host: str, port: int, asr_backend: Optional[ASRBackend] = None,
+                 audio_source: Optional[AudioSource] = None):
         super().__init__(agent_id, "audio_input", host, port)
-        self.recognizer = sr.Recognizer()
+        global ear_instance
+        ear_instance = self
         self.is_listening = False
+        
+        # 语音识别后端：在线、离线或测试用的桩后端
+        self.asr_backend = asr_backend or create_asr_backend(
+            SPEECH_RECOGNITION['asr_backend'],
+            language=SPEECH_RECOGNITION['language'],
+            retry_count=SPEECH_RECOGNITION['retry_count'],
+            retry_delay=SPEECH_RECOGNITION['retry_delay'],
+            vosk_model_path=SPEECH_RECOGNITION['vosk_model_path'],
+            stub_delay=SPEECH_RECOGNITION['stub_delay']
+        )
+        self.partial_interval = SPEECH_RECOGNITION['partial_interval_ms'] / 1000
+        
+        # 嘴巴说话时屏蔽自己的声音，并按文本相似度过滤回声
+        self.echo_suppressor = EchoSuppressor(
+            gate=SPEECH_RECOGNITION['echo_gate'],
+            tail=SPEECH_RECOGNITION['echo_tail'],
+            similarity=SPEECH_RECOGNITION['echo_similarity'],
+            recent_seconds=SPEECH_RECOGNITION['echo_recent_seconds'],
+            min_chars=SPEECH_RECOGNITION['echo_min_chars']
+        )
+        self.register_handler("speech_event", self._handle_speech_event)
+        
+        # 音频源（麦克风或WAV回放）只打开一次，由采集线程持续写入环形缓冲区
+        audio_source = audio_source or create_audio_source(
+            SPEECH_RECOGNITION['audio_source'],
+            sample_rate=SPEECH_RECOGNITION['sample_rate'],
+            chunk_size=SPEECH_RECOGNITION['chunk_size'],
+            realtime=SPEECH_RECOGNITION['audio_realtime'],
+            speed=SPEECH_RECOGNITION['audio_speed'],
+            loop=SPEECH_RECOGNITION['audio_loop']
+        )
+        self.capture = self._create_capture(audio_source)
+        self.segmenter = self._create_segmenter(self.capture)
+        
+        # 远程客户端（浏览器麦克风）的音频流：客户端ID -> (音频源, 采集, 切分线程)
+        self.remote_inputs: Dict[str, Tuple[StreamAudioSource, AudioCapture, threading.Thread]] = {}
+        self.remote_dropped_seconds = 0.0
+        self.pipeline: Optional[OrderedRecognitionPipeline] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._segment_thread: Optional[threading.Thread] = None
+        self._listen_task: Optional[asyncio.Task] = None
+        self._stats_task: Optional[asyncio.Task] = None
+        self.stats_interval = SPEECH_RECOGNITION['stats_interval']
+        
+        # 语音结束到得到文本的延迟统计（毫秒，滑动平均）
+        self.recognized = 0
+        self.average_endpoint_ms = 0.0
+        self.average_transcript_ms = 0.0
+        self.partials_sent = 0
+    
+    @staticmethod
+    def _create_capture(audio_source: AudioSource) -> AudioCapture:
+        return AudioCapture(
+            audio_source,
+            buffer_seconds=SPEECH_RECOGNITION['buffer_seconds'],
+            energy_ratio=SPEECH_RECOGNITION['energy_ratio'],
+            noise_adapt_rate=SPEECH_RECOGNITION['noise_adapt_rate'],
+            min_energy_threshold=SPEECH_RECOGNITION['min_energy_threshold']
+        )
+    
+    @staticmethod
+    def _create_segmenter(capture: AudioCapture) -> SpeechSegmenter:
+        """按帧检测语音端点，说话人停顿hangover_ms后立即切出这段话"""
+        vad = create_vad(
+            SPEECH_RECOGNITION['vad'],
+            threshold=lambda: capture.energy_threshold,
+            max_zcr=SPEECH_RECOGNITION['vad_max_zcr'],
+            aggressiveness=SPEECH_RECOGNITION['vad_aggressiveness']
+        )
+        return SpeechSegmenter(
+            vad,
+            sample_rate=capture.sample_rate,
+            sample_width=capture.sample_width,
+            frame_ms=SPEECH_RECOGNITION['vad_frame_ms'],
+            start_ms=SPEECH_RECOGNITION['speech_start_ms'],
+            hangover_ms=SPEECH_RECOGNITION['hangover_ms'],
+            pre_roll_ms=SPEECH_RECOGNITION['pre_roll_ms'],
+            max_seconds=SPEECH_RECOGNITION['phrase_time_limit']
+        )
     
     async def start(self):
         """启动听觉智能体"""
         await super().start()
         self.is_listening = True
-        asyncio.create_task(self._listen_loop())
+        self._loop = asyncio.get_running_loop()
+        # 切分和识别解耦：识别进行时采集和切分不停止，多段话并发识别后按顺序输出
+        self.pipeline = OrderedRecognitionPipeline(self._recognize, SPEECH_RECOGNITION['recognition_workers'])
+        self.pipeline.start()
+        self.capture.start()
+        self._segment_thread = threading.Thread(target=self._segment_loop, args=(self.capture, self.segmenter),
+                                                name="speech-segmenter", daemon=True)
+        self._segment_thread.start()
+        self._listen_task = asyncio.create_task(self._listen_loop())
+        self._stats_task = asyncio.create_task(self._stats_loop())
     
     async def stop(self):
         """停止听觉智能体"""
         self.is_listening = False
+        # 关闭缓冲区后正在等待音频的切分线程会立即返回
+        await asyncio.to_thread(self.capture.stop)
+        for client_id in list(self.remote_inputs):
+            self.close_remote_input(client_id)
+        if self._segment_thread is not None:
+            await asyncio.to_thread(self._segment_thread.join, 2.0)
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+        if self._stats_task is not None:
+            self._stats_task.cancel()
+            await asyncio.gather(self._stats_task, return_exceptions=True)
+        if self.pipeline is not None:
+            await self.pipeline.stop()
+        self.logger.info(f"听觉统计: {self.get_stats()}")
         await super().stop()
     
+    def open_remote_input(self, client_id: str) -> StreamAudioSource:
+        """为远程客户端（浏览器麦克风）打开一路音频输入
+        
+        每个客户端有独立的音频源、采集缓冲区和切分线程，切出的语音段与本地麦克风共用识别流水线
+        
+        Args:
+            client_id: 客户端ID
+            
+        Returns:
+            接收该客户端音频的音频源
+        """
+        if client_id in self.remote_inputs:
+            return self.remote_inputs[client_id][0]
+        source = StreamAudioSource(client_id, SPEECH_RECOGNITION['sample_rate'],
+                                   max_seconds=SPEECH_RECOGNITION['remote_buffer_seconds'])
+        capture = self._create_capture(source)
+        segmenter = self._create_segmenter(capture)
+        capture.start()
+        thread = threading.Thread(target=self._segment_loop, args=(capture, segmenter),
+                                  name=f"speech-segmenter-{client_id}", daemon=True)
+        thread.start()
+        self.remote_inputs[client_id] = (source, capture, thread)
+        self.logger.info(f"远程音频输入已打开: {client_id}")
+        return source
+    
+    def push_remote_audio(self, client_id: str, data: bytes):
+        """推送远程客户端的一段16位单声道PCM音频，首次推送时自动打开输入；从不阻塞调用方"""
+        if not self.is_listening or self._loop is None:
+            return
+        self.open_remote_input(client_id).push(data)
+    
+    def close_remote_input(self, client_id: str):
+        """关闭远程客户端的音频输入，已缓冲的音频仍会切分完"""
+        remote = self.remote_inputs.pop(client_id, None)
+        if remote is None:
+            return
+        source, capture, thread = remote
+        source.close()
+        self.remote_dropped_seconds += source.dropped_bytes / (source.sample_rate * source.sample_width)
+        self.logger.info(f"远程音频输入已关闭: {client_id}，"
+                         f"接收{source.received_bytes / (source.sample_rate * source.sample_width):.1f}秒")
+    
+    def _segment_loop(self, capture: AudioCapture, segmenter: SpeechSegmenter):
+        """在线程中按帧读取环形缓冲区并切分语音，切出的每段话提交给识别流水线
+        
+        流式识别后端在说话过程中就逐帧送入音频，并按partial_interval发送中间结果
+        
+        Args:
+            capture: 音频采集
+            segmenter: 该路音频的语音切分器
+        """
+        buffer = capture.buffer
+        frame_bytes = segmenter.frame_bytes
+        position = 0
+        stream: Optional[RecognitionStream] = None
+        last_partial_time = 0.0
+        while self.is_listening:
+            frame, position = buffer.read(position, frame_bytes)
+            if len(frame) < frame_bytes:
+                if buffer.closed:
+                    # 音频流结束时（例如浏览器停止录音）说话人可能还没停顿，输出已切出的这段话
+                    utterance = segmenter.flush()
+                    if utterance is not None and self.is_listening:
+                        utterance.stream = stream
+                        self._loop.call_soon_threadsafe(self._submit_utterance, utterance)
+                    break
+                continue
+            was_in_speech = segmenter.in_speech
+            utterance = segmenter.process(frame, capture.position_time(position))
+            
+            if self.asr_backend.streaming:
+                partial = None
+                try:
+                    if was_in_speech and stream is not None:
+                        partial = stream.accept(frame)
+                    elif segmenter.in_speech:
+                        stream = self.asr_backend.create_stream(segmenter.sample_rate)
+                        partial = stream.accept(segmenter.current_audio())
+                except Exception as e:
+                    self.logger.error(f"流式识别出错: {e}")
+                    stream = None
+                now = time.monotonic()
+                if partial and utterance is None and not self.echo_suppressor.is_speaking \
+                        and now - last_partial_time >= self.partial_interval:
+                    last_partial_time = now
+                    self._loop.call_soon_threadsafe(self._queue_partial, partial)
+            
+            if utterance is not None:
+                utterance.stream, stream = stream, None
+                self._loop.call_soon_threadsafe(self._submit_utterance, utterance)
+    
+    def _submit_utterance(self, utterance: Utterance):
+        """在事件循环线程中提交语音段，嘴巴说话期间开始的语音段直接丢弃"""
+        if self.echo_suppressor.should_gate(utterance.speech_start_time):
+            self.logger.info(f"嘴巴正在说话，忽略{utterance.duration:.1f}秒的语音段")
+            return
+        self.pipeline.submit(utterance)
+    
+    async def _handle_speech_event(self, message: Dict[str, Any]):
+        """处理嘴巴发布的开始/停止说话事件"""
+        content = message.get('content', {})
+        event = content.get('event')
+        if event == "speaking_started":
+            self.echo_suppressor.speaking_started(content.get('text', ''))
+        elif event == "speaking_stopped":
+            self.echo_suppressor.speaking_stopped()
+    
+    async def _recognize(self, utterance: Utterance) -> Optional[str]:
+        """识别一段话，由识别流水线的多个协程并发调用
+        
+        Returns:
+            识别出的文本，无法识别或服务出错时返回None
+        """
+        try:
+            if utterance.stream is not None:
+                text = await asyncio.to_thread(self.asr_backend.finish_stream, utterance.stream)
+            else:
+                text = await asyncio.to_thread(
+                    self.asr_backend.transcribe,
+                    utterance.audio,
+                    utterance.sample_rate,
+                    utterance.sample_width
+                )
+        except Exception as e:
+            self.logger.error(f"Error with speech recognition service ({self.asr_backend.name}): {e}")
+            return None
+        if not text:
+            self.logger.info("Could not understand audio")
+        return text
+    
+    def _queue_partial(self, text: str):
+        """在事件循环线程中安排发送中间结果"""
+        asyncio.create_task(self._send_partial(text))
+    
+    async def _send_partial(self, text: str):
+        """把流式识别的中间结果发送到大脑，大脑可以提前做准备（例如预热模型）"""
+        message = TextMessage(
+            sender_id=self.agent_id,
+            receiver_id="brain",
+            text=text
+        )
+        message.content["partial"] = True
+        try:
+            await self.send_message("brain", message.to_dict())
+            self.partials_sent += 1
+        except Exception as e:
+            self.logger.error(f"发送中间识别结果失败: {e}")
+    
     async def _listen_loop(self):
-        """持续监听音频的循环"""
+        """按说话顺序把识别结果发送出去"""
         while self.is_listening:
+            utterance, text = await self.pipeline.next_result()
+            if not text:
+                continue
+            if self.echo_suppressor.is_echo(text):
+                self.logger.info(f"识别结果与刚说过的话相同，视为回声: {text}")
+                continue
             try:
-                # 添加麦克风资源检查和重试机制
-                max_mic_retries = 5
-                for mic_attempt in range(max_mic_retries):
-                    try:
-                        with sr.Microphone() as source:
-                            # 调整麦克风参数，确保能在眼睛智能体运行后正常工作
-                            self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                            self.logger.info("Listening...")
-                            audio = await asyncio.to_thread(
-                                self.recognizer.listen,
-                                source,
-                                timeout=SPEECH_RECOGNITION['timeout'],
-                                phrase_time_limit=SPEECH_RECOGNITION['phrase_time_limit']
-                            )
-                            break
-                    except Exception as mic_error:
-                        self.logger.warning(f"麦克风访问错误 (尝试 {mic_attempt+1}/{max_mic_retries}): {mic_error}")
-                        if mic_attempt == max_mic_retries - 1:
-                            raise
-                        await asyncio.sleep(1)  # 等待一秒后重试
-                    
-                    # 添加重试机制
-                    max_retries = SPEECH_RECOGNITION['retry_count']
-                    for attempt in range(max_retries):
-                        try:
-                            text = await asyncio.to_thread(
-                                self.recognizer.recognize_google,
-                                audio,
-                                language=SPEECH_RECOGNITION['language']
-                            )
-                            break
-                        except sr.RequestError:
-                            if attempt == max_retries - 1:
-                                raise
-                            await asyncio.sleep(SPEECH_RECOGNITION['retry_delay'])
-                    
-                    # 发送文本消息到大脑
-                    message = TextMessage(
-                        sender_id=self.agent_id,
-                        receiver_id="brain",
-                        text=text
-                    )
-                    await self.send_message("brain", message.to_dict())
-                    
-                    # 同时发送到Web界面
-                    try:
-                        from src.web.server import broadcast_message
-                        web_message = {
-                            "type": "audio",
-                            "sender_id": self.agent_id,
-                            "content": text
-                        }
-                        await broadcast_message(web_message)
-                        
-                        # 同时作为聊天消息显示
-                        chat_message = {
-                            "type": "chat",
-                            "sender_id": "user",
-                            "content": {
-                                "text": text
-                            }
-                        }
-                        await broadcast_message(chat_message)
-                    except Exception as e:
-                        self.logger.error(f"发送消息到Web界面失败: {e}")
-                    
-            except sr.UnknownValueError:
-                self.logger.info("Could not understand audio")
-            except sr.RequestError as e:
-                self.logger.error(f"Error with speech recognition service: {e}")
-                await asyncio.sleep(2)  # 服务错误时等待更长时间
+                self._record_latency(utterance)
+                await self._send_text(text)
             except Exception as e:
                 self.logger.error(f"Error in listen loop: {e}")
-                await asyncio.sleep(1)
\ No newline at end of file
+    
+    def _record_latency(self, utterance: Utterance):
+        """记录从语音结束到得到文本的延迟"""
+        now = time.monotonic()
+        endpoint_ms = (utterance.endpoint_time - utterance.speech_end_time) * 1000
+        transcript_ms = (now - utterance.speech_end_time) * 1000
+        self.recognized += 1
+        weight = min(self.recognized, 100)
+        self.average_endpoint_ms += (endpoint_ms - self.average_endpoint_ms) / weight
+        self.average_transcript_ms += (transcript_ms - self.average_transcript_ms) / weight
+        self.logger.info(f"识别完成: 时长{utterance.duration:.1f}秒，语音结束到文本{transcript_ms:.0f}ms"
+                         f"（端点检测{endpoint_ms:.0f}ms）")
+    
+    async def _stats_loop(self):
+        """定期上报听觉统计"""
+        while self.is_listening:
+            await asyncio.sleep(self.stats_interval)
+            self.logger.info(f"听觉统计: {self.get_stats()}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取听觉统计
+        
+        Returns:
+            采集、切分、识别流水线、识别后端和回声抑制统计，以及中间结果数、识别数量和语音结束到端点判定、
+            到得到文本的平均延迟(毫秒)、远程音频输入数和因积压丢弃的远程音频时长(秒)
+        """
+        remote_dropped = self.remote_dropped_seconds + sum(
+            source.dropped_bytes / (source.sample_rate * source.sample_width)
+            for source, _, _ in self.remote_inputs.values()
+        )
+        return {
+            **self.capture.get_stats(),
+            **self.segmenter.get_stats(),
+            **(self.pipeline.get_stats() if self.pipeline is not None else {}),
+            **self.asr_backend.get_stats(),
+            **self.echo_suppressor.get_stats(),
+            "partials_sent": self.partials_sent,
+            "recognized": self.recognized,
+            "endpoint_ms": round(self.average_endpoint_ms, 1),
+            "end_to_transcript_ms": round(self.average_transcript_ms, 1),
+            "remote_inputs": len(self.remote_inputs),
+            "remote_dropped_seconds": round(remote_dropped, 2)
+        }
+    
+    async def _send_text(self, text: str):
+        """把识别结果发送到大脑和Web界面"""
+        # 发送文本消息到大脑
+        message = TextMessage(
+            sender_id=self.agent_id,
+            receiver_id="brain",
+            text=text
+        )
+        await self.send_message("brain", message.to_dict())
+        
+        # 同时发送到Web界面
+        try:
+            from src.web.server import broadcast_message
+            web_message = {
+                "type": "audio",
+                "sender_id": self.agent_id,
+                "content": text
+            }
+            await broadcast_message(web_message)
+            
+            # 同时作为聊天消息显示
+            chat_message = {
+                "type": "chat",
+                "sender_id": "user",
+                "content": {
+                    "text": text
+                }
+            }
+            await broadcast_message(chat_message)
+        except Exception as e:
+            self.logger.error(f"发送消息到Web界面失败: {e}")
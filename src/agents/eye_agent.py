@@ -11,63 +11,121 @@ import random
 import string
 import os
 
+from config import VISION
+
 from src.agents.base_agent import BaseAgent
 from src.utils.mcp_protocol import ImageMessage, TextMessage
-from src.utils.face_recognition import FaceRecognition
 from src.utils.person_database import PersonDatabase
+from src.utils.frame_rate import AdaptiveFrameRateController
+from src.utils.frame_source import FrameSource, create_frame_source
+from src.utils.camera_pipeline import CameraPipeline, CpuBudget
+from src.utils.vision_workers import FaceWorkerPool
 
 class EyeAgent(BaseAgent):
-    def __init__(self, agent_id: str, host: str, port: int):
+    def __init__(self, agent_id: str, host: str, port: int,
+                 frame_sources: Optional[Dict[str, FrameSource]] = None,
+                 person_database: Optional[PersonDatabase] = None):
         super().__init__(agent_id, "vision", host, port)
-        self.camera = None
         self.is_capturing = False
-        self.last_analysis_time = 0  # 上次分析图像的时间
         self.analysis_interval = 10.0  # 分析图像的时间间隔(秒)
         
-        # 初始化人脸识别模块
-        self.face_recognition = FaceRecognition()
-        
-        # 初始化人物数据库
-        self.person_database = PersonDatabase()
+        # 所有摄像头共享同一个人物数据库
+        self.person_database = person_database or PersonDatabase()
         
         # 记录上次识别到的人物ID，用于避免重复问候
         self.last_recognized_person_id = None
         self.last_recognition_time = 0
         self.recognition_cooldown = 600.0  # 同一人物的问候冷却时间(秒)
+        
+        # 每个帧源一条独立管线（采集线程、检测器、帧率控制器），共享全局CPU预算
+        source_configs = {str(config.get("camera_id", i)): config for i, config in enumerate(VISION['sources'])}
+        if frame_sources is None:
+            frame_sources = {
+                camera_id: create_frame_source(
+                    config["source"],
+                    realtime=config.get("realtime", VISION['realtime']),
+                    loop=config.get("loop", VISION['loop'])
+                )
+                for camera_id, config in source_configs.items()
+            }
+        self.pipelines: Dict[str, CameraPipeline] = {
+            camera_id: CameraPipeline(
+                camera_id,
+                frame_source,
+                self._create_frame_rate_controller(source_configs.get(camera_id, {})),
+                motion_threshold=VISION['motion_threshold']
+            )
+            for camera_id, frame_source in frame_sources.items()
+        }
+        self.cpu_budget = CpuBudget(VISION['cpu_budget'])
+        
+        # 人脸检测和特征提取在工作池中执行，不阻塞事件循环
+        self.worker_pool = FaceWorkerPool(VISION['worker_mode'], VISION['worker_count'])
+        self.stats_interval = VISION['stats_interval']
+        self.last_stats_time = 0
+        self._capture_tasks = []
+        self._flush_task = None
+    
+    def _create_frame_rate_controller(self, overrides: Dict[str, Any]) -> AdaptiveFrameRateController:
+        """按配置创建自适应帧率控制器，单个帧源的配置可覆盖全局帧率设置"""
+        settings = {**VISION, **overrides}
+        return AdaptiveFrameRateController(
+            target_fps=settings['target_fps'],
+            active_fps=settings['active_fps'],
+            idle_fps=settings['idle_fps'],
+            min_fps=settings['min_fps'],
+            idle_after=settings['idle_after'],
+            max_error_delay=settings['max_error_delay']
+        )
     
     async def start(self):
         """启动视觉智能体"""
         await super().start()
-        self.camera = cv2.VideoCapture(0)
-        if not self.camera.isOpened():
-            self.logger.error("Failed to open camera")
+        self.is_capturing = True
+        for pipeline in self.pipelines.values():
+            if pipeline.start():
+                self._capture_tasks.append(asyncio.create_task(self._capture_loop(pipeline)))
+        if not self._capture_tasks:
+            self.logger.error("Failed to open any frame source")
+            self.is_capturing = False
             return
         
-        self.is_capturing = True
-        asyncio.create_task(self._capture_loop())
-        self.logger.info("视觉智能体已启动")
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        
+        self.logger.info(f"视觉智能体已启动，摄像头数: {len(self._capture_tasks)}")
         self.logger.info(f"已加载{len(self.person_database.get_all_persons())}个已知人物数据")
     
     async def stop(self):
         """停止视觉智能体"""
         self.is_capturing = False
-        if self.camera:
-            self.camera.release()
+        # 先取消并等待采集任务和定期写入任务结束，之后不会再有帧提交给工作池或写入人物库
+        tasks = self._capture_tasks + ([self._flush_task] if self._flush_task is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._capture_tasks = []
+        self._flush_task = None
+        for pipeline in self.pipelines.values():
+            await pipeline.stop()
+        await asyncio.to_thread(self.worker_pool.shutdown)
+        # 关闭时写入剩余的目击记录
+        await asyncio.to_thread(self.person_database.close)
         await super().stop()
     
-    async def _process_face_recognition(self, image_base64: str) -> Optional[str]:
+    async def _process_face_recognition(self, frame: np.ndarray, pipeline: CameraPipeline) -> Optional[str]:
         """处理人脸识别
         
         Args:
-            image_base64: Base64编码的图像数据
+            frame: 原始图像，OpenCV格式（BGR）
+            pipeline: 图像所属的摄像头管线
             
         Returns:
             处理后的图像Base64编码，如果没有检测到人脸则返回None
         """
         try:
             # self.logger.info(f"开始处理人脸图像识别")
-            # 检测人脸并提取特征
-            faces, face_encodings, face_images = self.face_recognition.process_image(image_base64)
+            # 在工作池中检测人脸并提取特征
+            faces, face_encodings, face_images = await self.worker_pool.process_frame(frame)
             # self.logger.info(f"已经监测到人脸图像")
             if len(faces) == 0:
                 return None
@@ -79,12 +137,12 @@ class EyeAgent(BaseAgent):
             recognized_info = []  # 存储识别到的人物信息，用于显示
             # self.logger.info(f"开始定义识别的时间")
             current_time = time.time()
+            # 一次矩阵乘法为所有人脸查找相似人物
+            matches = self.person_database.match_faces(face_encodings)
             # self.logger.info(f"开始处理每个检测到的人脸")
             # 处理每个检测到的人脸
-            for i, (face, encoding, face_image) in enumerate(zip(faces, face_encodings, face_images)):
-                self.logger.info(f"查找相似人物")
-                # 查找相似人物
-                person_id = self.person_database.find_similar_person(encoding)
+            for i, (face, encoding, face_image, (person_id, similarity)) in enumerate(
+                    zip(faces, face_encodings, face_images, matches)):
                 
                 if person_id is not None:
                     # 已知人物
@@ -98,11 +156,13 @@ class EyeAgent(BaseAgent):
                     time_diff = current_time - last_seen
                     time_info = self._format_time_diff(time_diff) if time_diff > 60 else "刚刚"
                     
-                    # 更新人物信息
+                    # 更新人物信息，置信度高时用本次特征更新该人物的特征模板
                     self.person_database.update_person(
                         person_id, 
                         last_seen=current_time,
-                        face_image=face_image
+                        face_image=face_image,
+                        face_encoding=encoding,
+                        similarity=similarity
                     )
                     
                     # 添加识别信息
@@ -118,7 +178,8 @@ class EyeAgent(BaseAgent):
                     new_id = self.person_database.add_person(
                         name=random_name,
                         face_encoding=encoding,
-                        face_image=face_image
+                        face_image=face_image,
+                        best_similarity=similarity
                     )
                     
                     recognized_names.append(random_name)
@@ -127,10 +188,13 @@ class EyeAgent(BaseAgent):
                     self.logger.info(f"添加新人物: {random_name} (ID: {new_id})")
             self.logger.info(f"绘制人脸边界框和名称")
             # 绘制人脸边界框和名称
-            processed_image = self.face_recognition.draw_faces(image_base64, faces, recognized_names)
+            processed_image = await asyncio.to_thread(
+                pipeline.face_recognition.draw_faces_on_frame, frame, faces, recognized_names
+            )
             
             # 检查是否需要发送问候消息
-            await self._send_greeting_if_needed(recognized_ids, recognized_names, recognized_info, current_time)
+            await self._send_greeting_if_needed(recognized_ids, recognized_names, recognized_info, current_time,
+                                                pipeline.camera_id)
             
             return processed_image
         
@@ -178,7 +242,8 @@ class EyeAgent(BaseAgent):
         else:
             return f"{seconds}秒前"
     
-    async def _send_greeting_if_needed(self, person_ids: List[int], person_names: List[str], person_info: List[str], current_time: float) -> None:
+    async def _send_greeting_if_needed(self, person_ids: List[int], person_names: List[str], person_info: List[str], current_time: float,
+                                       camera_id: Optional[str] = None) -> None:
         """如果需要，发送问候消息
         
         Args:
@@ -186,6 +251,7 @@ class EyeAgent(BaseAgent):
             person_names: 识别到的人物名称列表
             person_info: 识别到的人物详细信息列表
             current_time: 当前时间戳
+            camera_id: 识别到人物的摄像头ID
         """
         if not person_ids:
             return
@@ -219,56 +285,100 @@ class EyeAgent(BaseAgent):
                 text=f"[视觉识别] 我看到了{person_name}。{greeting}"
             )
             
-            self.logger.info(f"发送问候消息: {greeting}")
+            self.logger.info(f"发送问候消息: {greeting} (摄像头: {camera_id})")
             await self.send_message("brain", greeting_message.to_dict())
     
-    async def _capture_loop(self):
-        """持续捕获视频的循环"""
+    async def _flush_loop(self):
+        """定期把人物目击记录提交给人物库的写入线程批量写入，只入队不阻塞事件循环"""
+        while self.is_capturing:
+            await asyncio.sleep(self.person_database.flush_interval)
+            try:
+                self.person_database.flush()
+            except Exception as e:
+                self.logger.error(f"写入人物目击记录时出错: {e}")
+    
+    @staticmethod
+    def _encode_frame(frame: np.ndarray) -> str:
+        """将图像编码为JPEG格式的base64字符串"""
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        return base64.b64encode(buffer).decode('utf-8')
+    
+    async def _report_frame_stats(self, current_time: float) -> None:
+        """定期上报各摄像头的有效帧率和循环延迟"""
+        if current_time - self.last_stats_time < self.stats_interval:
+            return
+        self.last_stats_time = current_time
+        stats = [pipeline.get_stats() for pipeline in self.pipelines.values()]
+        self.logger.info(f"视觉帧率统计: {stats}")
+        self.logger.info(f"人物库写入统计: {self.person_database.get_write_stats()}")
+        self.logger.info(f"人物匹配统计: {self.person_database.get_match_stats()}")
+        from src.web.server import broadcast_message
+        await broadcast_message({
+            "type": "vision_stats",
+            "content": stats
+        })
+    
+    async def _capture_loop(self, pipeline: CameraPipeline):
+        """单个摄像头的处理循环，帧由管线的采集线程提供"""
+        frame_rate = pipeline.frame_rate
         while self.is_capturing:
             try:
-                ret, frame = self.camera.read()
-                if ret:
-                    # 转换图像为JPEG格式的base64字符串
-                    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-                    image_base64 = base64.b64encode(buffer).decode('utf-8')
+                frame = await pipeline.next_frame()
+                if frame is None:
+                    self.logger.info(f"摄像头 {pipeline.camera_id} 停止采集")
+                    break
+                frame_rate.frame_started()
+                motion = pipeline.detect_motion(frame)
+                
+                # 在线程中转换图像为JPEG格式的base64字符串
+                image_base64 = await asyncio.to_thread(self._encode_frame, frame)
+                
+                # 处理人脸识别
+                processed_image = await self._process_face_recognition(frame, pipeline)
+                activity = motion or processed_image is not None
+                
+                # 发送到Web界面
+                from src.web.server import broadcast_message
+                success = await broadcast_message({
+                    "type": "vision",
+                    "camera_id": pipeline.camera_id,
+                    "content": processed_image or image_base64
+                })
+                
+                # 定期发送图像到大脑进行分析
+                current_time = time.time()
+                if current_time - pipeline.last_analysis_time >= self.analysis_interval:
+                    pipeline.last_analysis_time = current_time
                     
-                    # 处理人脸识别
-                    processed_image = await self._process_face_recognition(image_base64)
+                    # 获取当前识别到的人物名称（如果有）
+                    person_name = None
+                    if self.last_recognized_person_id is not None:
+                        person = self.person_database.get_person(self.last_recognized_person_id)
+                        if person:
+                            person_name = person["name"]
                     
-                    # 发送到Web界面
-                    from src.web.server import broadcast_message
-                    success = await broadcast_message({
-                        "type": "vision",
-                        "content": processed_image or image_base64
-                    })
+                    # 创建图像消息，包含人物名称和摄像头ID
+                    message = ImageMessage(
+                        sender_id=self.agent_id,
+                        receiver_id="brain",
+                        image_data=image_base64,
+                        person_name=person_name,
+                        camera_id=pipeline.camera_id
+                    )
                     
-                    # 定期发送图像到大脑进行分析
-                    current_time = time.time()
-                    if current_time - self.last_analysis_time >= self.analysis_interval:
-                        self.last_analysis_time = current_time
-                        
-                        # 获取当前识别到的人物名称（如果有）
-                        person_name = None
-                        if self.last_recognized_person_id is not None:
-                            person = self.person_database.get_person(self.last_recognized_person_id)
-                            if person:
-                                person_name = person["name"]
-                        
-                        # 创建图像消息，包含人物名称
-                        message = ImageMessage(
-                            sender_id=self.agent_id,
-                            receiver_id="brain",
-                            image_data=image_base64,
-                            person_name=person_name
-                        )
-                        
-                        # 发送到大脑智能体
-                        self.logger.info("发送图像到大脑进行分析")
-                        await self.send_message("brain", message.to_dict())
+                    # 发送到大脑智能体
+                    self.logger.info(f"发送摄像头 {pipeline.camera_id} 的图像到大脑进行分析")
+                    await self.send_message("brain", message.to_dict())
+                
+                await self._report_frame_stats(current_time)
                 
-                # 控制帧率，设置为1FPS
-                await asyncio.sleep(1.0)  # 1FPS
+                # 扣除处理耗时后按自适应帧率等待，并在摄像头之间重新分配CPU预算
+                delay = frame_rate.frame_finished(activity)
+                self.cpu_budget.rebalance({p.camera_id: p.frame_rate for p in self.pipelines.values()})
+                await asyncio.sleep(delay)
+                frame_rate.sleep_finished()
             
             except Exception as e:
-                self.logger.error(f"Error in capture loop: {e}")
-                await asyncio.sleep(15.0)  # 出错时等待5秒再重试
\ No newline at end of file
+                self.logger.error(f"Error in capture loop ({pipeline.camera_id}): {e}")
+                await asyncio.sleep(frame_rate.frame_failed())  # 出错时指数退避后重试
+                frame_rate.sleep_finished()
\ No newline at end of file
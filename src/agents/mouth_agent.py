@@ -4,19 +4,38 @@
 import asyncio
 import logging
 from typing import Dict, Any
-import pyttsx3
-import threading
-import time
-import os
+
+from config import SPEECH_SYNTHESIS
 
 from src.agents.base_agent import BaseAgent
-from src.utils.mcp_protocol import TextMessage
+from src.utils.mcp_protocol import MCPMessage, TextMessage
+from src.utils.tts_cache import TTSCache
+from src.utils.tts_worker import TTSWorker
 
 class MouthAgent(BaseAgent):
     def __init__(self, agent_id: str, host: str, port: int):
         super().__init__(agent_id, "speech", host, port)
-        # 初始化TTS引擎
-        self.tts_queue = asyncio.Queue()
+        # 常驻的语音合成线程持有唯一的TTS引擎，长回复拆成句子边合成边播放；问候语等重复的句子直接播放缓存的音频
+        cache = None
+        if SPEECH_SYNTHESIS['cache_enabled']:
+            cache = TTSCache(
+                SPEECH_SYNTHESIS['cache_dir'],
+                max_memory_bytes=int(SPEECH_SYNTHESIS['cache_memory_mb'] * 1024 * 1024),
+                max_disk_bytes=int(SPEECH_SYNTHESIS['cache_disk_mb'] * 1024 * 1024)
+            )
+        self.tts_worker = TTSWorker(
+            rate=SPEECH_SYNTHESIS['rate'],
+            volume=SPEECH_SYNTHESIS['volume'],
+            voice=SPEECH_SYNTHESIS['voice'],
+            on_event=self._notify_speech_event,
+            cache=cache,
+            cache_max_chars=SPEECH_SYNTHESIS['cache_max_chars'],
+            sentence_min_chars=SPEECH_SYNTHESIS['sentence_min_chars'],
+            playback_queue_size=SPEECH_SYNTHESIS['playback_queue_size']
+        )
+        self._loop = None
+        self.stats_interval = SPEECH_SYNTHESIS['stats_interval']
+        self._stats_task = None
         
         # 注册消息处理器
         self.register_handler("text", self._handle_text_message)
@@ -24,107 +43,37 @@ class MouthAgent(BaseAgent):
     async def start(self):
         """启动嘴巴智能体"""
         await super().start()
+        self._loop = asyncio.get_running_loop()
 
-        # 测试TTS引擎
-        test_result = await self._test_tts()
-        if not test_result:
+        # 初始化TTS引擎并播放测试语音
+        if await asyncio.to_thread(self.tts_worker.start):
+            self.tts_worker.submit("嘴巴智能体启动！")
+        else:
             self.logger.warning("TTS测试失败，语音功能可能不可用")
-        
-        # 启动TTS处理循环
-        asyncio.create_task(self._process_tts_queue())
+        self._stats_task = asyncio.create_task(self._stats_loop())
         
         self.logger.info("嘴巴智能体已启动")
     
-    async def _test_tts(self):
-        """测试TTS引擎"""
-        try:
-            # 在单独的线程中初始化和测试TTS引擎
-            result = await asyncio.to_thread(self._init_and_test_tts)
-            return result
-        except Exception as e:
-            self.logger.error(f"TTS测试失败: {e}")
-            return False
-    
-    def _init_and_test_tts(self):
-        """初始化并测试TTS引擎"""
-        try:
-            self.logger.info("初始化TTS引擎")
-            engine = pyttsx3.init()
-            
-            # 设置语音属性
-            engine.setProperty('rate', 180)  # 语速
-            engine.setProperty('volume', 0.9)  # 音量
-            
-            # 获取可用的语音
-            voices = engine.getProperty('voices')
-            self.logger.info(f"可用语音数量: {len(voices)}")
-            
-            # 尝试设置中文语音
-            for voice in voices:
-                self.logger.info(f"语音: ID={voice.id}, Name={voice.name}")
-                if 'chinese' in voice.name.lower() or 'zh' in voice.id.lower():
-                    engine.setProperty('voice', voice.id)
-                    self.logger.info(f"设置中文语音: {voice.id}")
-                    break
-            
-            # 测试播放
-            test_text = "嘴巴智能体启动！"
-            self.logger.info(f"测试TTS: {test_text}")
-            
-            engine.say(test_text)
-            engine.runAndWait()
-            engine.stop()  # 使用完毕后停止引擎
-            
-            self.logger.info("TTS引擎初始化和测试完成")
-            return True
-        except Exception as e:
-            self.logger.error(f"TTS引擎初始化或测试失败: {e}")
-            return False
-    
-    async def _process_tts_queue(self):
-        """处理TTS队列"""
+    async def _stats_loop(self):
+        """定期上报语音输出和语音缓存统计"""
         while True:
-            try:
-                text = await self.tts_queue.get()
-                # self.logger.info(f"准备播放语音: {text}")
-                
-                # 在线程中执行TTS，避免阻塞主线程
-                thread = threading.Thread(
-                    target=self._speak_text, 
-                    args=(text,)
-                )
-                thread.daemon = True
-                thread.start()
-                
-                self.tts_queue.task_done()
-            except Exception as e:
-                self.logger.error(f"处理TTS队列时出错: {e}")
-            await asyncio.sleep(0.1)
+            await asyncio.sleep(self.stats_interval)
+            self.logger.info(f"语音输出统计: {self.get_stats()}")
     
-    def _speak_text(self, text):
-        """使用TTS引擎播放文本"""
-        try:
-            self.logger.info(f"开始播放语音: {text}")
-            # 每次播放前重新初始化引擎
-            engine = pyttsx3.init()
-            # 设置语音属性
-            engine.setProperty('rate', 250)  # 语速
-            engine.setProperty('volume', 0.9)  # 音量
-            
-            # 尝试设置中文语音
-            voices = engine.getProperty('voices')
-            for voice in voices:
-                if 'chinese' in voice.name.lower() or 'zh' in voice.id.lower():
-                    engine.setProperty('voice', voice.id)
-                    break
-                    
-            engine.say(text)
-            engine.runAndWait()
-            # 使用完毕后停止引擎
-            engine.stop()
-            self.logger.info("语音播放完成")
-        except Exception as e:
-            self.logger.error(f"语音播放失败: {e}")
+    def _notify_speech_event(self, event: str, text: str):
+        """在合成线程中把开始/停止说话事件交给事件循环发送，通知听觉智能体避免把自己的声音当成用户说话"""
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._publish_speech_event(event, text), self._loop)
+    
+    async def _publish_speech_event(self, event: str, text: str):
+        """向听觉智能体发布开始/停止说话事件"""
+        message = MCPMessage(
+            message_type="speech_event",
+            sender_id=self.agent_id,
+            receiver_id="ear",
+            content={"event": event, "text": text}
+        )
+        await self.send_message("ear", message.to_dict())
     
     async def _handle_text_message(self, message: Dict[str, Any]):
         """处理文本消息（语音输出）"""
@@ -150,17 +99,28 @@ class MouthAgent(BaseAgent):
                 "content": text
             })
             
-            # 添加到TTS队列
-            await self.tts_queue.put(text)
+            # 交给合成线程排队播放
+            self.tts_worker.submit(text)
             
         except Exception as e:
             self.logger.error(f"处理文本消息时出错: {e}")
     
+    def get_stats(self) -> Dict[str, Any]:
+        """获取语音输出统计
+        
+        Returns:
+            待播放数、播放数、每段话的平均排队时间、首句音频延迟、合成和播放耗时(毫秒)，以及语音缓存命中率
+        """
+        return self.tts_worker.get_stats()
+    
     async def stop(self):
         """停止嘴巴智能体"""
-        # 等待TTS队列处理完成
-        if hasattr(self, 'tts_queue') and self.tts_queue:
-            await self.tts_queue.join()
+        if self._stats_task is not None:
+            self._stats_task.cancel()
+            await asyncio.gather(self._stats_task, return_exceptions=True)
+        # 播放完队列中剩余的语音
+        await asyncio.to_thread(self.tts_worker.close)
+        self.logger.info(f"语音输出统计: {self.get_stats()}")
         
         await super().stop()
         self.logger.info("嘴巴智能体已停止")
\ No newline at end of file
@@ -3,6 +3,7 @@
 """
 import asyncio
 import logging
+import time
 from typing import Dict, Any
 import ollama
 
@@ -23,6 +24,8 @@ class BrainAgent(BaseAgent):
         self.model_config = MODEL_CONFIG
         self.default_model = self.model_config["text"]["model"]
         self.context = []  # 对话上下文
+        self.last_warmup_time = 0.0  # 上次预热文本模型的时间
+        self.warmup_interval = 240.0  # 预热间隔(秒)，小于Ollama默认的5分钟模型保留时间
         
         # 检查图像模型是否支持多模态
         self.multimodal_support = self.model_config["image"].get("multimodal", False)
@@ -43,6 +46,11 @@ class BrainAgent(BaseAgent):
             text = message['content'].get('text', '')
             sender_id = message['sender_id']
             
+            # 流式识别的中间结果不进入对话，只用于提前准备
+            if message['content'].get('partial'):
+                self._warm_up_text_model()
+                return
+            
             # 添加到上下文
             self.context.append({"role": "user", "content": text})
             
@@ -69,6 +77,7 @@ class BrainAgent(BaseAgent):
                         await asyncio.sleep(1)  # 等待1秒后重试
                     
                 reply_text = response['message']['content']
+                self.last_warmup_time = time.monotonic()  # 模型刚被使用，仍在内存中
                 self.context.append({"role": "assistant", "content": reply_text})
                 
                 # 发送文本响应到嘴巴智能体
@@ -108,6 +117,21 @@ class BrainAgent(BaseAgent):
         except Exception as e:
             self.logger.error(f"Error processing text message: {e}")
     
+    def _warm_up_text_model(self):
+        """用户还在说话时在后台加载文本模型，避免最终结果到达时才冷启动"""
+        now = time.monotonic()
+        if now - self.last_warmup_time < self.warmup_interval:
+            return
+        self.last_warmup_time = now
+        asyncio.create_task(self._load_text_model())
+    
+    async def _load_text_model(self):
+        try:
+            # Ollama收到空提示时只把模型加载到内存
+            await asyncio.to_thread(self.ollama_client.generate, model=self.model_config["text"]["model"], prompt="")
+        except Exception as e:
+            self.logger.warning(f"预热文本模型失败: {e}")
+    
     async def _handle_image_message(self, message: Dict[str, Any]):
         """处理图像消息"""
         try:
@@ -0,0 +1,195 @@
+"""近似最近邻索引模块
+基于NumPy实现的倒排文件索引（IVF），用于大规模人脸特征库的快速检索
+"""
+import os
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class IVFIndex:
+    """倒排文件索引
+
+    用球面k-means把特征库划分为nlist个簇，查询时只在最相似的nprobe个簇内做精确比对。
+    索引只保存行号，特征向量始终从FaceGallery的矩阵中读取。
+    """
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 8, kmeans_iterations: int = 10,
+                 max_training_rows: int = 50000, seed: int = 0):
+        """
+        Args:
+            nlist: 簇数量，None表示按 sqrt(行数) 自动选择
+            nprobe: 查询时搜索的簇数量
+            kmeans_iterations: k-means迭代次数
+            max_training_rows: 训练时最多采样的行数
+            seed: 随机种子
+        """
+        self.logger = logging.getLogger("IVFIndex")
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.kmeans_iterations = kmeans_iterations
+        self.max_training_rows = max_training_rows
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._assignments = np.empty(0, dtype=np.int32)  # 每一行所属的簇
+        self._lists: List[List[int]] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        return int((self._assignments >= 0).sum())
+
+    def train(self, matrix: np.ndarray) -> None:
+        """在特征矩阵上训练簇中心并建立倒排表
+
+        Args:
+            matrix: 形状为(行数, 维度)的归一化特征矩阵
+        """
+        rows = matrix.shape[0]
+        nlist = self.nlist or max(1, int(np.sqrt(rows)))
+        nlist = min(nlist, rows)
+        rng = np.random.default_rng(self.seed)
+        sample = matrix[rng.choice(rows, min(rows, self.max_training_rows), replace=False)]
+
+        centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            labels = (sample @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # 空簇重新随机选取中心
+            sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        self.centroids = centroids.astype(np.float32)
+        self.trained_size = rows
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._lists = [[] for _ in range(nlist)]
+        self._list_arrays = [None] * nlist
+        self.add_rows(0, matrix)
+        self.logger.info(f"IVF索引训练完成: 行数={rows}, 簇数={nlist}")
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return (vectors @ self.centroids.T).argmax(axis=1).astype(np.int32)
+
+    def add_rows(self, first_row: int, vectors: np.ndarray) -> None:
+        """将连续的若干行加入索引
+
+        Args:
+            first_row: 第一行的行号
+            vectors: 这些行的归一化特征
+        """
+        if vectors.shape[0] == 0:
+            return
+        labels = self._assign(vectors)
+        end = first_row + vectors.shape[0]
+        if end > self._assignments.size:
+            grown = np.full(max(end, self._assignments.size * 2), -1, dtype=np.int32)
+            grown[:self._assignments.size] = self._assignments
+            self._assignments = grown
+        for row, label in zip(range(first_row, end), labels):
+            self._move(row, int(label))
+
+    def update_row(self, row: int, vector: np.ndarray) -> None:
+        """行的特征被更新后，重新分配所属的簇"""
+        if row >= self._assignments.size or self._assignments[row] < 0:
+            self.add_rows(row, vector[None, :])
+            return
+        self._move(row, int(self._assign(vector[None, :])[0]))
+
+    def _move(self, row: int, label: int) -> None:
+        previous = int(self._assignments[row])
+        if previous == label:
+            return
+        if previous >= 0:
+            self._lists[previous].remove(row)
+            self._list_arrays[previous] = None
+        self._lists[label].append(row)
+        self._list_arrays[label] = None
+        self._assignments[row] = label
+
+    def _list_array(self, label: int) -> np.ndarray:
+        array = self._list_arrays[label]
+        if array is None:
+            array = np.asarray(self._lists[label], dtype=np.int64)
+            self._list_arrays[label] = array
+        return array
+
+    def indexed_rows(self) -> int:
+        """已分配簇的最大行号+1，用于发现尚未加入索引的新行"""
+        assigned = np.nonzero(self._assignments >= 0)[0]
+        return int(assigned[-1]) + 1 if assigned.size else 0
+
+    def search(self, matrix: np.ndarray, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """近似搜索每个查询最相似的行
+
+        Args:
+            matrix: 特征库矩阵（与建立索引时的行号一致）
+            queries: 形状为(查询数, 维度)的归一化查询特征
+
+        Returns:
+            每个查询最相似的行号（无候选时为-1）和相似度
+        """
+        count = queries.shape[0]
+        rows = np.full(count, -1, dtype=np.int64)
+        similarities = np.zeros(count, dtype=np.float32)
+        nprobe = min(self.nprobe, self.centroids.shape[0])
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        for i in range(count):
+            candidates = np.concatenate([self._list_array(label) for label in probes[i]])
+            if candidates.size == 0:
+                continue
+            scores = matrix[candidates] @ queries[i]
+            best = int(scores.argmax())
+            rows[i] = candidates[best]
+            similarities[i] = scores[best]
+        return rows, similarities
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """复制当前索引状态，可交给其他线程写盘而不受后续增量更新影响"""
+        return {"centroids": self.centroids.copy(), "assignments": self._assignments.copy(),
+                "trained_size": np.int64(self.trained_size), "nprobe": np.int64(self.nprobe)}
+
+    @staticmethod
+    def write(path: str, snapshot: Dict[str, np.ndarray]) -> None:
+        """把索引状态写入磁盘（先写临时文件再原子替换）"""
+        temp_path = path + ".tmp.npz"
+        np.savez(temp_path, **snapshot)
+        os.replace(temp_path, path)
+
+    def save(self, path: str) -> None:
+        """保存索引到磁盘"""
+        if not self.is_trained:
+            return
+        self.write(path, self.snapshot())
+
+    def load(self, path: str) -> bool:
+        """从磁盘加载索引
+
+        Returns:
+            是否加载成功
+        """
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as data:
+                self.centroids = data["centroids"]
+                assignments = data["assignments"]
+                self.trained_size = int(data["trained_size"])
+            nlist = self.centroids.shape[0]
+            self._assignments = np.full(assignments.size, -1, dtype=np.int32)
+            self._lists = [[] for _ in range(nlist)]
+            self._list_arrays = [None] * nlist
+            for row in np.nonzero(assignments >= 0)[0]:
+                self._move(int(row), int(assignments[row]))
+            return True
+        except Exception as e:
+            self.logger.error(f"加载IVF索引失败: {e}")
+            self.centroids = None
+            return False
@@ -0,0 +1,258 @@
+"""语音识别后端模块
+统一的识别接口，支持在线的Google识别、离线的Vosk识别（可选依赖，支持流式中间结果）
+以及用于测试和基准测试的确定性桩后端
+"""
+import json
+import time
+import logging
+import hashlib
+from typing import Any, Dict, Optional
+
+import speech_recognition as sr
+
+
+class RecognitionStream:
+    """流式识别会话：说话过程中逐段送入音频，随时得到中间结果，语音结束后得到最终结果"""
+    def accept(self, audio: bytes) -> Optional[str]:
+        """送入一段音频
+
+        Returns:
+            当前的中间识别结果，没有变化时可返回None
+        """
+        raise NotImplementedError
+
+    def finish(self) -> Optional[str]:
+        """结束会话并返回最终结果"""
+        raise NotImplementedError
+
+
+class ASRBackend:
+    """语音识别后端基类
+
+    子类实现 _recognize()；支持流式识别的子类设置 streaming=True 并实现 _create_stream()。
+    基类统一统计每个后端的识别次数、失败次数和识别延迟（整段识别为调用耗时，
+    流式识别为语音结束后取最终结果的耗时）。所有方法都在线程中调用，可以阻塞。
+    """
+    name = "base"
+    streaming = False
+
+    def __init__(self):
+        self.logger = logging.getLogger(f"ASR:{self.name}")
+        self.recognitions = 0
+        self.failures = 0
+        self.average_latency_ms = 0.0
+
+    def transcribe(self, audio: bytes, sample_rate: int, sample_width: int = 2) -> Optional[str]:
+        """识别一整段音频
+
+        Returns:
+            识别出的文本，听不清时返回None；服务错误时抛出异常
+        """
+        start = time.perf_counter()
+        try:
+            return self._recognize(audio, sample_rate, sample_width)
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self._record_latency(start)
+
+    def create_stream(self, sample_rate: int) -> RecognitionStream:
+        """创建流式识别会话"""
+        return self._create_stream(sample_rate)
+
+    def finish_stream(self, stream: RecognitionStream) -> Optional[str]:
+        """结束流式识别会话并返回最终结果"""
+        start = time.perf_counter()
+        try:
+            return stream.finish()
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self._record_latency(start)
+
+    def _record_latency(self, start: float) -> None:
+        self.recognitions += 1
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.average_latency_ms += (latency_ms - self.average_latency_ms) / min(self.recognitions, 100)
+
+    def _recognize(self, audio: bytes, sample_rate: int, sample_width: int) -> Optional[str]:
+        raise NotImplementedError
+
+    def _create_stream(self, sample_rate: int) -> RecognitionStream:
+        raise NotImplementedError(f"{self.name} 不支持流式识别")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取识别统计
+
+        Returns:
+            后端名称、识别次数、失败次数和平均识别延迟(毫秒)
+        """
+        return {
+            "asr_backend": self.name,
+            "asr_recognitions": self.recognitions,
+            "asr_failures": self.failures,
+            "asr_latency_ms": round(self.average_latency_ms, 1)
+        }
+
+
+class GoogleASRBackend(ASRBackend):
+    """Google在线识别，服务错误时按配置重试"""
+    name = "google"
+
+    def __init__(self, language: str = "zh-CN", retry_count: int = 3, retry_delay: float = 1.0):
+        super().__init__()
+        self.recognizer = sr.Recognizer()
+        self.language = language
+        self.retry_count = retry_count
+        self.retry_delay = retry_delay
+
+    def _recognize(self, audio: bytes, sample_rate: int, sample_width: int) -> Optional[str]:
+        audio_data = sr.AudioData(audio, sample_rate, sample_width)
+        for attempt in range(self.retry_count):
+            try:
+                return self.recognizer.recognize_google(audio_data, language=self.language)
+            except sr.UnknownValueError:
+                return None
+            except sr.RequestError:
+                if attempt == self.retry_count - 1:
+                    raise
+                time.sleep(self.retry_delay)
+        return None
+
+
+class _VoskStream(RecognitionStream):
+    def __init__(self, recognizer, join_words: bool):
+        self.recognizer = recognizer
+        self.join_words = join_words
+        self.segments = []  # Vosk在句内停顿处给出的阶段性结果
+        self.partial = ""
+
+    def _text(self, words: str) -> str:
+        # 中文模型按字输出并以空格分隔
+        return words.replace(" ", "") if self.join_words else words
+
+    def _combined(self, tail: str) -> str:
+        separator = "" if self.join_words else " "
+        return separator.join(segment for segment in self.segments + [tail] if segment)
+
+    def accept(self, audio: bytes) -> Optional[str]:
+        if self.recognizer.AcceptWaveform(audio):
+            self.segments.append(self._text(json.loads(self.recognizer.Result()).get("text", "")))
+            partial = self._combined("")
+        else:
+            partial = self._combined(self._text(json.loads(self.recognizer.PartialResult()).get("partial", "")))
+        if partial == self.partial:
+            return None
+        self.partial = partial
+        return partial
+
+    def finish(self) -> Optional[str]:
+        text = self._combined(self._text(json.loads(self.recognizer.FinalResult()).get("text", "")))
+        return text or None
+
+
+class VoskASRBackend(ASRBackend):
+    """Vosk离线识别（需安装vosk并下载模型），支持流式中间结果"""
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path: str, language: str = "zh-CN"):
+        super().__init__()
+        import vosk
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model = vosk.Model(model_path)
+        self.join_words = language.lower().startswith(("zh", "ja"))
+
+    def _create_stream(self, sample_rate: int) -> RecognitionStream:
+        return _VoskStream(self._vosk.KaldiRecognizer(self.model, sample_rate), self.join_words)
+
+    def _recognize(self, audio: bytes, sample_rate: int, sample_width: int) -> Optional[str]:
+        stream = self._create_stream(sample_rate)
+        stream.accept(audio)
+        return stream.finish()
+
+
+class _StubStream(RecognitionStream):
+    def __init__(self, backend: "StubASRBackend", sample_rate: int):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        # 只维护增量摘要和字节数，每个音频块的开销与已接收的音频长度无关
+        self._digest = hashlib.sha1()
+        self._length = 0
+
+    def accept(self, audio: bytes) -> Optional[str]:
+        self._digest.update(audio)
+        self._length += len(audio)
+        return self.backend.transcript_for(self._digest.hexdigest(), self._length, self.sample_rate, 2)
+
+    def finish(self) -> Optional[str]:
+        if self.backend.delay:
+            time.sleep(self.backend.delay)
+        return self.backend.transcript_for(self._digest.hexdigest(), self._length, self.sample_rate, 2)
+
+
+class StubASRBackend(ASRBackend):
+    """确定性的桩后端，用于测试和基准测试
+
+    不做真实识别：结果只由音频内容决定，相同音频总是得到相同文本；
+    可在transcripts中按音频的SHA1摘要指定文本，并用delay模拟识别耗时。
+    """
+    name = "stub"
+
+    def __init__(self, delay: float = 0.0, streaming: bool = False,
+                 transcripts: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            delay: 模拟的识别耗时(秒)
+            streaming: 是否模拟流式识别
+            transcripts: 音频SHA1摘要到文本的映射
+        """
+        super().__init__()
+        self.delay = delay
+        self.streaming = streaming
+        self.transcripts = transcripts or {}
+
+    def transcript(self, audio: bytes, sample_rate: int, sample_width: int) -> str:
+        return self.transcript_for(hashlib.sha1(audio).hexdigest(), len(audio), sample_rate, sample_width)
+
+    def transcript_for(self, digest: str, length: int, sample_rate: int, sample_width: int) -> str:
+        """按音频的SHA1摘要和字节数得到文本"""
+        if digest in self.transcripts:
+            return self.transcripts[digest]
+        return f"测试语音{length / (sample_rate * sample_width):.1f}秒"
+
+    def _recognize(self, audio: bytes, sample_rate: int, sample_width: int) -> Optional[str]:
+        if self.delay:
+            time.sleep(self.delay)
+        return self.transcript(audio, sample_rate, sample_width)
+
+    def _create_stream(self, sample_rate: int) -> RecognitionStream:
+        return _StubStream(self, sample_rate)
+
+
+def create_asr_backend(backend: str = "google", language: str = "zh-CN", retry_count: int = 3,
+                       retry_delay: float = 1.0, vosk_model_path: Optional[str] = None,
+                       stub_delay: float = 0.0) -> ASRBackend:
+    """按配置创建语音识别后端
+
+    Args:
+        backend: "google"、"vosk" 或 "stub"
+        language: 识别语言
+        retry_count: Google识别的重试次数
+        retry_delay: Google识别的重试间隔(秒)
+        vosk_model_path: Vosk模型目录
+        stub_delay: 桩后端模拟的识别耗时(秒)
+
+    Returns:
+        识别后端实例
+    """
+    if backend == "google":
+        return GoogleASRBackend(language, retry_count, retry_delay)
+    if backend == "vosk":
+        return VoskASRBackend(vosk_model_path, language)
+    if backend == "stub":
+        return StubASRBackend(stub_delay)
+    raise ValueError(f"未知的语音识别后端: {backend}")
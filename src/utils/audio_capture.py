@@ -0,0 +1,213 @@
+"""音频采集模块
+专用线程持续读取音频源（麦克风或WAV回放）并写入固定大小的PCM环形缓冲区，同时在后台持续校准背景噪声；
+语音切分从缓冲区按读取位置消费音频，识别期间说的话不会丢失
+"""
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from src.utils.audio_source import AudioSource
+
+
+class PCMRingBuffer:
+    """固定大小的PCM环形缓冲区
+
+    写入位置单调递增（按字节计），读取方各自持有读取位置；读取方落后超过缓冲区容量时，
+    被覆盖的音频计为溢出并跳到最旧的可用数据。
+    blocking=True 时（尽可能快的文件回放）写入方等待唯一的读取方腾出空间，不丢弃音频。
+    """
+    def __init__(self, capacity: int, blocking: bool = False):
+        """
+        Args:
+            capacity: 缓冲区容量（字节）
+            blocking: 缓冲区满时写入是否等待读取
+        """
+        self.capacity = capacity
+        self.blocking = blocking
+        self._buffer = bytearray(capacity)
+        self._write_position = 0
+        self._read_position = 0
+        self._condition = threading.Condition()
+        self.closed = False
+        self.overrun_bytes = 0
+
+    @property
+    def write_position(self) -> int:
+        """累计写入的字节数"""
+        return self._write_position
+
+    def write(self, data: bytes) -> None:
+        """写入一段音频，唤醒等待的读取方"""
+        if len(data) > self.capacity:
+            data = data[-self.capacity:]
+        with self._condition:
+            if self.blocking:
+                self._condition.wait_for(
+                    lambda: self.closed or self._write_position + len(data) - self._read_position <= self.capacity)
+            start = self._write_position % self.capacity
+            first = min(len(data), self.capacity - start)
+            self._buffer[start:start + first] = data[:first]
+            self._buffer[:len(data) - first] = data[first:]
+            self._write_position += len(data)
+            self._condition.notify_all()
+
+    def read(self, position: int, size: int, timeout: Optional[float] = None) -> Tuple[bytes, int]:
+        """从指定位置读取音频，数据不足时阻塞等待
+
+        Args:
+            position: 读取位置
+            size: 读取字节数
+            timeout: 最长等待时间(秒)，None表示一直等待
+
+        Returns:
+            读到的音频和新的读取位置；缓冲区关闭或等待超时时返回已有的数据（可能为空）
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.closed or self._write_position >= position + size, timeout)
+            oldest = self._write_position - self.capacity
+            if position < oldest:
+                self.overrun_bytes += oldest - position
+                position = oldest
+            end = min(position + size, self._write_position)
+            if end <= position:
+                return b"", position
+            start = position % self.capacity
+            stop = start + (end - position)
+            if stop <= self.capacity:
+                data = bytes(self._buffer[start:stop])
+            else:
+                data = bytes(self._buffer[start:]) + bytes(self._buffer[:stop - self.capacity])
+            if self.blocking:
+                self._read_position = end
+                self._condition.notify_all()
+            return data, end
+
+    def close(self) -> None:
+        """关闭缓冲区，唤醒所有等待的读取方"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class AudioCapture:
+    """持续音频采集
+
+    采集线程只打开一次音频源并持续读取，出错时退避后重新打开；文件回放结束后关闭缓冲区。
+    每个音频块的能量用于更新背景噪声：低于噪声基底时快速下降，低于阈值时按指数滑动平均更新，
+    高于阈值时只极缓慢地上升；能量阈值 = 噪声基底 x energy_ratio，不再需要每次收听前花时间校准。
+    """
+    def __init__(self, source: AudioSource, buffer_seconds: float = 30.0, energy_ratio: float = 1.5,
+                 noise_adapt_rate: float = 0.05, min_energy_threshold: float = 100.0):
+        """
+        Args:
+            source: 音频源
+            buffer_seconds: 环形缓冲区可保存的音频时长(秒)
+            energy_ratio: 语音能量阈值与噪声基底的比例
+            noise_adapt_rate: 噪声基底的滑动平均系数
+            min_energy_threshold: 能量阈值下限
+        """
+        self.logger = logging.getLogger("AudioCapture")
+        self.source = source
+        self.sample_rate = source.sample_rate
+        self.sample_width = source.sample_width
+        self.energy_ratio = energy_ratio
+        self.noise_adapt_rate = noise_adapt_rate
+        self.min_energy_threshold = min_energy_threshold
+        # 实时音频和实时回放不能让读取方拖慢采集，尽可能快的回放则不能丢音频
+        self.buffer = PCMRingBuffer(int(buffer_seconds * self.sample_rate) * self.sample_width,
+                                    blocking=not source.realtime and not source.live)
+
+        self.noise_floor: Optional[float] = None
+        self.energy_threshold = min_energy_threshold
+        self._last_write = (0, time.monotonic())  # 最近一次写入后的写入位置和时间
+        self.reopen_count = 0
+        self.is_running = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def bytes_per_second(self) -> int:
+        return self.sample_rate * self.sample_width
+
+    def position_time(self, position: int) -> float:
+        """估算缓冲区中某个位置的音频被采集的时间（time.monotonic）"""
+        write_position, write_time = self._last_write
+        return write_time - (write_position - position) / self.bytes_per_second
+
+    def start(self) -> None:
+        """启动采集线程"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self._thread = threading.Thread(target=self._capture_thread, name="audio-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止采集线程并关闭缓冲区"""
+        self.is_running = False
+        self.buffer.close()
+        if self._thread is not None:
+            self._thread.join(2.0)
+
+    def _capture_thread(self) -> None:
+        retry_delay = 0.5
+        while self.is_running:
+            try:
+                if not self.source.open():
+                    raise RuntimeError(f"无法打开音频源 {self.source.name}")
+                self.logger.info(f"音频源 {self.source.name} 已打开，开始持续采集")
+                retry_delay = 0.5
+                while self.is_running:
+                    chunk = self.source.read()
+                    if chunk is None:
+                        self.logger.info(f"音频源 {self.source.name} 已播放完毕")
+                        self.is_running = False
+                        break
+                    self._process_chunk(chunk)
+            except Exception as e:
+                if not self.is_running:
+                    break
+                self.reopen_count += 1
+                self.logger.warning(f"音频读取错误，{retry_delay:.1f}秒后重新打开: {e}")
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 10.0)
+            finally:
+                self.source.release()
+        # 读取方读完剩余音频后结束
+        self.buffer.close()
+
+    def _process_chunk(self, chunk: bytes) -> None:
+        """写入缓冲区并更新背景噪声"""
+        self.buffer.write(chunk)
+        self._last_write = (self.buffer.write_position, time.monotonic())
+        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+        if samples.size == 0:
+            return
+        energy = float(np.sqrt(np.mean(np.square(samples))))
+        if self.noise_floor is None:
+            self.noise_floor = energy
+        elif energy < self.noise_floor:
+            # 更安静时快速下降，开头就是语音时也能很快找到真实的噪声基底
+            self.noise_floor += (energy - self.noise_floor) * 0.5
+        elif energy < self.energy_threshold:
+            self.noise_floor += (energy - self.noise_floor) * self.noise_adapt_rate
+        else:
+            # 持续的响亮环境噪声也会被缓慢吸收，避免一直被当作语音
+            self.noise_floor += (energy - self.noise_floor) * self.noise_adapt_rate * 0.02
+        self.energy_threshold = max(self.min_energy_threshold, self.noise_floor * self.energy_ratio)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取采集统计
+
+        Returns:
+            已采集时长、读取方溢出丢弃的时长、噪声基底、当前能量阈值和麦克风重新打开次数
+        """
+        return {
+            "captured_seconds": round(self.buffer.write_position / self.bytes_per_second, 1),
+            "overrun_seconds": round(self.buffer.overrun_bytes / self.bytes_per_second, 2),
+            "noise_floor": round(self.noise_floor or 0.0, 1),
+            "energy_threshold": round(self.energy_threshold, 1),
+            "reopen_count": self.reopen_count
+        }
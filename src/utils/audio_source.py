@@ -0,0 +1,304 @@
+"""音频源模块
+为听觉智能体提供统一的音频输入接口，支持麦克风、WAV文件和WAV目录回放以及外部推送的音频流（浏览器麦克风），
+所有音频与麦克风走同样的切分和识别路径，可在没有麦克风的机器上做基准测试和回归测试
+"""
+import os
+import time
+import wave
+import logging
+import threading
+from collections import deque
+from typing import Deque, List, Optional, Union
+
+import numpy as np
+import speech_recognition as sr
+
+WAV_EXTENSIONS = (".wav",)
+
+
+class AudioSource:
+    """音频源基类
+
+    输出16位单声道PCM音频块。子类实现 _open() 和 _read_chunk()，由基类负责节奏控制：
+    realtime=True 时按 speed 倍速输出（1.0为实时），realtime=False 时尽可能快地输出。
+    live=True 表示音频由硬件或外部按实时节奏产生（麦克风、推送流），读取方跟不上时只能丢弃。
+    """
+    live = False
+
+    def __init__(self, name: str, sample_rate: int = 16000, chunk_size: int = 1024,
+                 realtime: bool = True, speed: float = 1.0, loop: bool = False):
+        self.logger = logging.getLogger(f"AudioSource:{name}")
+        self.name = name
+        self.sample_rate = sample_rate
+        self.sample_width = 2
+        self.chunk_size = chunk_size
+        self.realtime = realtime
+        self.speed = speed
+        self.loop = loop
+        self.exhausted = False
+        self.chunks_read = 0
+        self._opened = False
+        self._next_chunk_time = None
+
+    @property
+    def chunk_seconds(self) -> float:
+        return self.chunk_size / self.sample_rate
+
+    def open(self) -> bool:
+        """打开音频源"""
+        self._opened = self._open()
+        self.exhausted = False
+        self._next_chunk_time = None
+        if not self._opened:
+            self.logger.error(f"无法打开音频源: {self.name}")
+        return self._opened
+
+    def read(self) -> Optional[bytes]:
+        """读取下一个音频块，音频源结束时返回None"""
+        if not self._opened or self.exhausted:
+            return None
+
+        chunk = self._read_chunk()
+        if chunk is None and self.loop and self.chunks_read > 0:
+            self._rewind()
+            chunk = self._read_chunk()
+        if chunk is None:
+            self.exhausted = True
+            return None
+
+        self.chunks_read += 1
+        self._pace()
+        return chunk
+
+    def _pace(self) -> None:
+        """实时模式下按倍速等待"""
+        if not self.realtime:
+            return
+        interval = self.chunk_seconds / self.speed
+        now = time.monotonic()
+        if self._next_chunk_time is None:
+            self._next_chunk_time = now
+        delay = self._next_chunk_time - now
+        if delay > 0:
+            time.sleep(delay)
+        self._next_chunk_time = max(self._next_chunk_time, now - interval) + interval
+
+    def release(self) -> None:
+        """释放音频源"""
+        self._release()
+        self._opened = False
+
+    def _open(self) -> bool:
+        raise NotImplementedError
+
+    def _read_chunk(self) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def _rewind(self) -> None:
+        pass
+
+    def _release(self) -> None:
+        pass
+
+
+class MicrophoneAudioSource(AudioSource):
+    """麦克风音频源，硬件本身按采样率阻塞，不再额外控制节奏"""
+    live = True
+
+    def __init__(self, device_index: Optional[int] = None, sample_rate: int = 16000, chunk_size: int = 1024):
+        super().__init__("microphone", sample_rate, chunk_size, realtime=False)
+        self.device_index = device_index
+        self.microphone = None
+        self.stream = None
+
+    def _open(self) -> bool:
+        self.microphone = sr.Microphone(device_index=self.device_index, sample_rate=self.sample_rate,
+                                        chunk_size=self.chunk_size)
+        self.stream = self.microphone.__enter__().stream
+        return self.stream is not None
+
+    def _read_chunk(self) -> Optional[bytes]:
+        return self.stream.read(self.chunk_size)
+
+    def _release(self) -> None:
+        if self.microphone is not None and self.stream is not None:
+            self.microphone.__exit__(None, None, None)
+        self.microphone = None
+        self.stream = None
+
+
+def load_wav(path: str, sample_rate: int = 16000) -> bytes:
+    """读取WAV文件并转换为指定采样率的16位单声道PCM
+
+    Args:
+        path: WAV文件路径
+        sample_rate: 目标采样率
+
+    Returns:
+        PCM音频
+    """
+    with wave.open(path, "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        data = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) * 256
+    elif width == 2:
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+    elif width == 4:
+        samples = np.frombuffer(data, dtype=np.int32).astype(np.float32) / 65536
+    else:
+        raise ValueError(f"不支持的采样宽度: {width}")
+    samples = samples.reshape(-1, channels).mean(axis=1)
+
+    if rate != sample_rate and samples.size:
+        # 线性插值重采样，对语音识别的输入已经足够
+        count = int(round(samples.size * sample_rate / rate))
+        samples = np.interp(np.arange(count) * rate / sample_rate, np.arange(samples.size), samples)
+    return np.clip(np.rint(samples), -32768, 32767).astype(np.int16).tobytes()
+
+
+class WavFileAudioSource(AudioSource):
+    """WAV文件音频源
+
+    文件末尾补上padding秒静音，使最后一句话也能被判定结束。
+    """
+    def __init__(self, path: str, sample_rate: int = 16000, chunk_size: int = 1024, realtime: bool = True,
+                 speed: float = 1.0, loop: bool = False, padding: float = 1.0):
+        super().__init__(os.path.basename(path), sample_rate, chunk_size, realtime, speed, loop)
+        self.path = path
+        self.padding = padding
+        self.audio = b""
+        self.position = 0
+
+    def _open(self) -> bool:
+        try:
+            self.audio = load_wav(self.path, self.sample_rate) + self._silence(self.padding)
+        except (OSError, EOFError, wave.Error, ValueError) as e:
+            self.logger.error(f"无法读取WAV文件 {self.path}: {e}")
+            return False
+        self.position = 0
+        return True
+
+    def _silence(self, seconds: float) -> bytes:
+        return bytes(int(seconds * self.sample_rate) * self.sample_width)
+
+    def _read_chunk(self) -> Optional[bytes]:
+        if self.position >= len(self.audio):
+            return None
+        chunk = self.audio[self.position:self.position + self.chunk_size * self.sample_width]
+        self.position += len(chunk)
+        return chunk
+
+    def _rewind(self) -> None:
+        self.position = 0
+
+
+class WavDirectoryAudioSource(WavFileAudioSource):
+    """WAV目录音频源，按文件名顺序依次回放目录中的每段话，开头和每段之后插入gap秒静音"""
+    def __init__(self, directory: str, sample_rate: int = 16000, chunk_size: int = 1024, realtime: bool = True,
+                 speed: float = 1.0, loop: bool = False, gap: float = 1.0):
+        super().__init__(directory, sample_rate, chunk_size, realtime, speed, loop, padding=gap)
+        self.name = os.path.basename(os.path.normpath(directory))
+        self.directory = directory
+        self.files: List[str] = []
+
+    def _open(self) -> bool:
+        if not os.path.isdir(self.directory):
+            return False
+        self.files = sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.lower().endswith(WAV_EXTENSIONS)
+        )
+        segments = [self._silence(self.padding)]
+        for path in self.files:
+            try:
+                segments.append(load_wav(path, self.sample_rate) + self._silence(self.padding))
+            except (OSError, EOFError, wave.Error, ValueError) as e:
+                self.logger.warning(f"无法读取WAV文件 {path}: {e}")
+        self.audio = b"".join(segments)
+        self.position = 0
+        return len(segments) > 1
+
+
+class StreamAudioSource(AudioSource):
+    """外部推送的实时音频流（例如浏览器麦克风）
+
+    push() 从任意线程调用且从不阻塞：排队的音频超过max_seconds时丢弃最旧的数据，
+    避免一个客户端的积压拖慢推送方或占用无限内存。close() 后读完剩余音频即结束。
+    """
+    live = True
+
+    def __init__(self, name: str, sample_rate: int = 16000, max_seconds: float = 5.0):
+        super().__init__(name, sample_rate, realtime=False)
+        self.max_bytes = int(max_seconds * sample_rate) * self.sample_width
+        self._chunks: Deque[bytes] = deque()
+        self._queued_bytes = 0
+        self._condition = threading.Condition()
+        self.closed = False
+        self.received_bytes = 0
+        self.dropped_bytes = 0
+
+    def push(self, data: bytes) -> None:
+        """推送一段16位单声道PCM音频"""
+        if len(data) % self.sample_width:
+            data = data[:-(len(data) % self.sample_width)]
+        if not data:
+            return
+        with self._condition:
+            if self.closed:
+                return
+            self._chunks.append(data)
+            self._queued_bytes += len(data)
+            self.received_bytes += len(data)
+            while self._queued_bytes > self.max_bytes:
+                dropped = self._chunks.popleft()
+                self._queued_bytes -= len(dropped)
+                self.dropped_bytes += len(dropped)
+            self._condition.notify()
+
+    def close(self) -> None:
+        """结束音频流"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def _open(self) -> bool:
+        # 已关闭的流打开后直接读到结束，不会被当作打开失败反复重试
+        return True
+
+    def _read_chunk(self) -> Optional[bytes]:
+        with self._condition:
+            self._condition.wait_for(lambda: self._chunks or self.closed)
+            if not self._chunks:
+                return None
+            chunk = self._chunks.popleft()
+            self._queued_bytes -= len(chunk)
+            return chunk
+
+
+def create_audio_source(source: Union[None, int, str, AudioSource] = None, sample_rate: int = 16000,
+                        chunk_size: int = 1024, realtime: bool = True, speed: float = 1.0,
+                        loop: bool = False) -> AudioSource:
+    """根据配置创建音频源
+
+    Args:
+        source: None或麦克风设备索引、WAV文件路径、WAV目录路径，或已创建的音频源
+        sample_rate: 输出采样率
+        chunk_size: 每块的采样数
+        realtime: 文件回放是否按时间节奏输出，False时尽可能快地输出
+        speed: 实时回放的倍速
+        loop: 文件回放结束后是否循环
+
+    Returns:
+        音频源实例
+    """
+    if isinstance(source, AudioSource):
+        return source
+    if source is None or isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        return MicrophoneAudioSource(None if source is None else int(source), sample_rate, chunk_size)
+    if os.path.isdir(source):
+        return WavDirectoryAudioSource(source, sample_rate, chunk_size, realtime, speed, loop)
+    return WavFileAudioSource(source, sample_rate, chunk_size, realtime, speed, loop)
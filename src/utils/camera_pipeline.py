@@ -0,0 +1,168 @@
+"""多摄像头管线模块
+每个帧源拥有独立的采集线程、人脸检测器和帧率控制器，并共享全局CPU预算
+"""
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from src.utils.face_recognition import FaceRecognition
+from src.utils.frame_rate import AdaptiveFrameRateController
+from src.utils.frame_source import FrameSource, CameraFrameSource
+
+
+class CameraPipeline:
+    """单个摄像头的采集与检测管线
+
+    采集线程持续读取帧源：实时源（摄像头、实时回放）只保留最新一帧，丢弃过期帧；
+    非实时源（尽可能快地回放）则阻塞等待消费，保证每一帧都被处理。
+    """
+    def __init__(self, camera_id: str, frame_source: FrameSource,
+                 frame_rate: AdaptiveFrameRateController, motion_threshold: float = 8.0):
+        self.logger = logging.getLogger(f"Camera:{camera_id}")
+        self.camera_id = camera_id
+        self.frame_source = frame_source
+        self.frame_rate = frame_rate
+        self.motion_threshold = motion_threshold
+        self.face_recognition = FaceRecognition()
+        self.last_analysis_time = 0  # 上次发送图像到大脑分析的时间
+        self.drop_stale = isinstance(frame_source, CameraFrameSource) or frame_source.realtime
+        self.dropped_frames = 0
+        self.is_running = False
+        self._frames: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._previous_thumbnail = None
+
+    def start(self) -> bool:
+        """打开帧源并启动采集线程，需在事件循环中调用"""
+        if not self.frame_source.open():
+            self.logger.error(f"Failed to open frame source: {self.frame_source.name}")
+            return False
+        self._loop = asyncio.get_running_loop()
+        self._frames = asyncio.Queue(maxsize=1)
+        self.is_running = True
+        self._thread = threading.Thread(target=self._capture_thread, name=f"capture-{self.camera_id}", daemon=True)
+        self._thread.start()
+        return True
+
+    async def stop(self) -> None:
+        """停止采集线程并释放帧源"""
+        self.is_running = False
+        if self._frames is not None:
+            self._put_latest(None)
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, 2.0)
+        self.frame_source.release()
+
+    async def next_frame(self) -> Optional[np.ndarray]:
+        """获取下一帧，帧源结束或管线停止时返回None"""
+        return await self._frames.get()
+
+    def _capture_thread(self) -> None:
+        while self.is_running:
+            try:
+                ret, frame = self.frame_source.read()
+            except Exception as e:
+                self.logger.error(f"读取帧失败: {e}")
+                ret, frame = False, None
+            if not ret:
+                if self.frame_source.exhausted:
+                    self.logger.info(f"帧源 {self.frame_source.name} 已播放完毕")
+                    self._deliver(None)
+                    return
+                time.sleep(0.05)
+                continue
+            self._deliver(frame)
+
+    def _deliver(self, frame: Optional[np.ndarray]) -> None:
+        if self.drop_stale:
+            self._loop.call_soon_threadsafe(self._put_latest, frame)
+            return
+        future = asyncio.run_coroutine_threadsafe(self._frames.put(frame), self._loop)
+        while self.is_running:
+            try:
+                future.result(timeout=0.5)
+                return
+            except concurrent.futures.TimeoutError:
+                continue
+        future.cancel()
+
+    def _put_latest(self, frame: Optional[np.ndarray]) -> None:
+        """在事件循环线程中放入帧，队列已满时丢弃旧帧"""
+        if self._frames.full():
+            stale = self._frames.get_nowait()
+            if stale is None:
+                # 保留结束标记
+                self._frames.put_nowait(stale)
+                return
+            self.dropped_frames += 1
+        self._frames.put_nowait(frame)
+
+    def detect_motion(self, frame: np.ndarray) -> bool:
+        """通过缩略灰度图的帧差检测场景运动
+
+        Args:
+            frame: 当前帧，OpenCV格式（BGR）
+
+        Returns:
+            是否检测到运动
+        """
+        thumbnail = cv2.cvtColor(cv2.resize(frame, (64, 48), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        previous = self._previous_thumbnail
+        self._previous_thumbnail = thumbnail
+        if previous is None:
+            return False
+        return float(cv2.absdiff(thumbnail, previous).mean()) >= self.motion_threshold
+
+    def get_stats(self) -> Dict[str, object]:
+        """获取该摄像头的帧率统计"""
+        stats = self.frame_rate.get_stats()
+        stats["camera_id"] = self.camera_id
+        stats["dropped_frames"] = self.dropped_frames
+        stats.update(self.face_recognition.get_overlay_stats())
+        return stats
+
+
+class CpuBudget:
+    """全局CPU预算
+
+    按各摄像头的单帧处理耗时，用注水法在摄像头之间分配帧率上限：
+    需求低于平均份额的摄像头只拿所需，剩余预算分给其他摄像头。
+    """
+    def __init__(self, cpu_seconds_per_second: float = 1.0):
+        """
+        Args:
+            cpu_seconds_per_second: 所有摄像头每秒可用的处理时间（秒），1.0约等于一个CPU核心
+        """
+        self.budget = cpu_seconds_per_second
+
+    def rebalance(self, controllers: Dict[str, AdaptiveFrameRateController]) -> Dict[str, float]:
+        """重新分配各摄像头的帧率上限
+
+        Args:
+            controllers: 摄像头ID到帧率控制器的映射
+
+        Returns:
+            摄像头ID到帧率上限的映射
+        """
+        demands = []
+        for camera_id, controller in controllers.items():
+            cost = max(controller.processing_time, 1e-3)
+            demands.append((controller.desired_fps * cost, cost, camera_id))
+        demands.sort()
+
+        caps = {}
+        remaining = self.budget
+        for i, (need, cost, camera_id) in enumerate(demands):
+            share = remaining / (len(demands) - i)
+            grant = min(need, share)
+            remaining -= grant
+            caps[camera_id] = grant / cost
+            controllers[camera_id].fps_cap = caps[camera_id]
+        return caps
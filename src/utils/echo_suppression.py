@@ -0,0 +1,117 @@
+"""自回声抑制模块
+嘴巴播放语音时听觉会录到机器人自己的声音。按嘴巴发布的开始/停止说话事件屏蔽播放期间的语音段，
+并把识别结果与最近说过的话做文本相似度比较，过滤漏网的回声（例如混响或事件延迟造成的）
+"""
+import re
+import time
+import difflib
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+# 比较时忽略的标点和空白
+_IGNORED = re.compile(r"[\s\W_]+", re.UNICODE)
+# 说过的话按句末标点拆成句子，回声常常只是其中一句
+_SENTENCE_BREAK = re.compile(r"[。！？!?；;…\n]+")
+
+
+def normalize_text(text: str) -> str:
+    return _IGNORED.sub("", text).lower()
+
+
+class EchoSuppressor:
+    """自回声抑制
+
+    嘴巴说话期间（直到停止后再过tail秒）开始的语音段在识别前直接丢弃；
+    识别出的文本与最近recent_seconds内说过的某段话或其中某一句的相似度（SequenceMatcher.ratio，
+    双向对称）达到similarity时视为回声。短于min_chars的文本不做比较，
+    避免“好”“是的”这类简短回答因为字出现在机器人说过的话里而被当成回声丢弃。
+    """
+    def __init__(self, gate: bool = True, tail: float = 0.5, similarity: float = 0.8,
+                 recent_seconds: float = 30.0, min_chars: int = 4, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            gate: 是否屏蔽嘴巴说话期间开始的语音段（关闭后允许插话，只靠文本比较过滤回声）
+            tail: 嘴巴停止说话后继续屏蔽的时长(秒)，覆盖扬声器余音和房间混响
+            similarity: 识别文本与最近说过的某段话或其中某一句的相似度达到该值时视为回声
+            recent_seconds: 参与文本比较的最近说过的话的时间范围(秒)
+            min_chars: 识别文本（去掉标点和空白后）至少有该字数才做回声比较
+            clock: 计时函数
+        """
+        self.gate = gate
+        self.tail = tail
+        self.similarity = similarity
+        self.recent_seconds = recent_seconds
+        self.min_chars = min_chars
+        self.clock = clock
+        self._speaking = 0  # 正在播放的语音数
+        self._speaking_since: Optional[float] = None
+        self._speaking_until: Optional[float] = None
+        self._recent: Deque[Tuple[Tuple[str, ...], float]] = deque(maxlen=20)
+
+        self.gated = 0
+        self.echo_suppressed = 0
+
+    def speaking_started(self, text: str) -> None:
+        """嘴巴开始说话"""
+        now = self.clock()
+        if self._speaking == 0:
+            self._speaking_since = now
+        self._speaking += 1
+        sentences = [normalize_text(sentence) for sentence in _SENTENCE_BREAK.split(text)]
+        candidates = {sentence for sentence in sentences if sentence}
+        normalized = normalize_text(text)
+        if normalized:
+            candidates.add(normalized)
+            self._recent.append((tuple(candidates), now))
+
+    def speaking_stopped(self) -> None:
+        """嘴巴说完一句话"""
+        self._speaking = max(0, self._speaking - 1)
+        if self._speaking == 0:
+            self._speaking_until = self.clock()
+
+    @property
+    def is_speaking(self) -> bool:
+        """嘴巴正在说话或仍在余音时间内"""
+        if self._speaking > 0:
+            return True
+        return self._speaking_until is not None and self.clock() < self._speaking_until + self.tail
+
+    def should_gate(self, speech_start_time: float) -> bool:
+        """语音段是否在嘴巴说话期间开始，需要在识别前丢弃
+
+        Args:
+            speech_start_time: 语音段开始的采集时间（time.monotonic）
+        """
+        if not self.gate or self._speaking_since is None:
+            return False
+        if self._speaking > 0:
+            gated = speech_start_time >= self._speaking_since - self.tail
+        else:
+            gated = self._speaking_since - self.tail <= speech_start_time <= self._speaking_until + self.tail
+        self.gated += int(gated)
+        return gated
+
+    def is_echo(self, transcript: str) -> bool:
+        """识别出的文本是否是最近说过的话的回声"""
+        normalized = normalize_text(transcript)
+        if len(normalized) < self.min_chars:
+            return False
+        now = self.clock()
+        for candidates, spoken_at in self._recent:
+            if now - spoken_at > self.recent_seconds:
+                continue
+            for spoken in candidates:
+                if difflib.SequenceMatcher(None, normalized, spoken, autojunk=False).ratio() >= self.similarity:
+                    self.echo_suppressed += 1
+                    return True
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取抑制统计
+
+        Returns:
+            说话期间被屏蔽的语音段数和按文本相似度过滤的回声数
+        """
+        return {"gated_utterances": self.gated, "echo_suppressed": self.echo_suppressed,
+                "suppressed_utterances": self.gated + self.echo_suppressed}
@@ -0,0 +1,238 @@
+"""特征压缩模块
+用PCA把高维HOG特征投影到低维空间并量化为float16或int8，在压缩空间中粗排，
+再用全精度特征对前k个候选精排
+"""
+import os
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# 支持的量化类型
+QUANTIZATION_TYPES = ("float16", "int8")
+
+
+class EmbeddingCompressor:
+    """PCA投影加标量量化
+
+    输入为L2归一化的特征，投影前减去均值；int8量化按每个主成分的最大绝对值缩放到[-127, 127]。
+    """
+    def __init__(self, components: int = 256, dtype: str = "int8", max_training_rows: int = 20000,
+                 seed: int = 0):
+        """
+        Args:
+            components: 保留的主成分数量
+            dtype: 量化类型，"float16" 或 "int8"
+            max_training_rows: 拟合时最多采样的行数
+            seed: 随机种子
+        """
+        if dtype not in QUANTIZATION_TYPES:
+            raise ValueError(f"未知的量化类型: {dtype}")
+        self.components = components
+        self.dtype = dtype
+        self.max_training_rows = max_training_rows
+        self.seed = seed
+        self.mean: Optional[np.ndarray] = None
+        self.basis: Optional[np.ndarray] = None  # 形状为(主成分数, 原始维度)
+        self.scale: Optional[np.ndarray] = None  # int8量化的每维缩放系数
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.basis is not None
+
+    @property
+    def code_dtype(self) -> np.dtype:
+        return np.dtype(np.int8 if self.dtype == "int8" else np.float16)
+
+    def fit(self, matrix: np.ndarray) -> None:
+        """在特征矩阵的采样上拟合PCA投影和量化系数"""
+        rows = matrix.shape[0]
+        rng = np.random.default_rng(self.seed)
+        sample = np.asarray(matrix[np.sort(rng.choice(rows, min(rows, self.max_training_rows), replace=False))],
+                            dtype=np.float32)
+        self.mean = sample.mean(axis=0)
+        centered = sample - self.mean
+        # 样本数小于维度时SVD的代价为O(样本数^2 x 维度)
+        _, _, vt = np.linalg.svd(centered, full_matrices=False)
+        self.basis = np.ascontiguousarray(vt[:min(self.components, vt.shape[0])], dtype=np.float32)
+        projected = centered @ self.basis.T
+        peak = np.abs(projected).max(axis=0)
+        self.scale = np.where(peak > 0, 127.0 / np.maximum(peak, 1e-12), 1.0).astype(np.float32)
+
+    def project(self, vectors: np.ndarray) -> np.ndarray:
+        """投影到主成分空间（float32）"""
+        return (np.asarray(vectors, dtype=np.float32) - self.mean) @ self.basis.T
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """投影并量化"""
+        projected = self.project(vectors)
+        if self.dtype == "int8":
+            return np.clip(np.rint(projected * self.scale), -127, 127).astype(np.int8)
+        return projected.astype(np.float16)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """反量化为主成分空间中的float32向量"""
+        codes = codes.astype(np.float32)
+        return codes / self.scale if self.dtype == "int8" else codes
+
+
+class CompressedIndex:
+    """压缩特征索引
+
+    与FaceGallery行号一一对应地保存量化后的低维特征。查询时先在低维空间按欧氏距离粗排，
+    再对前rerank_k个候选用全精度特征计算余弦相似度。不精排时返回由低维距离估计的相似度，
+    投影丢弃的残差会使估计值略微偏高。
+    """
+    def __init__(self, components: int = 256, dtype: str = "int8", rerank_k: int = 10,
+                 chunk_rows: int = 65536):
+        """
+        Args:
+            components: 保留的主成分数量
+            dtype: 量化类型，"float16" 或 "int8"
+            rerank_k: 用全精度特征精排的候选数量，0表示不精排
+            chunk_rows: 粗排时每次反量化的行数，限制临时内存
+        """
+        self.logger = logging.getLogger("CompressedIndex")
+        self.compressor = EmbeddingCompressor(components, dtype)
+        self.rerank_k = rerank_k
+        self.chunk_rows = chunk_rows
+        self.trained_size = 0
+        self.size = 0
+        self._codes: Optional[np.ndarray] = None
+        self._norms = np.empty(0, dtype=np.float32)  # 反量化后向量的平方范数
+
+    @property
+    def is_trained(self) -> bool:
+        return self.compressor.is_fitted
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        """压缩特征占用的内存（字节）"""
+        if self._codes is None:
+            return 0
+        return int(self._codes[:self.size].nbytes + self._norms[:self.size].nbytes)
+
+    def train(self, matrix: np.ndarray) -> None:
+        """拟合压缩器并压缩全部行"""
+        self.compressor.fit(matrix)
+        self.trained_size = matrix.shape[0]
+        self.size = 0
+        self._codes = np.empty((0, self.compressor.basis.shape[0]), dtype=self.compressor.code_dtype)
+        self._norms = np.empty(0, dtype=np.float32)
+        for start in range(0, matrix.shape[0], self.chunk_rows):
+            self.add_rows(start, matrix[start:start + self.chunk_rows])
+        self.logger.info(f"特征压缩完成: 行数={self.size}, 主成分数={self.compressor.basis.shape[0]}, "
+                         f"量化={self.compressor.dtype}, 内存={self.nbytes / 1024 / 1024:.1f}MB")
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows <= self._codes.shape[0]:
+            return
+        capacity = max(rows, self._codes.shape[0] * 2, 64)
+        codes = np.empty((capacity, self._codes.shape[1]), dtype=self._codes.dtype)
+        norms = np.empty(capacity, dtype=np.float32)
+        codes[:self.size] = self._codes[:self.size]
+        norms[:self.size] = self._norms[:self.size]
+        self._codes, self._norms = codes, norms
+
+    def add_rows(self, first_row: int, vectors: np.ndarray) -> None:
+        """压缩并写入连续的若干行"""
+        if vectors.shape[0] == 0:
+            return
+        end = first_row + vectors.shape[0]
+        self._ensure_capacity(end)
+        codes = self.compressor.encode(vectors)
+        self._codes[first_row:end] = codes
+        self._norms[first_row:end] = np.square(self.compressor.decode(codes)).sum(axis=1)
+        self.size = max(self.size, end)
+
+    def update_row(self, row: int, vector: np.ndarray) -> None:
+        """行的特征被更新后重新压缩"""
+        self.add_rows(row, vector[None, :])
+
+    def search(self, queries: np.ndarray, matrix: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """搜索每个查询最相似的行
+
+        Args:
+            queries: 形状为(查询数, 维度)的归一化查询特征
+            matrix: 全精度特征矩阵，用于精排；None表示只用压缩特征
+
+        Returns:
+            每个查询最相似的行号和相似度
+        """
+        count = queries.shape[0]
+        projected = self.compressor.project(queries)
+        if self.compressor.dtype == "int8":
+            weights = projected / self.compressor.scale  # code·(q/scale) 等于 反量化向量·q
+        else:
+            weights = projected
+        query_norms = np.square(projected).sum(axis=1)
+
+        # 低维空间的平方欧氏距离 = |q|^2 + |x|^2 - 2 q·x，逐块计算避免一次反量化全部行
+        distances = np.empty((self.size, count), dtype=np.float32)
+        for start in range(0, self.size, self.chunk_rows):
+            end = min(start + self.chunk_rows, self.size)
+            dots = self._codes[start:end].astype(np.float32) @ weights.T
+            distances[start:end] = self._norms[start:end, None] - 2 * dots
+        distances += query_norms[None, :]
+
+        rerank_k = min(self.rerank_k, self.size) if matrix is not None else 0
+        if rerank_k <= 0:
+            rows = distances.argmin(axis=0)
+            best = distances[rows, np.arange(count)]
+            # 两个单位向量的余弦相似度 = 1 - 距离^2 / 2
+            return rows.astype(np.int64), np.clip(1.0 - best / 2, 0.0, 1.0).astype(np.float32)
+
+        candidates = np.argpartition(distances, rerank_k - 1, axis=0)[:rerank_k].T  # (查询数, k)
+        scores = np.einsum("qkd,qd->qk", matrix[candidates.reshape(-1)].reshape(count, rerank_k, -1), queries)
+        best = scores.argmax(axis=1)
+        rows = candidates[np.arange(count), best]
+        return rows.astype(np.int64), np.clip(scores[np.arange(count), best], 0.0, 1.0).astype(np.float32)
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """复制当前的压缩器和压缩特征，可交给其他线程写盘而不受后续增量更新影响"""
+        compressor = self.compressor
+        return {"mean": compressor.mean, "basis": compressor.basis, "scale": compressor.scale,
+                "dtype": np.array(compressor.dtype), "codes": self._codes[:self.size].copy(),
+                "norms": self._norms[:self.size].copy(), "trained_size": np.int64(self.trained_size)}
+
+    @staticmethod
+    def write(path: str, snapshot: Dict[str, np.ndarray]) -> None:
+        """把压缩特征写入磁盘（先写临时文件再原子替换）"""
+        temp_path = path + ".tmp.npz"
+        np.savez(temp_path, **snapshot)
+        os.replace(temp_path, path)
+
+    def save(self, path: str) -> None:
+        """保存压缩器和压缩特征"""
+        if not self.is_trained:
+            return
+        self.write(path, self.snapshot())
+
+    def load(self, path: str) -> bool:
+        """从磁盘加载压缩器和压缩特征
+
+        Returns:
+            是否加载成功（量化类型与当前配置不一致时视为失败）
+        """
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as data:
+                if str(data["dtype"]) != self.compressor.dtype or data["basis"].shape[0] > self.compressor.components:
+                    self.logger.info("压缩特征的配置已改变，将重新拟合")
+                    return False
+                self.compressor.mean = data["mean"]
+                self.compressor.basis = data["basis"]
+                self.compressor.scale = data["scale"]
+                self._codes = data["codes"]
+                self._norms = data["norms"]
+                self.trained_size = int(data["trained_size"])
+            self.size = self._codes.shape[0]
+            return True
+        except Exception as e:
+            self.logger.error(f"加载压缩特征失败: {e}")
+            self.compressor.basis = None
+            return False
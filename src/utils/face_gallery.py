@@ -0,0 +1,231 @@
+"""人脸特征库模块
+将所有人脸特征保存为一个连续的、预先归一化的float32矩阵，用矩阵乘法一次完成匹配
+"""
+import io
+import os
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class FaceGallery:
+    """人脸特征矩阵
+
+    每一行是一个L2归一化的特征向量，ids记录每行所属的人物ID。
+    矩阵按容量倍增的方式增长，添加和更新都是O(1)的原地写入。
+    指定path时矩阵保存在.npy文件中并以内存映射方式打开，启动时无需解析和拷贝特征，
+    只有实际访问的页面才会被读入内存。
+    映射文件的扩容（释放旧映射后延长文件并重新映射）与写回（可能在写入线程中调用）由同一把锁串行化。
+    """
+    def __init__(self, initial_capacity: int = 64, path: Optional[str] = None):
+        """
+        Args:
+            initial_capacity: 初始容量（行数）
+            path: 内存映射的.npy文件路径，None表示只保存在内存中
+        """
+        self.logger = logging.getLogger("FaceGallery")
+        self.dim: Optional[int] = None
+        self.size = 0
+        self.path = path
+        self._capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._ids = np.empty(initial_capacity, dtype=np.int64)
+        self._map_lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self._matrix = np.load(path, mmap_mode="r+")
+            self._capacity, self.dim = self._matrix.shape
+            self._ids = np.full(self._capacity, -1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """有效部分的特征矩阵视图，形状为(行数, 维度)"""
+        if self._matrix is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self._matrix[:self.size]
+
+    @property
+    def capacity(self) -> int:
+        """已分配的行数（映射文件中的行数）"""
+        return self._capacity
+    
+    @property
+    def ids(self) -> np.ndarray:
+        """每一行对应的人物ID"""
+        return self._ids[:self.size]
+
+    @staticmethod
+    def normalize(encoding: np.ndarray) -> np.ndarray:
+        """展平并L2归一化为float32向量"""
+        vector = np.asarray(encoding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if self._matrix is not None and rows <= self._capacity:
+            return
+        capacity = max(self._capacity, 1)
+        while capacity < rows:
+            capacity *= 2
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[:self.size] = self._ids[:self.size]
+        if self.path is None:
+            matrix = np.empty((capacity, self.dim), dtype=np.float32)
+            if self._matrix is not None:
+                matrix[:self.size] = self._matrix[:self.size]
+        else:
+            matrix = self._grow_mapped(capacity)
+        self._matrix, self._ids, self._capacity = matrix, ids, capacity
+    
+    def _grow_mapped(self, capacity: int) -> np.ndarray:
+        """扩容映射文件
+        
+        .npy文件头为行数预留了空间，通常只需延长文件并改写文件头中的形状，已有的行无需拷贝；
+        文件头长度发生变化时才创建更大的文件，拷贝已有行后原子替换旧文件。
+        """
+        with self._map_lock:
+            if self._matrix is not None and self._extend_mapped(capacity):
+                return self._matrix
+            temp_path = self.path + ".tmp.npy"
+            matrix = np.lib.format.open_memmap(temp_path, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+            if self._matrix is not None:
+                matrix[:self.size] = self._matrix[:self.size]
+            matrix.flush()
+            # 替换前释放旧的映射（Windows下无法替换仍被映射的文件），持锁期间写入线程不会再引用旧映射
+            del matrix
+            self._matrix = None
+            os.replace(temp_path, self.path)
+            self._matrix = np.load(self.path, mmap_mode="r+")
+            return self._matrix
+    
+    def _extend_mapped(self, capacity: int) -> bool:
+        """原地延长映射文件（调用方持有映射锁）
+        
+        先延长文件再改写文件头，中途退出时文件头记录的仍是旧形状，多出的部分被忽略。
+        
+        Returns:
+            是否成功原地扩容；新文件头与旧文件头长度不同时返回False
+        """
+        offset = self._matrix.offset
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+            "fortran_order": False,
+            "shape": (capacity, self.dim)
+        })
+        if len(header.getvalue()) != offset:
+            return False
+        # 延长前释放旧的映射（Windows下无法改变仍被映射的文件的大小）
+        self._matrix.flush()
+        self._matrix = None
+        with open(self.path, "r+b") as f:
+            f.truncate(offset + capacity * self.dim * np.dtype(np.float32).itemsize)
+            f.write(header.getvalue())
+        self._matrix = np.load(self.path, mmap_mode="r+")
+        return True
+    
+    def snapshot(self, rows: int) -> np.ndarray:
+        """复制前rows行特征（可在其他线程中调用，与扩容互斥）"""
+        with self._map_lock:
+            if self._matrix is None:
+                return np.empty((0, self.dim or 0), dtype=np.float32)
+            return np.array(self._matrix[:rows])
+    
+    def restore(self, rows: np.ndarray, person_ids: np.ndarray) -> None:
+        """根据持久化的行号映射恢复已打开的映射文件中的有效行
+        
+        Args:
+            rows: 行号数组
+            person_ids: 每行对应的人物ID
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        person_ids = np.asarray(person_ids, dtype=np.int64)
+        if rows.size == 0:
+            return
+        self.size = int(rows.max()) + 1
+        # 未被任何人物引用的行（例如写入特征后未提交映射即退出）清零，永远不会匹配
+        referenced = np.zeros(self.size, dtype=bool)
+        referenced[rows] = True
+        self._matrix[:self.size][~referenced] = 0.0
+        self._ids[:self.size] = -1
+        self._ids[rows] = person_ids
+    
+    def flush(self) -> None:
+        """将映射文件中修改过的页面写回磁盘（可能在写入线程中调用，与扩容互斥）"""
+        with self._map_lock:
+            if self.path is not None and self._matrix is not None:
+                self._matrix.flush()
+    
+    def close(self) -> None:
+        """写回并释放映射文件"""
+        with self._map_lock:
+            if self.path is not None and self._matrix is not None:
+                self._matrix.flush()
+            self._matrix = None
+
+    def add(self, person_id: int, encoding: np.ndarray) -> Optional[int]:
+        """添加一行特征
+
+        Args:
+            person_id: 人物ID
+            encoding: 人脸特征向量
+
+        Returns:
+            新行的行号；维度与特征库不一致时返回None
+        """
+        vector = self.normalize(encoding)
+        if self.dim is None:
+            self.dim = vector.size
+        elif vector.size != self.dim:
+            self.logger.warning(f"特征维度不匹配: {vector.size} vs {self.dim}，已跳过人物ID {person_id}")
+            return None
+        self._ensure_capacity(self.size + 1)
+        row = self.size
+        self._matrix[row] = vector
+        self._ids[row] = person_id
+        self.size += 1
+        return row
+
+    def update(self, row: int, encoding: np.ndarray) -> bool:
+        """原地替换一行特征"""
+        vector = self.normalize(encoding)
+        if vector.size != self.dim or not 0 <= row < self.size:
+            return False
+        self._matrix[row] = vector
+        return True
+
+    @staticmethod
+    def normalize_queries(queries: np.ndarray) -> np.ndarray:
+        """将一个或多个查询特征转换为(查询数, 维度)的归一化float32矩阵"""
+        queries = np.asarray(queries, dtype=np.float32)
+        queries = queries.reshape(1, -1) if queries.ndim == 1 else queries.reshape(queries.shape[0], -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        return np.divide(queries, norms, out=np.zeros_like(queries), where=norms > 0)
+
+    def search(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """对一个或多个查询特征做精确的余弦相似度搜索
+
+        Args:
+            queries: 形状为(维度,)或(查询数, 维度)的特征
+
+        Returns:
+            每个查询最相似的行号和相似度（均为长度等于查询数的数组）；特征库为空时行号为-1
+        """
+        queries = self.normalize_queries(queries)
+        count = queries.shape[0]
+        if self.size == 0 or queries.shape[1] != self.dim:
+            return np.full(count, -1, dtype=np.int64), np.zeros(count, dtype=np.float32)
+
+        # (行数, 维度) x (维度, 查询数) -> 每列取最大值
+        similarities = self.matrix @ queries.T
+        rows = similarities.argmax(axis=0)
+        best = similarities[rows, np.arange(count)]
+        return rows.astype(np.int64), np.clip(best, 0.0, 1.0)
+
+    def person_ids(self, rows: np.ndarray) -> List[Optional[int]]:
+        """将行号转换为人物ID，-1或未被引用的行转换为None"""
+        return [int(self._ids[row]) if row >= 0 and self._ids[row] >= 0 else None for row in rows]
@@ -7,7 +7,11 @@ import numpy as np
 import logging
 from typing import List, Tuple, Optional, Dict, Any
 import io
-from PIL import Image, ImageDraw, ImageFont
+
+from src.utils.overlay_renderer import OverlayRenderer
+
+# 人脸特征提取参数：人脸统一缩放到该尺寸后计算HOG特征
+FACE_SIZE = 128
 
 class FaceRecognition:
     """人脸识别类
@@ -18,19 +22,24 @@ class FaceRecognition:
         # 加载人脸检测器
         self.logger.info("加载人脸检测器")
         self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        # HOG描述子只创建一次，所有人脸复用
+        self.hog = cv2.HOGDescriptor((FACE_SIZE, FACE_SIZE), (16, 16), (8, 8), (8, 8), 9)
+        self.encoding_size = self.hog.getDescriptorSize()
+        # 叠加渲染器在首次绘制时创建（工作进程中只做检测，不需要加载字体）
+        self._overlay = None
         self.logger.info("人脸识别模块初始化完成")
     
     def detect_faces(self, image: np.ndarray) -> List[Tuple[int, int, int, int]]:
         """检测图像中的人脸
         
         Args:
-            image: 输入图像，OpenCV格式（BGR）
+            image: 输入图像，OpenCV格式（BGR）或灰度图像
             
         Returns:
             人脸边界框列表，每个边界框为(x, y, w, h)格式
         """
         # 转换为灰度图像
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         # self.logger.info("转换为灰度图像")
         # 检测人脸
         faces = self.face_cascade.detectMultiScale(
@@ -47,32 +56,53 @@ class FaceRecognition:
         """提取人脸特征向量
         
         Args:
-            image: 输入图像，OpenCV格式（BGR）
+            image: 输入图像，OpenCV格式（BGR）或灰度图像
             face_location: 人脸边界框，(x, y, w, h)格式
             
         Returns:
             人脸特征向量
         """
-        # 提取人脸区域
-        x, y, w, h = face_location
-        face_image = image[y:y+h, x:x+w]
+        return self.extract_face_encodings(image, [face_location])[0]
+    
+    def extract_face_encodings(self, image: np.ndarray, face_locations) -> np.ndarray:
+        """批量提取一帧中所有人脸的特征向量
         
-        # 调整大小为固定尺寸
-        face_image = cv2.resize(face_image, (128, 128))
+        所有人脸缩放后纵向拼接为一张图（每个人脸上下各留一行镜像边界，
+        保证梯度与单独计算时一致），由缓存的HOG描述子一次计算全部特征，
+        再整体做L2归一化。
         
-        # 转换为灰度图像
-        gray = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY)
+        Args:
+            image: 输入图像，OpenCV格式（BGR）或灰度图像
+            face_locations: 人脸边界框列表，每个为(x, y, w, h)格式
+            
+        Returns:
+            形状为(人脸数, 特征维度)的连续float32矩阵，每行已L2归一化
+        """
+        count = len(face_locations)
+        if count == 0:
+            return np.empty((0, self.encoding_size), dtype=np.float32)
         
-        # 使用HOG特征作为人脸编码
-        # 计算HOG特征
-        hog = cv2.HOGDescriptor((128, 128), (16, 16), (8, 8), (8, 8), 9)
-        hog_features = hog.compute(gray)
+        # 整帧只转换一次灰度
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
-        # 归一化特征向量
-        if np.linalg.norm(hog_features) > 0:
-            hog_features = hog_features / np.linalg.norm(hog_features)
+        # 将每个人脸缩放到固定尺寸后拼接
+        row = FACE_SIZE + 2
+        stacked = np.empty((count * row, FACE_SIZE), dtype=np.uint8)
+        for i, (x, y, w, h) in enumerate(face_locations):
+            top = i * row
+            cv2.resize(gray[y:y+h, x:x+w], (FACE_SIZE, FACE_SIZE), dst=stacked[top + 1:top + row - 1])
+            stacked[top] = stacked[top + 2]
+            stacked[top + row - 1] = stacked[top + row - 3]
+        
+        # 使用HOG特征作为人脸编码，在每个人脸的位置计算一次描述子
+        locations = [(0, i * row + 1) for i in range(count)]
+        features = self.hog.compute(stacked, (FACE_SIZE, FACE_SIZE), (0, 0), locations)
+        encodings = np.ascontiguousarray(features, dtype=np.float32).reshape(count, self.encoding_size)
         
-        return hog_features
+        # 归一化特征向量
+        norms = np.linalg.norm(encodings, axis=1, keepdims=True)
+        np.divide(encodings, norms, out=encodings, where=norms > 0)
+        return encodings
     
     def process_image(self, image_base64: str) -> Tuple[List[Tuple[int, int, int, int]], List[np.ndarray], List[str]]:
         """处理Base64编码的图像，检测人脸并提取特征
@@ -94,22 +124,37 @@ class FaceRecognition:
                 self.logger.error("无法解码图像数据")
                 return [], [], []
             
+            return self.process_frame(image)
+        
+        except Exception as e:
+            self.logger.error(f"处理图像时出错: {e}")
+            return [], [], []
+    
+    def process_frame(self, image: np.ndarray) -> Tuple[List[Tuple[int, int, int, int]], np.ndarray, List[str]]:
+        """处理已解码的图像，检测人脸并提取特征
+        
+        Args:
+            image: 输入图像，OpenCV格式（BGR）
+            
+        Returns:
+            人脸边界框列表，人脸特征矩阵（每行一个人脸），人脸图像Base64编码列表
+        """
+        try:
+            # 检测和特征提取共用同一张灰度图
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            
             # 检测人脸
-            faces = self.detect_faces(image)
+            faces = self.detect_faces(gray)
             
             if len(faces) == 0:
                 self.logger.info("未检测到人脸")
                 return [], [], []
             
-            # 提取每个人脸的特征
-            face_encodings = []
+            # 批量提取所有人脸的特征
+            face_encodings = self.extract_face_encodings(gray, faces)
             face_images_base64 = []
             
             for face in faces:
-                # 提取特征
-                encoding = self.extract_face_encoding(image, face)
-                face_encodings.append(encoding)
-                
                 # 提取人脸图像并编码为Base64
                 x, y, w, h = face
                 face_image = image[y:y+h, x:x+w]
@@ -146,41 +191,40 @@ class FaceRecognition:
                 self.logger.error("无法解码图像数据")
                 return image_base64
             
-            # 如果没有提供名称，使用默认名称
-            if names is None:
-                names = [f"Person {i+1}" for i in range(len(faces))]
-            
-            # 将OpenCV图像转换为PIL图像以支持中文文本
-            image_pil = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-            draw = ImageDraw.Draw(image_pil)
-            
-            # 使用系统默认字体
-            font_size = 30
-            try:
-                font = ImageFont.truetype("simhei.ttf", font_size)  # 使用黑体
-            except:
-                try:
-                    font = ImageFont.truetype("simsun.ttc", font_size)  # 尝试使用宋体
-                except:
-                    font = ImageFont.load_default()  # 如果都失败了使用默认字体
-            
-            # 绘制每个人脸的边界框和名称
-            for i, (x, y, w, h) in enumerate(faces):
-                # 绘制边界框
-                cv2.rectangle(image, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                
-                # 绘制名称
-                name = names[i] if i < len(names) else f"Person {i+1}"
-                # 在PIL图像上绘制中文文本
-                draw.text((x, max(y-font_size, 0)), name, font=font, fill=(0, 255, 0))
-            
-            # 将PIL图像转换回OpenCV格式
-            image = cv2.cvtColor(np.array(image_pil), cv2.COLOR_RGB2BGR)
-            
-            # 编码为Base64
-            _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 70])
-            return base64.b64encode(buffer).decode('utf-8')
+            return self.draw_faces_on_frame(image, faces, names)
         
         except Exception as e:
             self.logger.error(f"绘制人脸时出错: {e}")
-            return image_base64
\ No newline at end of file
+            return image_base64
+    
+    @property
+    def overlay(self) -> OverlayRenderer:
+        """缓存字体和名称字形的叠加渲染器"""
+        if self._overlay is None:
+            self._overlay = OverlayRenderer()
+        return self._overlay
+    
+    def get_overlay_stats(self) -> Dict[str, Any]:
+        """获取叠加渲染的耗时统计，尚未绘制过时返回空字典"""
+        if self._overlay is None:
+            return {}
+        return self._overlay.get_stats()
+    
+    def draw_faces_on_frame(self, image: np.ndarray, faces: List[Tuple[int, int, int, int]],
+                            names: List[str] = None) -> str:
+        """在已解码的图像副本上绘制人脸边界框和名称
+        
+        Args:
+            image: 输入图像，OpenCV格式（BGR），不会被修改
+            faces: 人脸边界框列表
+            names: 人脸对应的名称列表
+            
+        Returns:
+            绘制了人脸边界框和名称的图像的Base64编码
+        """
+        # 只在名称区域原地混合，避免整帧在OpenCV与PIL之间转换
+        image = self.overlay.draw(image.copy(), faces, names)
+        
+        # 编码为Base64
+        _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        return base64.b64encode(buffer).decode('utf-8')
\ No newline at end of file
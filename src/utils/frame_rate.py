@@ -0,0 +1,157 @@
+"""自适应帧率控制模块
+根据处理耗时、场景活跃度和CPU负载动态调整采集帧率
+"""
+import time
+import logging
+from typing import Dict, Any
+
+
+class AdaptiveFrameRateController:
+    """自适应帧率控制器
+
+    每帧开始时调用 frame_started()，处理结束后调用 frame_finished()，
+    返回值即为下一帧之前需要等待的时间（已扣除本帧处理耗时）；等待结束后调用 sleep_finished()，
+    实际等待超出请求的部分计为事件循环延迟。等待摄像头出帧的时间不计入延迟。
+    """
+    def __init__(self, target_fps: float = 1.0, active_fps: float = 5.0, idle_fps: float = 0.5,
+                 min_fps: float = 0.2, idle_after: float = 10.0, starvation_ratio: float = 0.9,
+                 max_error_delay: float = 15.0, smoothing: float = 0.2):
+        """
+        Args:
+            target_fps: 常规场景下的目标帧率
+            active_fps: 检测到人脸或运动时的帧率
+            idle_fps: 场景空闲时的帧率
+            min_fps: CPU不足时允许降到的最低帧率
+            idle_after: 连续多少秒无活动后进入空闲状态
+            starvation_ratio: 处理耗时或循环延迟占帧周期的比例超过该值时视为CPU不足
+            max_error_delay: 出错时退避等待的最长时间(秒)
+            smoothing: 统计量指数平滑系数
+        """
+        self.logger = logging.getLogger("FrameRateController")
+        self.target_fps = target_fps
+        self.active_fps = max(active_fps, target_fps)
+        self.idle_fps = min(idle_fps, target_fps)
+        self.min_fps = min(min_fps, self.idle_fps)
+        self.idle_after = idle_after
+        self.starvation_ratio = starvation_ratio
+        self.max_error_delay = max_error_delay
+        self.smoothing = smoothing
+
+        self.mode = "normal"  # normal / active / idle
+        self.load_factor = 1.0  # CPU不足时按比例降低帧率
+        self.fps_cap = None  # 全局CPU预算分配的帧率上限
+        self.last_activity_time = time.monotonic()
+
+        self._frame_start = None
+        self._last_frame_start = None
+        self._requested_delay = None
+        self._sleep_start = None
+        self._error_count = 0
+
+        self.effective_fps = 0.0
+        self.processing_time = 0.0
+        self.loop_lag = 0.0
+        self.frame_count = 0
+
+    @property
+    def desired_fps(self) -> float:
+        """不考虑全局预算上限时期望的帧率"""
+        if self.mode == "active":
+            base = self.active_fps
+        elif self.mode == "idle":
+            base = self.idle_fps
+        else:
+            base = self.target_fps
+        return max(self.min_fps, base * self.load_factor)
+
+    @property
+    def current_fps(self) -> float:
+        """当前调度使用的帧率"""
+        if self.fps_cap is None:
+            return self.desired_fps
+        return max(1e-3, min(self.desired_fps, self.fps_cap))
+
+    def _smooth(self, old: float, new: float) -> float:
+        if self.frame_count <= 1:
+            return new
+        return old + self.smoothing * (new - old)
+
+    def frame_started(self) -> None:
+        """标记一帧处理开始"""
+        now = time.monotonic()
+
+        if self._last_frame_start is not None:
+            interval = now - self._last_frame_start
+            if interval > 0:
+                self.effective_fps = self._smooth(self.effective_fps, 1.0 / interval)
+
+        self._last_frame_start = now
+        self._frame_start = now
+        self.frame_count += 1
+
+    def frame_finished(self, activity: bool = False) -> float:
+        """标记一帧处理结束，并计算下一帧前的等待时间
+
+        Args:
+            activity: 本帧是否检测到人脸或运动
+
+        Returns:
+            需要等待的秒数
+        """
+        now = time.monotonic()
+        elapsed = now - self._frame_start if self._frame_start is not None else 0.0
+        self.processing_time = self._smooth(self.processing_time, elapsed)
+        self._error_count = 0
+
+        # 根据场景活跃度切换模式
+        if activity:
+            self.last_activity_time = now
+            self._set_mode("active")
+        elif now - self.last_activity_time >= self.idle_after:
+            self._set_mode("idle")
+        else:
+            self._set_mode("normal")
+
+        # 处理耗时或循环延迟占满帧周期时认为CPU不足，降低帧率；否则逐步恢复
+        period = 1.0 / self.current_fps
+        if self.processing_time + self.loop_lag > self.starvation_ratio * period:
+            self.load_factor = max(self.min_fps / max(self.active_fps, 1e-6), self.load_factor * 0.8)
+        elif self.load_factor < 1.0:
+            self.load_factor = min(1.0, self.load_factor * 1.05)
+
+        delay = max(0.0, 1.0 / self.current_fps - elapsed)
+        self._requested_delay = delay
+        self._sleep_start = now
+        return delay
+
+    def sleep_finished(self) -> None:
+        """标记帧间等待结束，实际休眠时间与请求休眠时间之差作为事件循环延迟"""
+        if self._sleep_start is not None and self._requested_delay is not None:
+            lag = max(0.0, (time.monotonic() - self._sleep_start) - self._requested_delay)
+            self.loop_lag = self._smooth(self.loop_lag, lag)
+        self._sleep_start = None
+
+    def frame_failed(self) -> float:
+        """标记一帧处理失败，返回指数退避的等待时间"""
+        self._error_count += 1
+        delay = min(self.max_error_delay, 0.5 * (2 ** (self._error_count - 1)))
+        self._requested_delay = delay
+        self._sleep_start = time.monotonic()
+        return delay
+
+    def _set_mode(self, mode: str) -> None:
+        if mode != self.mode:
+            self.logger.debug(f"帧率模式切换: {self.mode} -> {mode}")
+            self.mode = mode
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取帧率统计信息"""
+        return {
+            "mode": self.mode,
+            "target_fps": round(self.current_fps, 2),
+            "effective_fps": round(self.effective_fps, 2),
+            "processing_ms": round(self.processing_time * 1000, 1),
+            "loop_lag_ms": round(self.loop_lag * 1000, 1),
+            "load_factor": round(self.load_factor, 2),
+            "frames": self.frame_count
+        }
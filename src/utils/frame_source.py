@@ -0,0 +1,238 @@
+"""帧源模块
+为视觉智能体提供统一的图像输入接口，支持摄像头、视频文件、图片目录和合成图像流
+"""
+import os
+import time
+import logging
+from typing import Callable, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+class FrameSource:
+    """帧源基类
+
+    子类实现 _open() 和 _read_frame()，由基类负责节奏控制：
+    realtime=True 时按源帧率输出，realtime=False 时尽可能快地输出。
+    """
+    def __init__(self, name: str, fps: Optional[float] = None, realtime: bool = True, loop: bool = False):
+        self.logger = logging.getLogger(f"FrameSource:{name}")
+        self.name = name
+        self.fps = fps
+        self.realtime = realtime
+        self.loop = loop
+        self.exhausted = False
+        self.frames_read = 0
+        self._opened = False
+        self._next_frame_time = None
+
+    def open(self) -> bool:
+        """打开帧源"""
+        self._opened = self._open()
+        self.exhausted = False
+        self._next_frame_time = None
+        if not self._opened:
+            self.logger.error(f"无法打开帧源: {self.name}")
+        return self._opened
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """读取下一帧，接口与cv2.VideoCapture.read保持一致"""
+        if not self._opened or self.exhausted:
+            return False, None
+
+        ret, frame = self._read_frame()
+        if not ret and self.loop and self.frames_read > 0:
+            self._rewind()
+            ret, frame = self._read_frame()
+        if not ret:
+            self.exhausted = True
+            return False, None
+
+        self.frames_read += 1
+        self._pace()
+        return True, frame
+
+    def _pace(self) -> None:
+        """实时模式下按帧率等待"""
+        if not self.realtime or not self.fps:
+            return
+        now = time.monotonic()
+        if self._next_frame_time is None:
+            self._next_frame_time = now
+        delay = self._next_frame_time - now
+        if delay > 0:
+            time.sleep(delay)
+        # 落后过多时重新对齐，避免追帧
+        self._next_frame_time = max(self._next_frame_time, now - 1.0 / self.fps) + 1.0 / self.fps
+
+    def release(self) -> None:
+        """释放帧源"""
+        self._release()
+        self._opened = False
+
+    def _open(self) -> bool:
+        raise NotImplementedError
+
+    def _read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        raise NotImplementedError
+
+    def _rewind(self) -> None:
+        pass
+
+    def _release(self) -> None:
+        pass
+
+
+class CameraFrameSource(FrameSource):
+    """摄像头帧源，摄像头本身按硬件帧率阻塞，不再额外控制节奏"""
+    def __init__(self, index: int = 0):
+        super().__init__(f"camera{index}", fps=None, realtime=False)
+        self.index = index
+        self.capture = None
+
+    def _open(self) -> bool:
+        self.capture = cv2.VideoCapture(self.index)
+        return self.capture.isOpened()
+
+    def _read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        return self.capture.read()
+
+    def _release(self) -> None:
+        if self.capture:
+            self.capture.release()
+
+
+class VideoFileFrameSource(FrameSource):
+    """视频文件帧源"""
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False, fps: Optional[float] = None):
+        super().__init__(os.path.basename(path), fps=fps, realtime=realtime, loop=loop)
+        self.path = path
+        self.capture = None
+
+    def _open(self) -> bool:
+        self.capture = cv2.VideoCapture(self.path)
+        if not self.capture.isOpened():
+            return False
+        if not self.fps:
+            file_fps = self.capture.get(cv2.CAP_PROP_FPS)
+            self.fps = file_fps if file_fps and file_fps > 0 else 25.0
+        return True
+
+    def _read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        return self.capture.read()
+
+    def _rewind(self) -> None:
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _release(self) -> None:
+        if self.capture:
+            self.capture.release()
+
+
+class ImageDirectoryFrameSource(FrameSource):
+    """图片目录帧源，按文件名顺序输出目录中的图片"""
+    def __init__(self, directory: str, fps: float = 1.0, realtime: bool = True, loop: bool = False):
+        super().__init__(os.path.basename(os.path.normpath(directory)), fps=fps, realtime=realtime, loop=loop)
+        self.directory = directory
+        self.files: List[str] = []
+        self.position = 0
+
+    def _open(self) -> bool:
+        if not os.path.isdir(self.directory):
+            return False
+        self.files = sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.position = 0
+        return len(self.files) > 0
+
+    def _read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        while self.position < len(self.files):
+            path = self.files[self.position]
+            self.position += 1
+            frame = cv2.imread(path, cv2.IMREAD_COLOR)
+            if frame is not None:
+                return True, frame
+            self.logger.warning(f"无法读取图片: {path}")
+        return False, None
+
+    def _rewind(self) -> None:
+        self.position = 0
+
+
+class SyntheticFrameSource(FrameSource):
+    """合成帧源
+
+    默认生成带有移动方块的噪声图像，也可以传入 generator(index) 自定义每一帧。
+    """
+    def __init__(self, width: int = 640, height: int = 480, frame_count: Optional[int] = None,
+                 fps: float = 30.0, realtime: bool = True, loop: bool = False,
+                 generator: Optional[Callable[[int], np.ndarray]] = None, seed: int = 0):
+        super().__init__("synthetic", fps=fps, realtime=realtime, loop=loop)
+        self.width = width
+        self.height = height
+        self.frame_count = frame_count
+        self.generator = generator
+        self.seed = seed
+        self.index = 0
+        self._rng = None
+
+    def _open(self) -> bool:
+        self.index = 0
+        self._rng = np.random.default_rng(self.seed)
+        return True
+
+    def _read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self.frame_count is not None and self.index >= self.frame_count:
+            return False, None
+        if self.generator is not None:
+            frame = self.generator(self.index)
+        else:
+            frame = self._default_frame(self.index)
+        self.index += 1
+        return frame is not None, frame
+
+    def _default_frame(self, index: int) -> np.ndarray:
+        frame = self._rng.integers(0, 32, (self.height, self.width, 3), dtype=np.uint8)
+        size = max(16, min(self.width, self.height) // 6)
+        x = (index * 8) % max(1, self.width - size)
+        y = (self.height - size) // 2
+        cv2.rectangle(frame, (x, y), (x + size, y + size), (200, 200, 200), -1)
+        return frame
+
+    def _rewind(self) -> None:
+        self.index = 0
+
+
+def create_frame_source(source: Union[int, str, FrameSource], realtime: bool = True,
+                        loop: bool = False, fps: Optional[float] = None) -> FrameSource:
+    """根据配置创建帧源
+
+    Args:
+        source: 摄像头索引、视频文件路径、图片目录路径、"synthetic"/"synthetic:宽x高"，或已创建的帧源
+        realtime: 是否按源帧率实时输出，False时尽可能快地输出
+        loop: 视频、目录和合成源播放结束后是否循环
+        fps: 覆盖源帧率（图片目录和合成源必需时使用默认值）
+
+    Returns:
+        帧源实例
+    """
+    if isinstance(source, FrameSource):
+        return source
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        return CameraFrameSource(int(source))
+    if source.startswith("synthetic"):
+        width, height = 640, 480
+        if ":" in source:
+            width, height = (int(v) for v in source.split(":", 1)[1].lower().split("x"))
+        return SyntheticFrameSource(width, height, fps=fps or 30.0, realtime=realtime, loop=loop)
+    if os.path.isdir(source):
+        return ImageDirectoryFrameSource(source, fps=fps or 1.0, realtime=realtime, loop=loop)
+    return VideoFileFrameSource(source, realtime=realtime, loop=loop, fps=fps)
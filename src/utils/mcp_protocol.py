@@ -80,10 +80,13 @@ class ImageMessage(MCPMessage):
     """图像消息"""
     
     def __init__(self, sender_id: str, receiver_id: str, image_data: str, 
-                 format: str = "base64", person_name: Optional[str] = None, message_id: Optional[str] = None):
+                 format: str = "base64", person_name: Optional[str] = None, message_id: Optional[str] = None,
+                 camera_id: Optional[str] = None):
         content = {"image_data": image_data, "format": format}
         if person_name is not None:
             content["person_name"] = person_name
+        if camera_id is not None:
+            content["camera_id"] = camera_id
             
         super().__init__(
             message_type="image",
@@ -0,0 +1,122 @@
+"""叠加渲染模块
+在图像上绘制人脸边界框和中文名称，字体和名称字形均缓存复用
+"""
+import time
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# 按顺序尝试的中文字体
+FONT_CANDIDATES = ("simhei.ttf", "simsun.ttc")
+
+
+@lru_cache(maxsize=8)
+def load_font(font_size: int):
+    """加载支持中文的字体，每个字号只加载一次"""
+    for font_name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(font_name, font_size)
+        except Exception:
+            continue
+    return ImageFont.load_default()  # 如果都失败了使用默认字体
+
+
+class OverlayRenderer:
+    """人脸框和名称叠加渲染器
+
+    名称很少变化，因此每个名称只用PIL渲染一次字形遮罩并缓存；
+    每帧只在名称所在的小区域内按遮罩原地混合颜色，无需整帧在OpenCV与PIL之间转换。
+    """
+    def __init__(self, font_size: int = 30, color: Tuple[int, int, int] = (0, 255, 0),
+                 max_labels: int = 256):
+        """
+        Args:
+            font_size: 名称字号
+            color: 边界框和名称颜色（BGR）
+            max_labels: 缓存的名称字形数量上限
+        """
+        self.logger = logging.getLogger("OverlayRenderer")
+        self.font_size = font_size
+        self.font = load_font(font_size)
+        self.color = np.array(color, dtype=np.float32)
+        self.max_labels = max_labels
+        self._labels: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+        self.label_hits = 0
+        self.label_misses = 0
+        self.frames = 0
+        self.last_render_ms = 0.0
+        self.average_render_ms = 0.0
+
+    def _label_mask(self, name: str) -> np.ndarray:
+        """获取名称的字形遮罩（float32，范围0-1），未缓存时渲染"""
+        mask = self._labels.get(name)
+        if mask is not None:
+            self._labels.move_to_end(name)
+            self.label_hits += 1
+            return mask
+
+        self.label_misses += 1
+        left, top, right, bottom = self.font.getbbox(name)
+        canvas = Image.new("L", (max(right, 1), max(bottom, 1)), 0)
+        ImageDraw.Draw(canvas).text((0, 0), name, font=self.font, fill=255)
+        mask = (np.asarray(canvas, dtype=np.float32) / 255.0)[:, :, None]
+
+        self._labels[name] = mask
+        if len(self._labels) > self.max_labels:
+            self._labels.popitem(last=False)
+        return mask
+
+    def _blend_label(self, image: np.ndarray, mask: np.ndarray, x: int, y: int) -> None:
+        """按字形遮罩把名称颜色混合到图像的对应区域（原地修改）"""
+        height, width = image.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + mask.shape[1], width), min(y + mask.shape[0], height)
+        if x1 <= x0 or y1 <= y0:
+            return
+        alpha = mask[y0 - y:y1 - y, x0 - x:x1 - x]
+        region = image[y0:y1, x0:x1].astype(np.float32)
+        region += (self.color - region) * alpha
+        image[y0:y1, x0:x1] = region.astype(np.uint8)
+
+    def draw(self, image: np.ndarray, faces: Sequence[Tuple[int, int, int, int]],
+             names: Optional[List[str]] = None) -> np.ndarray:
+        """在图像上原地绘制人脸边界框和名称
+
+        Args:
+            image: OpenCV格式（BGR）图像，会被原地修改
+            faces: 人脸边界框列表
+            names: 人脸对应的名称列表
+
+        Returns:
+            绘制后的图像（即传入的image）
+        """
+        start = time.perf_counter()
+        color = tuple(int(c) for c in self.color)
+        for i, (x, y, w, h) in enumerate(faces):
+            x, y, w, h = int(x), int(y), int(w), int(h)
+            # 绘制边界框
+            cv2.rectangle(image, (x, y), (x + w, y + h), color, 2)
+            # 绘制名称
+            name = names[i] if names is not None and i < len(names) else f"Person {i+1}"
+            self._blend_label(image, self._label_mask(name), x, max(y - self.font_size, 0))
+
+        self.last_render_ms = (time.perf_counter() - start) * 1000
+        self.frames += 1
+        self.average_render_ms += (self.last_render_ms - self.average_render_ms) / min(self.frames, 100)
+        return image
+
+    def get_stats(self) -> Dict[str, float]:
+        """获取叠加渲染耗时和字形缓存统计"""
+        lookups = self.label_hits + self.label_misses
+        return {
+            "overlay_ms": round(self.last_render_ms, 3),
+            "overlay_avg_ms": round(self.average_render_ms, 3),
+            "label_cache_size": len(self._labels),
+            "label_hit_rate": round(self.label_hits / lookups, 3) if lookups else 0.0
+        }
@@ -2,104 +2,196 @@
 用于存储和加载已识别的人物信息
 """
 import os
-import json
 import numpy as np
 import logging
+import threading
 from typing import Dict, List, Any, Optional, Tuple
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from config import PERSON_DATABASE
+
+from src.utils.face_gallery import FaceGallery
+from src.utils.ann_index import IVFIndex
+from src.utils.embedding_compression import CompressedIndex
+from src.utils.person_store import SQLitePersonStore, complete_encodings_swap, migrate_json_layout
+from src.utils.person_writer import PersonWriter
 
 class PersonDatabase:
     """人物数据库类
     用于存储和加载已识别的人物信息
     """
-    def __init__(self, database_path: str = "data/persons"):
+    def __init__(self, database_path: str = "data/persons", index_type: str = None):
         self.logger = logging.getLogger("PersonDatabase")
         self.database_path = database_path
-        self.persons = {}  # 存储人物信息的字典，键为人物ID，值为人物信息
+        self.persons = {}  # 存储人物元数据的字典，键为人物ID；特征和人脸图像按需读取
         self.next_id = 1  # 下一个可用的人物ID
+        self._templates = {}  # 人物ID -> 该人物的特征模板所在的行号列表
+        self._template_weights = {}  # 行号 -> 模板权重（已合并进该模板的特征数）
+        
+        # 每个人物保留少量有代表性的特征模板，置信度高的匹配会在线更新模板
+        self.max_templates = PERSON_DATABASE['max_templates']
+        self.template_confidence = PERSON_DATABASE['template_confidence']
+        self.template_merge = PERSON_DATABASE['template_merge']
+        self.template_max_weight = PERSON_DATABASE['template_max_weight']
+        self.duplicate_floor = PERSON_DATABASE['duplicate_floor']
+        self.matches = 0  # 匹配到已知人物的人脸数
+        self.new_persons = 0  # 新增的人物数
+        self.suspected_duplicates = 0  # 与已有人物相似度接近阈值的新增人物数（疑似重复）
+        self.template_merges = 0  # 合并进已有模板的次数
+        self.template_adds = 0  # 新增模板的次数
+        
+        # 可选的近似最近邻索引，人物库达到一定规模后启用
+        self.index_type = index_type or PERSON_DATABASE['index_type']
+        self.ann_index = None
+        self.ann_min_size = PERSON_DATABASE['ivf_min_size']
+        self._ann_unsaved = 0
+        self._ann_training: Optional[Future] = None  # 后台训练中的IVF索引
+        self._ann_stale_rows = set()  # 训练期间被更新的行，替换索引前重新分配
+        if self.index_type == "ivf":
+            self.ann_index = IVFIndex(nlist=PERSON_DATABASE['ivf_nlist'], nprobe=PERSON_DATABASE['ivf_nprobe'])
+        
+        # 可选的特征压缩（PCA+量化），在压缩空间粗排后用全精度特征精排
+        self.compressed_index = None
+        self._compressed_unsaved = 0
+        self._compressed_training: Optional[Future] = None  # 后台拟合中的压缩特征
+        self._compressed_stale_rows = set()  # 拟合期间被更新的行，替换前重新压缩
+        if PERSON_DATABASE['compression']:
+            self.compressed_index = CompressedIndex(
+                components=PERSON_DATABASE['pca_components'],
+                dtype=PERSON_DATABASE['compression'],
+                rerank_k=PERSON_DATABASE['rerank_top_k']
+            )
+        
+        # 目击记录先写入内存中的脏集合，由后台定期批量落盘（write-behind）
+        self.visit_gap = PERSON_DATABASE['visit_gap']
+        self.flush_interval = PERSON_DATABASE['flush_interval']
+        self._dirty = {}  # 人物ID -> 待写入的新人脸图像（无新图像时为None）
+        self._dirty_templates = {}  # 新增或权重变化的模板：行号 -> 人物ID
+        self._unsaved_images = {}  # 已提交写入但尚未落盘的新人物的人脸图像
+        self._dirty_lock = threading.Lock()
+        self.sightings = 0  # 记录的目击次数
+        self.flushed_rows = 0  # 实际写入的行数
+        self.flushes = 0  # 写入事务数
         
         # 确保数据目录存在
         os.makedirs(self.database_path, exist_ok=True)
         
+        # 打开SQLite存储，首次启动时从旧版JSON文件结构迁移
+        self.store = SQLitePersonStore(self.database_path)
+        try:
+            migrate_json_layout(self.database_path, self.store)
+        except Exception as e:
+            self.logger.error(f"迁移旧版人物数据时出错: {e}")
+        
+        # 所有人物特征组成的归一化矩阵，保存在内存映射文件中；先完成重新编码时中断的文件替换
+        complete_encodings_swap(self.database_path, self.store)
+        self.gallery = FaceGallery(path=os.path.join(self.database_path, "encodings.npy"))
+        
         # 加载已有人物数据
         self.load_persons()
+        self._migrate_blob_encodings()
+        self._load_ann_index()
+        self._load_compressed_index()
+        
+        # 运行期间的所有写入都由专用线程按提交顺序执行，不阻塞事件循环
+        self.writer = PersonWriter()
+        # 索引的训练在后台线程中进行，完成前检索照常进行
+        self._trainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-trainer")
     
     def load_persons(self) -> None:
-        """加载所有已保存的人物数据"""
+        """加载所有人物的元数据和特征模板，并映射特征库文件（不读取特征和人脸图像）"""
         try:
-            # 检查索引文件是否存在
-            index_path = os.path.join(self.database_path, "index.json")
-            if not os.path.exists(index_path):
-                self.logger.info("人物索引文件不存在，创建新索引")
-                return
+            next_id, persons = self.store.load_all()
+            for person_data in persons:
+                self.persons[person_data["id"]] = person_data
             
-            # 加载索引文件
-            with open(index_path, "r", encoding="utf-8") as f:
-                index_data = json.load(f)
-                self.next_id = index_data.get("next_id", 1)
-                person_files = index_data.get("persons", [])
+            rows, person_ids = [], []
+            for row, person_id, weight in self.store.load_templates():
+                if person_id not in self.persons:
+                    continue
+                if row >= self.gallery.capacity or self.gallery.dim is None:
+                    self.logger.warning(f"人物ID {person_id} 的特征行 {row} 不在特征库文件中，已跳过")
+                    continue
+                rows.append(row)
+                person_ids.append(person_id)
+                self._templates.setdefault(person_id, []).append(row)
+                self._template_weights[row] = weight
+            self.gallery.restore(np.array(rows, dtype=np.int64), np.array(person_ids, dtype=np.int64))
             
-            # 加载每个人物的数据
-            for person_file in person_files:
-                person_path = os.path.join(self.database_path, person_file)
-                if os.path.exists(person_path):
-                    with open(person_path, "r", encoding="utf-8") as f:
-                        person_data = json.load(f)
-                        # 将特征向量从列表转换回numpy数组
-                        if "face_encoding" in person_data and person_data["face_encoding"]:
-                            person_data["face_encoding"] = np.array(person_data["face_encoding"])
-                        self.persons[person_data["id"]] = person_data
+            # 防止下一个ID与已有人物冲突
+            self.next_id = max([next_id] + [person_id + 1 for person_id in self.persons])
             
             self.logger.info(f"成功加载{len(self.persons)}个人物数据")
         
         except Exception as e:
             self.logger.error(f"加载人物数据时出错: {e}")
     
-    def save_index(self) -> None:
-        """保存人物索引"""
+    def _migrate_blob_encodings(self) -> None:
+        """将旧版本以BLOB形式保存在SQLite中的特征分批迁移到特征库文件"""
+        migrated, after_id = 0, 0
         try:
-            index_data = {
-                "next_id": self.next_id,
-                "persons": [f"person_{person_id}.json" for person_id in self.persons.keys()]
-            }
-            
-            index_path = os.path.join(self.database_path, "index.json")
-            with open(index_path, "w", encoding="utf-8") as f:
-                json.dump(index_data, f, ensure_ascii=False, indent=2)
-        
+            while True:
+                batch = self.store.load_blob_encodings(after_id)
+                if not batch:
+                    break
+                rows = []
+                for person_id, encoding in batch:
+                    after_id = person_id
+                    if person_id in self.persons and person_id not in self._templates:
+                        row = self._add_template(person_id, encoding)
+                        if row is not None:
+                            rows.append((person_id, row))
+                # 先确保特征落盘，再提交行号映射
+                self.gallery.flush()
+                self.store.set_encoding_rows(rows)
+                migrated += len(rows)
         except Exception as e:
-            self.logger.error(f"保存人物索引时出错: {e}")
+            self.logger.error(f"迁移人物特征时出错: {e}")
+        if migrated:
+            self.logger.info(f"已将{migrated}个人物特征迁移到特征库文件")
     
-    def save_person(self, person_id: int) -> None:
-        """保存单个人物数据"""
-        try:
-            if person_id not in self.persons:
-                self.logger.warning(f"人物ID {person_id} 不存在")
-                return
-            
-            person_data = self.persons[person_id].copy()
-            
-            # 将numpy数组转换为列表以便JSON序列化
-            if "face_encoding" in person_data and person_data["face_encoding"] is not None:
-                person_data["face_encoding"] = person_data["face_encoding"].tolist()
-            
-            person_path = os.path.join(self.database_path, f"person_{person_id}.json")
-            with open(person_path, "w", encoding="utf-8") as f:
-                json.dump(person_data, f, ensure_ascii=False, indent=2)
-            
-            # 更新索引
-            self.save_index()
+    def save_index(self) -> None:
+        """提交保存人物索引（下一个可用ID）"""
+        self.writer.submit(self.store.set_next_id, self.next_id)
+    
+    def save_person(self, person_id: int, face_image: str = None) -> None:
+        """提交保存单个人物的元数据、特征模板和可选的人脸图像，与下一个可用ID在同一事务中写入"""
+        if person_id not in self.persons:
+            self.logger.warning(f"人物ID {person_id} 不存在")
+            return
         
-        except Exception as e:
-            self.logger.error(f"保存人物数据时出错: {e}")
+        rows = self._templates.get(person_id, [])
+        record = dict(self.persons[person_id], face_image=face_image, encoding_row=rows[0] if rows else None)
+        templates = [(row, person_id, self._template_weights[row]) for row in rows]
+        self._submit_persons([record], templates)
+    
+    def _submit_persons(self, records: List[Dict[str, Any]], templates: List[Tuple[int, int, int]]) -> None:
+        """提交写入人物记录；落盘前人脸图像保留在内存中供get_face_image读取"""
+        for record in records:
+            if record.get("face_image"):
+                self._unsaved_images[record["id"]] = record["face_image"]
+        self.writer.submit(self._write_persons, records, self.next_id, templates)
     
-    def add_person(self, name: str, face_encoding: np.ndarray, face_image: str) -> int:
+    def _write_persons(self, records: List[Dict[str, Any]], next_id: int,
+                       templates: List[Tuple[int, int, int]]) -> None:
+        """在写入线程中执行：先把模板特征写回映射文件，再在一个事务中提交人物记录"""
+        try:
+            self.gallery.flush()
+            self.store.save_persons(records, next_id=next_id, templates=templates)
+        finally:
+            for record in records:
+                self._unsaved_images.pop(record["id"], None)
+    
+    def add_person(self, name: str, face_encoding: np.ndarray, face_image: str,
+                   best_similarity: float = None) -> int:
         """添加新人物
         
         Args:
             name: 人物名称
             face_encoding: 人脸特征向量
             face_image: 人脸图像的base64编码
+            best_similarity: 该人脸与已有人物的最大相似度，用于统计疑似重复的新增人物
             
         Returns:
             新添加的人物ID
@@ -111,29 +203,79 @@ class PersonDatabase:
         person_data = {
             "id": person_id,
             "name": name,
-            "face_encoding": face_encoding,
-            "face_image": face_image,
             "first_seen": time.time(),
             "last_seen": time.time(),
             "seen_count": 1
         }
         
-        # 添加到内存中
+        # 添加到内存中，特征写入特征库文件
         self.persons[person_id] = person_data
+        self._add_template(person_id, face_encoding)
+        
+        # 保存到存储
+        self.save_person(person_id, face_image)
         
-        # 保存到文件
-        self.save_person(person_id)
+        self.new_persons += 1
+        if best_similarity is not None and best_similarity >= self.duplicate_floor:
+            self.suspected_duplicates += 1
         
         self.logger.info(f"添加新人物: {name} (ID: {person_id})")
         return person_id
     
-    def update_person(self, person_id: int, last_seen: float = None, face_image: str = None) -> None:
+    def add_persons(self, persons: List[Tuple[str, np.ndarray, str]]) -> List[int]:
+        """批量添加新人物，所有人物及其特征模板在一个事务中写入
+        
+        Args:
+            persons: (人物名称, 人脸特征向量, 人脸图像base64编码) 列表
+            
+        Returns:
+            新添加的人物ID列表
+        """
+        now = time.time()
+        records, templates, person_ids = [], [], []
+        for name, face_encoding, face_image in persons:
+            person_id = self.next_id
+            self.next_id += 1
+            self.persons[person_id] = {
+                "id": person_id,
+                "name": name,
+                "first_seen": now,
+                "last_seen": now,
+                "seen_count": 1
+            }
+            row = self._add_template(person_id, face_encoding)
+            if row is not None:
+                templates.append((row, person_id, 1))
+            records.append(dict(self.persons[person_id], face_image=face_image, encoding_row=row))
+            person_ids.append(person_id)
+        
+        if records:
+            self._submit_persons(records, templates)
+            self.new_persons += len(records)
+        return person_ids
+    
+    def add_face_encoding(self, person_id: int, face_encoding: np.ndarray) -> None:
+        """为已知人物补充一个人脸特征（例如同一人的其他照片），按模板规则新增或合并模板
+        
+        Args:
+            person_id: 人物ID
+            face_encoding: 人脸特征向量
+        """
+        if person_id not in self.persons:
+            self.logger.warning(f"人物ID {person_id} 不存在")
+            return
+        self._update_templates(person_id, face_encoding)
+    
+    def update_person(self, person_id: int, last_seen: float = None, face_image: str = None,
+                      face_encoding: np.ndarray = None, similarity: float = 1.0) -> None:
         """更新人物信息
         
         Args:
             person_id: 人物ID
             last_seen: 最后一次见到的时间戳
             face_image: 新的人脸图像base64编码
+            face_encoding: 本次见到的人脸特征向量，匹配置信度足够高时用于更新该人物的特征模板
+            similarity: 本次匹配的相似度
         """
         if person_id not in self.persons:
             self.logger.warning(f"人物ID {person_id} 不存在")
@@ -141,112 +283,386 @@ class PersonDatabase:
         
         person = self.persons[person_id]
         
-        # 更新最后见到时间
         if last_seen is None:
             last_seen = time.time()
-        person["last_seen"] = last_seen
-        
-        # 更新见到次数
-        person["seen_count"] += 1
         
-        # 更新人脸图像
-        if face_image:
-            person["face_image"] = face_image
+        with self._dirty_lock:
+            # 连续的目击合并为一次来访，间隔超过visit_gap才算再次见到
+            if last_seen - person["last_seen"] >= self.visit_gap:
+                person["seen_count"] += 1
+            person["last_seen"] = max(person["last_seen"], last_seen)
+            
+            # 标记为待写入，由flush批量落盘；新的人脸图像在落盘前也保存在脏集合中
+            self._dirty[person_id] = face_image or self._dirty.get(person_id)
+            self.sightings += 1
         
-        # 保存更新
-        self.save_person(person_id)
+        # 只用置信度高的匹配更新特征模板，避免把其他人的特征混进来
+        if face_encoding is not None and similarity >= self.template_confidence:
+            self._update_templates(person_id, face_encoding)
         
         self.logger.info(f"更新人物信息: {person['name']} (ID: {person_id})")
     
+    def flush(self, wait: bool = False) -> int:
+        """把脏集合中的目击记录和模板交给写入线程，在一个事务中批量写入存储
+        
+        只取快照并入队，开销很小，可直接在事件循环中调用；写入失败时记录会重新放回脏集合，下次再试。
+        
+        Args:
+            wait: 是否阻塞等待此前提交的所有写入完成（用于关闭和离线工具）
+            
+        Returns:
+            提交写入的人物数量
+        """
+        with self._dirty_lock:
+            if not self._dirty and not self._dirty_templates:
+                if wait:
+                    self.writer.flush()
+                return 0
+            dirty, self._dirty = self._dirty, {}
+            dirty_templates, self._dirty_templates = self._dirty_templates, {}
+            sightings = [
+                (person_id, self.persons[person_id]["last_seen"], self.persons[person_id]["seen_count"], face_image)
+                for person_id, face_image in dirty.items()
+            ]
+            templates = [(row, person_id, self._template_weights[row]) for row, person_id in dirty_templates.items()]
+            # 写入完成前这些图像仍可从未落盘图像中读取
+            for person_id, face_image in dirty.items():
+                if face_image:
+                    self._unsaved_images[person_id] = face_image
+        
+        self.writer.submit(self._write_sightings, sightings, templates, dirty, dirty_templates)
+        if wait:
+            self.writer.flush()
+        return len(sightings)
+    
+    def _write_sightings(self, sightings: List[Tuple[int, float, int, Optional[str]]],
+                         templates: List[Tuple[int, int, int]], dirty: Dict[int, Optional[str]],
+                         dirty_templates: Dict[int, int]) -> None:
+        """在写入线程中执行一次批量写入"""
+        try:
+            # 先把模板特征写回映射文件，再提交模板行号和权重
+            self.gallery.flush()
+            self.store.update_sightings(sightings, templates)
+        except Exception as e:
+            self.logger.error(f"批量保存目击记录时出错: {e}")
+            with self._dirty_lock:
+                for person_id, face_image in dirty.items():
+                    self._dirty[person_id] = self._dirty.get(person_id) or face_image
+                for row, person_id in dirty_templates.items():
+                    self._dirty_templates[row] = person_id
+            return
+        finally:
+            for person_id, face_image in dirty.items():
+                if face_image and self._unsaved_images.get(person_id) is face_image:
+                    del self._unsaved_images[person_id]
+        
+        self.flushed_rows += len(sightings) + len(templates)
+        self.flushes += 1
+    
+    def get_write_stats(self) -> Dict[str, Any]:
+        """获取目击记录和写入线程的统计
+        
+        Returns:
+            目击次数、待写入人数、写入行数、事务数、写放大比例（写入行数/目击次数），
+            以及写入队列的待完成数和排队/执行耗时
+        """
+        return {
+            "sightings": self.sightings,
+            "pending": len(self._dirty),
+            "flushed_rows": self.flushed_rows,
+            "flushes": self.flushes,
+            "write_ratio": round(self.flushed_rows / self.sightings, 4) if self.sightings else 0.0,
+            **self.writer.get_stats()
+        }
+    
     def find_similar_person(self, face_encoding: np.ndarray, threshold: float = 0.5) -> Optional[int]:
         """查找相似的人物
         
         Args:
             face_encoding: 人脸特征向量
-            threshold: 相似度阈值，默认为0.8
+            threshold: 相似度阈值，默认为0.5
             
         Returns:
             如果找到相似人物，返回人物ID；否则返回None
         """
-        self.logger.debug(f"开始查找相似人物，输入特征向量形状: {face_encoding.shape}, 数据类型: {face_encoding.dtype}")
-        self.logger.debug(f"相似度阈值: {threshold}, 类型: {type(threshold)}")
+        return self.find_similar_persons(np.asarray(face_encoding).reshape(1, -1), threshold)[0]
+    
+    def find_similar_persons(self, face_encodings: np.ndarray, threshold: float = 0.5) -> List[Optional[int]]:
+        """批量查找一帧中所有人脸的相似人物
+        
+        Args:
+            face_encodings: 形状为(人脸数, 维度)的人脸特征矩阵
+            threshold: 相似度阈值，默认为0.5
+            
+        Returns:
+            每个人脸对应的人物ID，未找到相似人物的为None
+        """
+        return [person_id for person_id, _ in self.match_faces(face_encodings, threshold)]
+    
+    def match_faces(self, face_encodings: np.ndarray, threshold: float = 0.5) -> List[Tuple[Optional[int], float]]:
+        """批量匹配一帧中所有人脸，同时返回相似度
+        
+        特征库是所有人物的特征模板组成的归一化连续矩阵，所有人脸只需一次矩阵乘法加argmax，
+        每个人物取其最相似的模板。
+        
+        Args:
+            face_encodings: 形状为(人脸数, 维度)的人脸特征矩阵
+            threshold: 相似度阈值，默认为0.5
+            
+        Returns:
+            每个人脸的 (人物ID, 最大相似度)，未找到相似人物时人物ID为None
+        """
+        face_encodings = np.asarray(face_encodings, dtype=np.float32)
+        if face_encodings.ndim == 1:
+            face_encodings = face_encodings.reshape(1, -1)
+        count = face_encodings.shape[0]
         
-        if not self.persons:
+        if len(self.gallery) == 0:
             self.logger.info("人物数据库为空，无法查找相似人物")
+            return [(None, 0.0)] * count
+        
+        if self._ann_ready():
+            queries = FaceGallery.normalize_queries(face_encodings)
+            rows, similarities = self.ann_index.search(self.gallery.matrix, queries)
+            similarities = np.clip(similarities, 0.0, 1.0)
+        elif self._compressed_ready():
+            queries = FaceGallery.normalize_queries(face_encodings)
+            matrix = self.gallery.matrix if self.compressed_index.rerank_k > 0 else None
+            rows, similarities = self.compressed_index.search(queries, matrix)
+        else:
+            rows, similarities = self.gallery.search(face_encodings.reshape(count, -1))
+        person_ids = self.gallery.person_ids(rows)
+        
+        results = []
+        for person_id, similarity in zip(person_ids, similarities):
+            similarity = float(similarity)
+            if person_id is not None and similarity >= threshold:
+                self.logger.info(f"找到相似人物: {self.persons[person_id]['name']} (ID: {person_id}, 相似度: {similarity:.2f})")
+                self.matches += 1
+                results.append((person_id, similarity))
+            else:
+                self.logger.info(f"未找到相似度超过阈值的人物，最大相似度: {similarity:.2f}")
+                results.append((None, similarity))
+        return results
+    
+    def _add_template(self, person_id: int, encoding: np.ndarray, weight: int = 1) -> Optional[int]:
+        """将一个特征模板加入特征矩阵
+        
+        Returns:
+            模板所在的行号，特征为空或维度不匹配时返回None
+        """
+        if encoding is None or len(encoding) == 0:
             return None
+        row = self.gallery.add(person_id, encoding)
+        if row is not None:
+            self._templates.setdefault(person_id, []).append(row)
+            self._template_weights[row] = weight
+            if self.ann_index is not None and self.ann_index.is_trained:
+                self.ann_index.add_rows(row, self.gallery.matrix[row:row + 1])
+                self._mark_ann_dirty()
+            if self.compressed_index is not None and self.compressed_index.is_trained:
+                self.compressed_index.add_rows(row, self.gallery.matrix[row:row + 1])
+                self._mark_compressed_dirty()
+        return row
+    
+    def _update_templates(self, person_id: int, encoding: np.ndarray) -> None:
+        """用一次高置信度的目击更新人物的特征模板
+        
+        与最相似的模板足够接近时按权重合并进该模板（增量质心）；否则在模板数未满时新增一个模板，
+        以覆盖不同的角度和光照；模板数已满时合并进最相似的模板。权重有上限，使模板能持续适应外观变化。
+        """
+        vector = FaceGallery.normalize(encoding)
+        rows = self._templates.get(person_id)
+        if not rows:
+            row = self._add_template(person_id, vector)
+            if row is not None:
+                with self._dirty_lock:
+                    self._dirty_templates[row] = person_id
+            return
+        if vector.size != self.gallery.dim:
+            return
         
-        # 计算与所有已知人物的相似度
-        max_similarity = 0.0  # 确保使用浮点数
-        most_similar_id = None
-        self.logger.debug(f"人物数据库中共有{len(self.persons)}个人物")
+        similarities = self.gallery.matrix[rows] @ vector
+        nearest = int(similarities.argmax())
+        if similarities[nearest] < self.template_merge and len(rows) < self.max_templates:
+            row = self._add_template(person_id, vector)
+            self.template_adds += 1
+        else:
+            row = rows[nearest]
+            weight = self._template_weights[row]
+            centroid = self.gallery.matrix[row] * weight + vector
+            if not self.gallery.update(row, centroid):
+                return
+            self._template_weights[row] = min(weight + 1, self.template_max_weight)
+            self.template_merges += 1
+            if self._ann_training is not None:
+                self._ann_stale_rows.add(row)
+            if self.ann_index is not None and self.ann_index.is_trained:
+                self.ann_index.update_row(row, self.gallery.matrix[row])
+                self._mark_ann_dirty()
+            if self._compressed_training is not None:
+                self._compressed_stale_rows.add(row)
+            if self.compressed_index is not None and self.compressed_index.is_trained:
+                self.compressed_index.update_row(row, self.gallery.matrix[row])
+                self._mark_compressed_dirty()
+        if row is not None:
+            with self._dirty_lock:
+                self._dirty_templates[row] = person_id
+    
+    def get_match_stats(self) -> Dict[str, Any]:
+        """获取匹配和特征模板统计
         
-        for person_id, person in self.persons.items():
-            if "face_encoding" not in person or person["face_encoding"] is None:
-                self.logger.debug(f"人物ID {person_id} 没有人脸特征向量，跳过")
-                continue
-            
-            self.logger.debug(f"计算与人物ID {person_id} 的相似度，人物特征向量形状: {person['face_encoding'].shape}, 数据类型: {person['face_encoding'].dtype}")
-            
-            # 计算余弦相似度
-            try:
-                similarity = self._cosine_similarity(face_encoding, person["face_encoding"])
-                
-                # 记录原始相似度值和类型
-                self.logger.debug(f"与人物ID {person_id} 的原始相似度: {similarity}, 类型: {type(similarity)}")
-                
-                # 确保similarity是标量值
-                if isinstance(similarity, np.ndarray):
-                    self.logger.debug(f"相似度是NumPy数组，形状: {similarity.shape}, 数据类型: {similarity.dtype}, 值: {similarity}")
-                    if similarity.size == 1:
-                        original_similarity = similarity
-                        similarity = float(similarity.item())
-                        self.logger.debug(f"将单元素数组转换为标量: 从 {original_similarity} 到 {similarity}")
-                    else:
-                        original_similarity = similarity
-                        similarity = float(similarity.mean())
-                        self.logger.warning(f"相似度结果是多元素数组，大小: {original_similarity.size}, 取平均值: {similarity}")
-                elif not isinstance(similarity, (int, float, np.number)):
-                    self.logger.warning(f"相似度不是数值类型，而是 {type(similarity)}，设置为0")
-                    similarity = 0.0
-                else:
-                    # 确保是Python原生浮点数
-                    original_similarity = similarity
-                    similarity = float(similarity)
-                    if original_similarity != similarity:
-                        self.logger.debug(f"将相似度从 {original_similarity} 转换为浮点数: {similarity}")
-                
-                self.logger.debug(f"与人物ID {person_id} 的最终相似度: {similarity}")
-                
-                # 使用标量值进行比较 - 确保两边都是Python原生浮点数
-                self.logger.debug(f"比较相似度: 当前值 {similarity} (类型: {type(similarity)}) vs 最大值 {max_similarity} (类型: {type(max_similarity)})")
-                # 再次确保比较时使用的是Python原生浮点数
-                similarity_float = float(similarity)
-                max_similarity_float = float(max_similarity)
-                
-                if similarity_float > max_similarity_float:
-                    self.logger.debug(f"找到更高相似度: {similarity_float} > {max_similarity_float}")
-                    max_similarity = similarity_float
-                    most_similar_id = person_id
-            except Exception as e:
-                self.logger.error(f"计算与人物ID {person_id} 的相似度时出错: {e}")
-                import traceback
-                self.logger.error(f"错误详情: {traceback.format_exc()}")
-                continue
-        
-        # 如果最大相似度超过阈值，返回对应的人物ID
-        self.logger.debug(f"最大相似度: {max_similarity} (类型: {type(max_similarity)}), 最相似人物ID: {most_similar_id}")
-        
-        # 确保阈值比较使用相同类型
-        threshold_float = float(threshold)
-        max_similarity_float = float(max_similarity)
-        self.logger.debug(f"阈值比较: {max_similarity_float} >= {threshold_float}")
-        
-        if max_similarity_float >= threshold_float and most_similar_id is not None:
-            self.logger.info(f"找到相似人物: {self.persons[most_similar_id]['name']} (ID: {most_similar_id}, 相似度: {max_similarity_float:.2f})")
-            return most_similar_id
+        Returns:
+            匹配数、新增人物数、疑似重复人物数及比例、模板总数、平均每人模板数、模板合并和新增次数
+        """
+        persons = len(self._templates)
+        return {
+            "matches": self.matches,
+            "new_persons": self.new_persons,
+            "suspected_duplicates": self.suspected_duplicates,
+            "duplicate_rate": round(self.suspected_duplicates / self.new_persons, 4) if self.new_persons else 0.0,
+            "templates": len(self.gallery),
+            "templates_per_person": round(len(self.gallery) / persons, 2) if persons else 0.0,
+            "template_merges": self.template_merges,
+            "template_adds": self.template_adds
+        }
+    
+    def _ann_index_path(self) -> str:
+        return os.path.join(self.database_path, "ann_index.npz")
+    
+    def _load_ann_index(self) -> None:
+        """加载近似最近邻索引，并补充索引文件保存之后新增的人物"""
+        if self.ann_index is None:
+            return
+        if self.ann_index.load(self._ann_index_path()):
+            indexed = self.ann_index.indexed_rows()
+            if indexed < len(self.gallery):
+                self.ann_index.add_rows(indexed, self.gallery.matrix[indexed:])
+            self.logger.info(f"已加载IVF索引，覆盖{len(self.ann_index)}个特征")
+    
+    def _ann_ready(self) -> bool:
+        """判断是否使用近似索引检索
+        
+        人物库足够大时在后台线程中训练或重新训练索引。首次训练完成前退回精确匹配，
+        重新训练期间继续使用旧索引；训练完成后补齐训练期间的变化，再替换索引。
+        """
+        if self.ann_index is None or len(self.gallery) < self.ann_min_size:
+            return False
+        if self._ann_training is not None:
+            if self._ann_training.done():
+                future, self._ann_training = self._ann_training, None
+                index = self._finish_training(future, self._ann_stale_rows)
+                if index is not None:
+                    self.ann_index = index
+                    self._save_ann_index()
         else:
-            self.logger.info(f"未找到相似度超过阈值的人物，最大相似度: {max_similarity_float:.2f}")
+            retrain_size = self.ann_index.trained_size * PERSON_DATABASE['ivf_retrain_factor']
+            if not self.ann_index.is_trained or len(self.gallery) > retrain_size:
+                self.logger.info(f"开始后台训练IVF索引，人物特征数: {len(self.gallery)}")
+                self._ann_stale_rows = set()
+                index = IVFIndex(nlist=PERSON_DATABASE['ivf_nlist'], nprobe=PERSON_DATABASE['ivf_nprobe'])
+                self._ann_training = self._trainer.submit(self._train_index, index, len(self.gallery))
+        return self.ann_index.is_trained
+    
+    def _train_index(self, index: Any, rows: int) -> Any:
+        """在训练线程中用前rows行特征的副本训练新索引"""
+        index.train(self.gallery.snapshot(rows))
+        return index
+    
+    def _finish_training(self, future: Future, stale_rows: set) -> Any:
+        """取出训练好的索引，补充训练之后新增的行并重新写入训练期间被更新的行
+        
+        Returns:
+            可以替换旧索引的新索引，训练失败时返回None
+        """
+        try:
+            index = future.result()
+        except Exception as e:
+            self.logger.error(f"后台训练索引时出错: {e}")
             return None
+        trained = index.trained_size
+        if trained < len(self.gallery):
+            index.add_rows(trained, self.gallery.matrix[trained:])
+        for row in sorted(stale_rows):
+            if row < trained:
+                index.update_row(row, self.gallery.matrix[row])
+        stale_rows.clear()
+        return index
+    
+    def _mark_ann_dirty(self) -> None:
+        """累计一定数量的增量插入后再保存索引，避免每次添加人物都重写索引文件"""
+        self._ann_unsaved += 1
+        if self._ann_unsaved >= PERSON_DATABASE['ivf_save_interval']:
+            self._save_ann_index()
+    
+    def _save_ann_index(self) -> None:
+        """复制索引状态后交给写入线程保存"""
+        self.writer.submit(IVFIndex.write, self._ann_index_path(), self.ann_index.snapshot())
+        self._ann_unsaved = 0
+    
+    def _compressed_index_path(self) -> str:
+        return os.path.join(self.database_path, "compressed_index.npz")
+    
+    def _load_compressed_index(self) -> None:
+        """加载压缩特征，并补充保存之后新增的人物"""
+        if self.compressed_index is None:
+            return
+        if self.compressed_index.load(self._compressed_index_path()):
+            indexed = len(self.compressed_index)
+            if indexed < len(self.gallery):
+                self.compressed_index.add_rows(indexed, self.gallery.matrix[indexed:])
+            self.logger.info(f"已加载压缩特征，覆盖{len(self.compressed_index)}个特征")
+    
+    def _compressed_ready(self) -> bool:
+        """判断是否使用压缩特征匹配
+        
+        人物库足够大时在后台线程中拟合或重新拟合，首次拟合完成前使用全精度特征匹配，
+        重新拟合期间继续使用旧的压缩特征。
+        """
+        if self.compressed_index is None or len(self.gallery) < PERSON_DATABASE['compression_min_size']:
+            return False
+        if self._compressed_training is not None:
+            if self._compressed_training.done():
+                future, self._compressed_training = self._compressed_training, None
+                index = self._finish_training(future, self._compressed_stale_rows)
+                if index is not None:
+                    self.compressed_index = index
+                    self._save_compressed_index()
+        else:
+            refit_size = self.compressed_index.trained_size * PERSON_DATABASE['ivf_retrain_factor']
+            if not self.compressed_index.is_trained or len(self.gallery) > refit_size:
+                self.logger.info(f"开始后台拟合特征压缩，人物特征数: {len(self.gallery)}")
+                self._compressed_stale_rows = set()
+                index = CompressedIndex(
+                    components=PERSON_DATABASE['pca_components'],
+                    dtype=PERSON_DATABASE['compression'],
+                    rerank_k=PERSON_DATABASE['rerank_top_k']
+                )
+                self._compressed_training = self._trainer.submit(self._train_index, index, len(self.gallery))
+        return self.compressed_index.is_trained
+    
+    def _mark_compressed_dirty(self) -> None:
+        """累计一定数量的增量写入后再保存压缩特征"""
+        self._compressed_unsaved += 1
+        if self._compressed_unsaved >= PERSON_DATABASE['ivf_save_interval']:
+            self._save_compressed_index()
+    
+    def _save_compressed_index(self) -> None:
+        """复制压缩特征后交给写入线程保存"""
+        self.writer.submit(CompressedIndex.write, self._compressed_index_path(), self.compressed_index.snapshot())
+        self._compressed_unsaved = 0
+    
+    def close(self) -> None:
+        """关闭数据库：提交尚未落盘的目击记录和索引，同步等待写入线程全部完成"""
+        self.flush()
+        self._trainer.shutdown(wait=False, cancel_futures=True)
+        if self.ann_index is not None and self._ann_unsaved:
+            self._save_ann_index()
+        if self.compressed_index is not None and self._compressed_unsaved:
+            self._save_compressed_index()
+        self.writer.submit(self.gallery.flush)
+        self.writer.close()
+        self.store.close()
     
     def get_person(self, person_id: int) -> Optional[Dict[str, Any]]:
         """获取人物信息
@@ -255,10 +671,41 @@ class PersonDatabase:
             person_id: 人物ID
             
         Returns:
-            人物信息字典，如果不存在则返回None
+            人物元数据字典（不含特征和人脸图像），如果不存在则返回None
         """
         return self.persons.get(person_id)
     
+    def get_face_image(self, person_id: int) -> Optional[str]:
+        """按需获取人物最新的人脸图像
+        
+        Args:
+            person_id: 人物ID
+            
+        Returns:
+            人脸图像的base64编码，不存在时返回None
+        """
+        with self._dirty_lock:
+            face_image = self._dirty.get(person_id) or self._unsaved_images.get(person_id)
+        if face_image:
+            return face_image
+        return self.store.get_face_image(person_id)
+    
+    def get_face_encoding(self, person_id: int) -> Optional[np.ndarray]:
+        """获取人物的主要人脸特征（权重最大的模板，L2归一化后的副本）
+        
+        Args:
+            person_id: 人物ID
+            
+        Returns:
+            特征向量，没有特征时返回None
+        """
+        rows = self._templates.get(person_id)
+        if not rows:
+            return None
+        # 取权重最大（合并目击最多）的模板
+        row = max(rows, key=lambda r: self._template_weights[r])
+        return np.array(self.gallery.matrix[row])
+    
     def get_all_persons(self) -> Dict[int, Dict[str, Any]]:
         """获取所有人物信息
         
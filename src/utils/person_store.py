@@ -0,0 +1,331 @@
+"""人物存储引擎模块
+使用SQLite保存人物元数据和人脸缩略图，所有写入都在事务中原子完成。
+特征向量保存在内存映射的特征库文件中，这里只记录每个人物的特征模板所在的行号；
+旧版本以BLOB形式保存的特征会在启动时迁移到特征库文件。
+"""
+import os
+import json
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS persons (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    face_encoding BLOB,
+    face_image TEXT,
+    first_seen REAL,
+    last_seen REAL,
+    seen_count INTEGER NOT NULL DEFAULT 1,
+    encoding_row INTEGER
+);
+CREATE TABLE IF NOT EXISTS templates (
+    row INTEGER PRIMARY KEY,
+    person_id INTEGER NOT NULL,
+    weight INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SQLitePersonStore:
+    """基于SQLite的人物存储
+
+    更新一次目击记录只是一条按主键的UPDATE语句（O(1)），不再重写整个人物文件和索引。
+    使用WAL日志模式，写入原子且不阻塞读取：写入使用conn（由锁串行化，通常只在写入线程中调用），
+    查询使用独立的只读连接reader，事件循环中的查询不会等待正在进行的写事务。
+    """
+    def __init__(self, database_path: str, filename: str = "persons.db"):
+        self.logger = logging.getLogger("PersonStore")
+        self.path = os.path.join(database_path, filename)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._upgrade_schema()
+        self._lock = threading.RLock()
+        self.reader = sqlite3.connect(self.path, check_same_thread=False)
+    
+    def _upgrade_schema(self) -> None:
+        """为旧版本创建的数据库补充新增的列"""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(persons)")}
+        if "encoding_row" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE persons ADD COLUMN encoding_row INTEGER")
+        # 单模板版本的行号作为每个人物的第一个模板
+        if self.conn.execute("SELECT 1 FROM templates LIMIT 1").fetchone() is None:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO templates (row, person_id, weight) "
+                    "SELECT encoding_row, id, 1 FROM persons WHERE encoding_row IS NOT NULL"
+                )
+
+    @staticmethod
+    def _encode(encoding: Optional[np.ndarray]) -> Optional[bytes]:
+        if encoding is None:
+            return None
+        return np.asarray(encoding, dtype=np.float32).reshape(-1).tobytes()
+
+    @staticmethod
+    def _decode(blob: Optional[bytes]) -> Optional[np.ndarray]:
+        if not blob:
+            return None
+        return np.frombuffer(blob, dtype=np.float32)
+
+    def is_empty(self) -> bool:
+        return self.reader.execute("SELECT 1 FROM persons LIMIT 1").fetchone() is None
+
+    def get_next_id(self) -> int:
+        row = self.reader.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+        return int(row[0]) if row else 1
+
+    def load_all(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """加载全部人物的元数据（不包含特征向量和人脸图像）
+
+        Returns:
+            下一个可用的人物ID，人物信息列表
+        """
+        persons = []
+        cursor = self.reader.execute(
+            "SELECT id, name, first_seen, last_seen, seen_count FROM persons ORDER BY id"
+        )
+        for person_id, name, first_seen, last_seen, seen_count in cursor:
+            persons.append({
+                "id": person_id,
+                "name": name,
+                "first_seen": first_seen,
+                "last_seen": last_seen,
+                "seen_count": seen_count
+            })
+        return self.get_next_id(), persons
+
+    def load_templates(self) -> List[Tuple[int, int, int]]:
+        """加载全部特征模板
+
+        Returns:
+            (特征库行号, 人物ID, 权重) 列表，按行号升序
+        """
+        return self.reader.execute("SELECT row, person_id, weight FROM templates ORDER BY row").fetchall()
+
+    def get_face_image(self, person_id: int) -> Optional[str]:
+        """按需读取人物的人脸图像"""
+        row = self.reader.execute("SELECT face_image FROM persons WHERE id = ?", (person_id,)).fetchone()
+        return row[0] if row else None
+
+    def load_face_images(self, after_id: int = 0, limit: int = 1000) -> List[Tuple[int, str]]:
+        """分批读取人物的人脸图像
+
+        Args:
+            after_id: 只读取ID大于该值的人物
+            limit: 每批数量
+
+        Returns:
+            (人物ID, 人脸图像base64编码) 列表，按ID升序，不含没有图像的人物
+        """
+        return self.reader.execute(
+            "SELECT id, face_image FROM persons WHERE face_image IS NOT NULL AND face_image != '' AND id > ? "
+            "ORDER BY id LIMIT ?", (after_id, limit)
+        ).fetchall()
+
+    def load_blob_encodings(self, after_id: int = 0, limit: int = 1000) -> List[Tuple[int, np.ndarray]]:
+        """分批读取尚未迁移到特征库文件的BLOB特征
+
+        Args:
+            after_id: 只读取ID大于该值的人物
+            limit: 每批数量
+
+        Returns:
+            (人物ID, 特征向量) 列表，按ID升序
+        """
+        cursor = self.reader.execute(
+            "SELECT id, face_encoding FROM persons WHERE face_encoding IS NOT NULL AND encoding_row IS NULL "
+            "AND id > ? ORDER BY id LIMIT ?", (after_id, limit)
+        )
+        return [(person_id, self._decode(blob)) for person_id, blob in cursor]
+
+    def set_encoding_rows(self, rows: List[Tuple[int, int]]) -> None:
+        """记录人物在特征库文件中的行号（作为第一个模板），并清除已迁移的BLOB特征
+
+        Args:
+            rows: (人物ID, 行号) 列表
+        """
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE persons SET encoding_row = ?, face_encoding = NULL WHERE id = ?",
+                [(row, person_id) for person_id, row in rows]
+            )
+            self._save_templates([(row, person_id, 1) for person_id, row in rows])
+
+    def replace_templates(self, templates: List[Tuple[int, int, int]], pending_swap: Optional[str] = None) -> None:
+        """在一个事务中用新的特征模板替换全部模板（重新编码特征库后使用）
+
+        Args:
+            templates: (特征库行号, 人物ID, 权重) 列表
+            pending_swap: 新模板所对应、尚待替换为正式特征库文件的新文件名；与模板在同一事务中记录，
+                中途中断时由 complete_encodings_swap 完成替换
+        """
+        with self._lock, self.conn:
+            if pending_swap is not None:
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('pending_swap', ?)",
+                                  (pending_swap,))
+            self.conn.execute("DELETE FROM templates")
+            self.conn.execute("UPDATE persons SET encoding_row = NULL")
+            self._save_templates(templates)
+            self.conn.execute(
+                "UPDATE persons SET encoding_row = (SELECT MIN(row) FROM templates WHERE person_id = persons.id)"
+            )
+
+    def _save_templates(self, templates: List[Tuple[int, int, int]]) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO templates (row, person_id, weight) VALUES (?, ?, ?)", templates
+        )
+
+    def _upsert(self, person: Dict[str, Any]) -> None:
+        # 冲突时只覆盖非空的特征、图像和行号，避免不含这些字段的人物数据把已有值清空
+        self.conn.execute(
+            "INSERT INTO persons (id, name, face_encoding, face_image, first_seen, last_seen, seen_count, encoding_row) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET name = excluded.name, "
+            "face_encoding = COALESCE(excluded.face_encoding, face_encoding), "
+            "face_image = COALESCE(excluded.face_image, face_image), "
+            "first_seen = excluded.first_seen, last_seen = excluded.last_seen, seen_count = excluded.seen_count, "
+            "encoding_row = COALESCE(excluded.encoding_row, encoding_row)",
+            (person["id"], person["name"], self._encode(person.get("face_encoding")), person.get("face_image"),
+             person.get("first_seen"), person.get("last_seen"), person.get("seen_count", 1),
+             person.get("encoding_row"))
+        )
+
+    def _set_next_id(self, next_id: int) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)", (str(next_id),))
+
+    def save_person(self, person: Dict[str, Any], next_id: Optional[int] = None,
+                    templates: Optional[List[Tuple[int, int, int]]] = None) -> None:
+        """原子地写入（新增或覆盖）一个人物，可同时更新下一个可用ID和特征模板
+
+        Args:
+            person: 人物数据
+            next_id: 下一个可用的人物ID
+            templates: (特征库行号, 人物ID, 权重) 列表
+        """
+        with self._lock, self.conn:
+            self._upsert(person)
+            if templates:
+                self._save_templates(templates)
+            if next_id is not None:
+                self._set_next_id(next_id)
+
+    def save_persons(self, persons: List[Dict[str, Any]], next_id: Optional[int] = None,
+                     templates: Optional[List[Tuple[int, int, int]]] = None) -> None:
+        """在一个事务中批量写入多个人物及其特征模板"""
+        with self._lock, self.conn:
+            for person in persons:
+                self._upsert(person)
+            if templates:
+                self._save_templates(templates)
+            if next_id is not None:
+                self._set_next_id(next_id)
+
+    def set_next_id(self, next_id: int) -> None:
+        with self._lock, self.conn:
+            self._set_next_id(next_id)
+
+    def update_sighting(self, person_id: int, last_seen: float, seen_count: int,
+                        face_image: Optional[str] = None) -> None:
+        """更新一次目击记录（最后见到时间、见到次数和可选的人脸图像）"""
+        self.update_sightings([(person_id, last_seen, seen_count, face_image)])
+
+    def update_sightings(self, sightings: List[Tuple[int, float, int, Optional[str]]],
+                         templates: Optional[List[Tuple[int, int, int]]] = None) -> None:
+        """在一个事务中批量更新目击记录和特征模板
+
+        Args:
+            sightings: (人物ID, 最后见到时间, 见到次数, 人脸图像或None) 列表，图像为None时保留原图像
+            templates: 新增或权重变化的 (特征库行号, 人物ID, 权重) 列表
+        """
+        with self._lock, self.conn:
+            if templates:
+                self._save_templates(templates)
+            self.conn.executemany(
+                "UPDATE persons SET last_seen = ?, seen_count = ?, face_image = COALESCE(?, face_image) WHERE id = ?",
+                [(last_seen, seen_count, face_image or None, person_id)
+                 for person_id, last_seen, seen_count, face_image in sightings]
+            )
+
+    def get_pending_swap(self) -> Optional[str]:
+        """尚未完成替换的新特征库文件名，没有时返回None"""
+        row = self.reader.execute("SELECT value FROM meta WHERE key = 'pending_swap'").fetchone()
+        return row[0] if row else None
+
+    def clear_pending_swap(self) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM meta WHERE key = 'pending_swap'")
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+        self.reader.close()
+
+
+def complete_encodings_swap(database_path: str, store: SQLitePersonStore,
+                            encodings_file: str = "encodings.npy") -> bool:
+    """完成中断的特征库替换（重新编码后先提交新模板，再替换特征库文件）
+
+    存储中记录了待替换的新文件时，模板已经指向新文件的行号：新文件仍在则替换正式文件（前滚），
+    不在则说明替换已经完成，只需清除记录。须在映射特征库文件之前调用。
+
+    Returns:
+        是否处理了中断的替换
+    """
+    pending = store.get_pending_swap()
+    if pending is None:
+        return False
+    pending_path = os.path.join(database_path, pending)
+    if os.path.exists(pending_path):
+        os.replace(pending_path, os.path.join(database_path, encodings_file))
+        logging.getLogger("PersonStore").info(f"已完成中断的特征库替换: {pending}")
+    store.clear_pending_swap()
+    return True
+
+
+def migrate_json_layout(database_path: str, store: SQLitePersonStore) -> int:
+    """将旧版 index.json + person_{id}.json 目录结构迁移到SQLite存储
+
+    仅在存储为空且存在 index.json 时执行；迁移在单个事务中完成，
+    成功后将 index.json 重命名为 index.json.migrated，原人物文件保留作为备份。
+
+    Returns:
+        迁移的人物数量
+    """
+    logger = logging.getLogger("PersonStore")
+    index_path = os.path.join(database_path, "index.json")
+    if not os.path.exists(index_path) or not store.is_empty():
+        return 0
+
+    with open(index_path, "r", encoding="utf-8") as f:
+        index_data = json.load(f)
+
+    persons = []
+    for person_file in index_data.get("persons", []):
+        person_path = os.path.join(database_path, person_file)
+        if not os.path.exists(person_path):
+            logger.warning(f"人物文件不存在，跳过: {person_file}")
+            continue
+        with open(person_path, "r", encoding="utf-8") as f:
+            person_data = json.load(f)
+        if person_data.get("face_encoding"):
+            person_data["face_encoding"] = np.array(person_data["face_encoding"], dtype=np.float32)
+        else:
+            person_data["face_encoding"] = None
+        persons.append(person_data)
+
+    store.save_persons(persons, next_id=index_data.get("next_id", 1))
+    os.replace(index_path, index_path + ".migrated")
+    logger.info(f"已将{len(persons)}个人物从JSON文件迁移到 {store.path}")
+    return len(persons)
@@ -0,0 +1,91 @@
+"""人物库写入线程模块
+所有持久化操作按提交顺序在一个专用线程中执行，调用方（事件循环）只负责入队，不会被磁盘I/O阻塞
+"""
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class PersonWriter:
+    """有序写入线程
+
+    提交的写操作放入FIFO队列，由唯一的写入线程逐个执行，因此写入顺序与提交顺序一致
+    （例如新增人物一定先于该人物的目击记录写入）。单个操作失败只记录日志，不影响后续操作。
+    """
+    def __init__(self, name: str = "person-writer"):
+        self.logger = logging.getLogger("PersonWriter")
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._closed = False
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_pending = 0
+        self.average_queue_ms = 0.0  # 从提交到开始执行的平均等待时间
+        self.average_write_ms = 0.0  # 平均执行时间
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        """尚未完成的写操作数（包括正在执行的）"""
+        return self.submitted - self.completed - self.failed
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> None:
+        """提交一个写操作，立即返回"""
+        if self._closed:
+            raise RuntimeError("写入线程已关闭")
+        self.submitted += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        self._queue.put((func, args, kwargs, time.perf_counter()))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            func, args, kwargs, submitted_at = item
+            started_at = time.perf_counter()
+            try:
+                func(*args, **kwargs)
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                self.logger.error(f"写入操作 {getattr(func, '__name__', func)} 失败: {e}")
+            finished_at = time.perf_counter()
+            done = self.completed + self.failed
+            self.average_queue_ms += ((started_at - submitted_at) * 1000 - self.average_queue_ms) / min(done, 100)
+            self.average_write_ms += ((finished_at - started_at) * 1000 - self.average_write_ms) / min(done, 100)
+            self._queue.task_done()
+
+    def flush(self) -> None:
+        """阻塞直到此前提交的所有写操作执行完毕"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """执行完剩余的写操作后停止写入线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取写入队列统计
+
+        Returns:
+            待完成数、历史最大待完成数、已提交/完成/失败数、平均排队和执行耗时(毫秒)
+        """
+        return {
+            "pending_writes": self.pending,
+            "max_pending_writes": self.max_pending,
+            "submitted_writes": self.submitted,
+            "completed_writes": self.completed,
+            "failed_writes": self.failed,
+            "write_queue_ms": round(self.average_queue_ms, 3),
+            "write_ms": round(self.average_write_ms, 3)
+        }
@@ -0,0 +1,98 @@
+"""语音识别流水线模块
+切分出的语音段按到达顺序编号后交给多个识别协程并发识别，识别结果经重排缓冲区按原顺序输出
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class OrderedRecognitionPipeline(Generic[T]):
+    """并发识别、按序输出的流水线
+
+    submit() 只入队不等待；workers个识别协程并发调用recognize，先完成的结果暂存在重排缓冲区，
+    等前面的语音段都有结果后再依次放入输出队列，保证对话顺序与说话顺序一致。
+    识别失败（返回None或抛出异常）的语音段同样占位输出，不会卡住后面的结果。
+    """
+    def __init__(self, recognize: Callable[[T], Awaitable[Optional[str]]], workers: int = 2):
+        """
+        Args:
+            recognize: 识别一个语音段的协程函数，返回文本或None
+            workers: 并发识别数
+        """
+        self.logger = logging.getLogger("RecognitionPipeline")
+        self.recognize = recognize
+        self.workers = max(1, workers)
+        self._pending: "asyncio.Queue[Tuple[int, T]]" = asyncio.Queue()
+        self._results: "asyncio.Queue[Tuple[T, Optional[str]]]" = asyncio.Queue()
+        self._reorder: Dict[int, Tuple[T, Optional[str]]] = {}
+        self._next_sequence = 0
+        self._next_output = 0
+        self._tasks: List[asyncio.Task] = []
+
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.max_reorder = 0  # 重排缓冲区中等待前序结果的最大数量
+
+    def start(self) -> None:
+        """启动识别协程，需在事件循环中调用"""
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """停止识别协程"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, item: T) -> None:
+        """提交一个语音段（需在事件循环线程中调用）"""
+        self._pending.put_nowait((self._next_sequence, item))
+        self._next_sequence += 1
+
+    @property
+    def idle(self) -> bool:
+        """没有排队、正在识别或等待输出的语音段"""
+        return self._pending.empty() and self.in_flight == 0 and not self._reorder and self._results.empty()
+
+    async def next_result(self) -> Tuple[T, Optional[str]]:
+        """按提交顺序获取下一个识别结果"""
+        return await self._results.get()
+
+    async def _worker(self) -> None:
+        while True:
+            sequence, item = await self._pending.get()
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                text = await self.recognize(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"识别语音段时出错: {e}")
+                text = None
+            finally:
+                self.in_flight -= 1
+            self._release(sequence, item, text)
+
+    def _release(self, sequence: int, item: T, text: Optional[str]) -> None:
+        """暂存结果，并输出所有前序已完成的结果"""
+        self._reorder[sequence] = (item, text)
+        self.max_reorder = max(self.max_reorder, len(self._reorder) - 1)
+        while self._next_output in self._reorder:
+            self._results.put_nowait(self._reorder.pop(self._next_output))
+            self._next_output += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取流水线统计
+
+        Returns:
+            排队数、正在识别数及其最大值、重排缓冲区最大等待数
+        """
+        return {
+            "queued_utterances": self._pending.qsize(),
+            "recognizing": self.in_flight,
+            "max_recognizing": self.max_in_flight,
+            "max_reorder_wait": self.max_reorder
+        }
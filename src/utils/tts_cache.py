@@ -0,0 +1,152 @@
+"""合成语音缓存模块
+问候语和简短回复经常重复，按文本和语音参数的摘要缓存合成好的WAV音频，命中时无需再次合成即可播放。
+最近使用的音频保存在内存中，全部音频保存在磁盘目录中，两级都按最近最少使用淘汰
+"""
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class TTSCache:
+    """内存加磁盘的两级LRU语音缓存
+
+    键由文本、语音、语速和音量共同决定，任一参数变化都不会命中旧音频。
+    磁盘文件以键命名（<key>.wav），读取时更新修改时间，磁盘超出上限时删除最久未使用的文件。
+    """
+    def __init__(self, directory: Optional[str] = "data/tts_cache", max_memory_bytes: int = 16 * 1024 * 1024,
+                 max_disk_bytes: int = 200 * 1024 * 1024):
+        """
+        Args:
+            directory: 磁盘缓存目录，None表示只缓存在内存中
+            max_memory_bytes: 内存缓存上限(字节)
+            max_disk_bytes: 磁盘缓存上限(字节)
+        """
+        self.logger = logging.getLogger("TTSCache")
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # 键 -> 文件大小，按最近使用排序
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._scan_disk()
+
+    @staticmethod
+    def make_key(text: str, voice: Optional[str], rate: int, volume: float) -> str:
+        """计算缓存键"""
+        content = "\x00".join([text, voice or "", str(rate), f"{volume:.3f}"])
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def _scan_disk(self) -> None:
+        """按修改时间加载已有的磁盘缓存，最久未使用的排在前面"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".wav"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存的WAV音频，未命中时返回None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+            if key not in self._disk:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError as e:
+                self.logger.warning(f"读取语音缓存失败: {e}")
+                self._disk_bytes -= self._disk.pop(key)
+                self.misses += 1
+                return None
+            self._disk.move_to_end(key)
+            self.disk_hits += 1
+            self._remember(key, data)
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """缓存一段WAV音频"""
+        with self._lock:
+            self._remember(key, data)
+            if self.directory is None or key in self._disk:
+                return
+            path = self._path(key)
+            temp_path = f"{path}.tmp"
+            try:
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError as e:
+                self.logger.warning(f"写入语音缓存失败: {e}")
+                return
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+            self._evict_disk()
+
+    def _remember(self, key: str, data: bytes) -> None:
+        """放入内存缓存，超出上限时淘汰最久未使用的音频"""
+        if len(data) > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self) -> None:
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计
+
+        Returns:
+            内存/磁盘命中数、未命中数、命中率，以及内存和磁盘中的条目数和占用字节数
+        """
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "tts_cache_memory_hits": self.memory_hits,
+            "tts_cache_disk_hits": self.disk_hits,
+            "tts_cache_misses": self.misses,
+            "tts_cache_hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "tts_cache_memory_entries": len(self._memory),
+            "tts_cache_memory_bytes": self._memory_bytes,
+            "tts_cache_disk_entries": len(self._disk),
+            "tts_cache_disk_bytes": self._disk_bytes
+        }
@@ -0,0 +1,366 @@
+"""语音合成线程模块
+一个常驻的合成线程持有唯一一个已初始化的TTS引擎（语音只选择一次），把每段话拆成句子逐句合成为WAV音频，
+播放线程从一个小的音频队列中连续播放：第N句播放时第N+1句已在合成，长回复的首句延迟只取决于第一句的合成耗时。
+合成结果可以缓存复用
+"""
+import io
+import os
+import re
+import time
+import wave
+import queue
+import logging
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import pyaudio
+import pyttsx3
+
+from src.utils.tts_cache import TTSCache
+
+# 句末标点（英文句点后须有空白，避免拆开小数和缩写）及换行处断句
+_SENTENCE_BREAK = re.compile(r"(?<=[。！？!?；;…])|(?<=\.)(?=\s)|\n")
+_WORD = re.compile(r"\w", re.UNICODE)
+
+
+def split_sentences(text: str, min_chars: int = 4) -> List[str]:
+    """把一段话拆成句子
+
+    Args:
+        text: 文本
+        min_chars: 短于该字数的句子并入下一句，只有标点的片段并入上一句，避免逐字停顿
+
+    Returns:
+        句子列表
+    """
+    sentences: List[str] = []
+    for piece in _SENTENCE_BREAK.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if sentences and (len(sentences[-1]) < min_chars or not _WORD.search(piece)):
+            separator = " " if _WORD.search(piece) and sentences[-1][-1].isascii() and piece[0].isascii() else ""
+            sentences[-1] = sentences[-1] + separator + piece
+        else:
+            sentences.append(piece)
+    return sentences
+
+
+class _Speech:
+    """一段提交的话在合成和播放线程之间传递的状态"""
+    def __init__(self, text: str, submitted_at: float):
+        self.text = text
+        self.submitted_at = submitted_at
+        self.started_at = time.perf_counter()
+        self.first_audio_at: Optional[float] = None
+        self.synthesis_seconds = 0.0
+        self.failed = False
+
+
+class TTSWorker:
+    """常驻的语音合成和播放线程
+
+    submit() 只入队不等待；每段话按FIFO顺序处理，拆成句子后由合成线程逐句合成，
+    放入最多playback_queue_size句的音频队列，播放线程保持输出流打开并连续写入，句子之间没有停顿。
+    开始播放第一句和播放完最后一句时调用on_event，并统计每段话的排队时间、首句音频延迟、合成耗时和播放耗时。
+    每句先用save_to_file合成为WAV音频，缓存命中时跳过合成；
+    驱动无法输出WAV时（例如macOS输出AIFF）等已排队的音频播放完后直接朗读剩余句子，此时合成耗时计入播放耗时。
+    引擎出错时丢弃这段话剩余的句子，下一段话前重新初始化引擎。
+    """
+    def __init__(self, rate: int = 250, volume: float = 0.9, voice: Optional[str] = None,
+                 on_event: Optional[Callable[[str, str], None]] = None, cache: Optional[TTSCache] = None,
+                 cache_max_chars: int = 100, sentence_min_chars: int = 4, playback_queue_size: int = 2,
+                 name: str = "tts-worker"):
+        """
+        Args:
+            rate: 语速
+            volume: 音量（0-1）
+            voice: 语音ID，None表示自动选择中文语音
+            on_event: 开始/停止说话时的回调，参数为事件名（"speaking_started"/"speaking_stopped"）和文本
+            cache: 合成语音缓存，None表示不缓存
+            cache_max_chars: 只缓存不超过该字数的句子，较长的回复很少重复，避免挤掉问候语
+            sentence_min_chars: 短于该字数的句子与下一句合并合成
+            playback_queue_size: 合成好等待播放的最大句数
+            name: 线程名
+        """
+        self.logger = logging.getLogger("TTSWorker")
+        self.rate = rate
+        self.volume = volume
+        self.voice = voice
+        self.on_event = on_event
+        self.cache = cache
+        self.cache_max_chars = cache_max_chars
+        self.sentence_min_chars = sentence_min_chars
+        self.engine = None
+        self._render_supported = True
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._playback_queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max(1, playback_queue_size))
+        self._ready = threading.Event()
+        self._closed = False
+
+        self.submitted = 0
+        self.spoken = 0
+        self.failed = 0
+        self.sentences = 0
+        self.max_pending = 0
+        self.average_queue_ms = 0.0        # 从提交到开始处理的平均等待时间
+        self.average_first_audio_ms = 0.0  # 从开始处理到第一句开始播放的平均延迟
+        self.average_synthesis_ms = 0.0    # 每段话的平均合成耗时（缓存命中时只有读取耗时）
+        self.average_playback_ms = 0.0     # 每段话从开始播放到播放完的平均耗时
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._playback_thread = threading.Thread(target=self._playback, name=f"{name}-playback", daemon=True)
+
+    @property
+    def pending(self) -> int:
+        """尚未播放完的段数（包括正在播放的）"""
+        return self.submitted - self.spoken - self.failed
+
+    def start(self, timeout: float = 10.0) -> bool:
+        """启动合成和播放线程并等待引擎初始化
+
+        Returns:
+            引擎是否初始化成功
+        """
+        self._playback_thread.start()
+        self._thread.start()
+        self._ready.wait(timeout)
+        return self.engine is not None
+
+    def submit(self, text: str) -> None:
+        """提交一段话，立即返回"""
+        if self._closed:
+            raise RuntimeError("语音合成线程已关闭")
+        self.submitted += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        self._queue.put((text, time.perf_counter()))
+
+    def _init_engine(self) -> None:
+        """初始化引擎并选择语音，只在合成线程中调用（部分驱动要求引擎在创建它的线程中使用）"""
+        try:
+            engine = pyttsx3.init()
+            engine.setProperty('rate', self.rate)
+            engine.setProperty('volume', self.volume)
+            if self.voice is None:
+                for voice in engine.getProperty('voices'):
+                    if 'chinese' in voice.name.lower() or 'zh' in voice.id.lower():
+                        self.voice = voice.id
+                        break
+            if self.voice is not None:
+                engine.setProperty('voice', self.voice)
+                self.logger.info(f"使用语音: {self.voice}")
+            self.engine = engine
+        except Exception as e:
+            self.logger.error(f"TTS引擎初始化失败: {e}")
+            self.engine = None
+
+    def _run(self) -> None:
+        self._init_engine()
+        self._ready.set()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            speech = _Speech(*item)
+            sentences = split_sentences(speech.text, self.sentence_min_chars)
+            try:
+                if self.engine is None:
+                    self._init_engine()
+                    if self.engine is None:
+                        raise RuntimeError("TTS引擎不可用")
+                for index, sentence in enumerate(sentences):
+                    started_at = time.perf_counter()
+                    audio = self._synthesize(sentence)
+                    speech.synthesis_seconds += time.perf_counter() - started_at
+                    if audio is None:
+                        self._speak_directly(speech, sentences[index:])
+                        break
+                    # 音频队列已满时在这里等待，合成最多领先播放playback_queue_size句
+                    self._playback_queue.put((speech, audio, index == len(sentences) - 1))
+                else:
+                    if not sentences:
+                        self._playback_queue.put((speech, None, True))
+            except Exception as e:
+                self.logger.error(f"语音合成失败: {e}")
+                self.engine = None
+                speech.failed = True
+                self._playback_queue.put((speech, None, True))
+            self._queue.task_done()
+        if self.engine is not None:
+            self.engine.stop()
+        self._playback_queue.put(None)
+        self._playback_thread.join()
+
+    def _speak_directly(self, speech: _Speech, sentences: List[str]) -> None:
+        """驱动无法输出WAV时，等已排队的音频播放完后用引擎直接朗读剩余的句子
+
+        朗读出错时在这里记录失败并结束这段话，不再抛出，避免调用方再次结束同一段话
+        """
+        self._playback_queue.join()
+        if speech.first_audio_at is None:
+            speech.first_audio_at = time.perf_counter()
+            self._notify("speaking_started", speech.text)
+        try:
+            for sentence in sentences:
+                self.engine.say(sentence)
+            self.engine.runAndWait()
+        except Exception as e:
+            self.logger.error(f"语音播放失败: {e}")
+            self.engine = None
+            speech.failed = True
+        finally:
+            self._notify("speaking_stopped", speech.text)
+            self._finish(speech)
+
+    def _synthesize(self, text: str) -> Optional[bytes]:
+        """取得一句话的WAV音频：先查缓存，未命中时合成并放入缓存
+
+        Returns:
+            WAV音频，驱动无法输出WAV时返回None
+        """
+        key = None
+        if self.cache is not None:
+            key = TTSCache.make_key(text, self.voice, self.rate, self.volume)
+            audio = self.cache.get(key)
+            if audio is not None:
+                return audio
+        audio = self._render(text)
+        if audio is not None and key is not None and len(text) <= self.cache_max_chars:
+            self.cache.put(key, audio)
+        return audio
+
+    def _render(self, text: str) -> Optional[bytes]:
+        """用引擎把文本合成为WAV音频"""
+        if not self._render_supported:
+            return None
+        fd, path = tempfile.mkstemp(suffix=".wav", prefix="tts-")
+        os.close(fd)
+        try:
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            with open(path, "rb") as f:
+                audio = f.read()
+            with wave.open(io.BytesIO(audio), "rb") as wav:
+                wav.getparams()
+            return audio
+        except (wave.Error, EOFError) as e:
+            self._render_supported = False
+            self.logger.warning(f"TTS驱动无法输出WAV音频，改为直接朗读且不缓存: {e}")
+            return None
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _playback(self) -> None:
+        """播放线程：保持输出流打开，连续写入队列中的音频，音频格式变化时才重新打开输出流"""
+        audio_device = pyaudio.PyAudio()
+        stream = None
+        stream_format = None
+        while True:
+            item = self._playback_queue.get()
+            if item is None:
+                self._playback_queue.task_done()
+                break
+            speech, audio, last = item
+            try:
+                if audio is not None:
+                    with wave.open(io.BytesIO(audio), "rb") as wav:
+                        audio_format = (wav.getsampwidth(), wav.getnchannels(), wav.getframerate())
+                        if stream is None or audio_format != stream_format:
+                            if stream is not None:
+                                stream.stop_stream()
+                                stream.close()
+                            stream = audio_device.open(format=audio_device.get_format_from_width(audio_format[0]),
+                                                       channels=audio_format[1], rate=audio_format[2], output=True)
+                            stream_format = audio_format
+                        if speech.first_audio_at is None:
+                            speech.first_audio_at = time.perf_counter()
+                            self._notify("speaking_started", speech.text)
+                        while True:
+                            frames = wav.readframes(1024)
+                            if not frames:
+                                break
+                            stream.write(frames)
+                    self.sentences += 1
+            except Exception as e:
+                self.logger.error(f"语音播放失败: {e}")
+                speech.failed = True
+                if stream is not None:
+                    stream.close()
+                stream = None
+            finally:
+                if last:
+                    if speech.first_audio_at is not None:
+                        self._notify("speaking_stopped", speech.text)
+                    self._finish(speech)
+                self._playback_queue.task_done()
+        if stream is not None:
+            stream.stop_stream()
+            stream.close()
+        audio_device.terminate()
+
+    def _finish(self, speech: _Speech) -> None:
+        """一段话播放完毕（或失败），更新统计"""
+        finished_at = time.perf_counter()
+        if speech.failed:
+            self.failed += 1
+        else:
+            self.spoken += 1
+        queue_ms = (speech.started_at - speech.submitted_at) * 1000
+        first_audio_ms = ((speech.first_audio_at or finished_at) - speech.started_at) * 1000
+        synthesis_ms = speech.synthesis_seconds * 1000
+        playback_ms = (finished_at - (speech.first_audio_at or finished_at)) * 1000
+        done = min(self.spoken + self.failed, 100)
+        self.average_queue_ms += (queue_ms - self.average_queue_ms) / done
+        self.average_first_audio_ms += (first_audio_ms - self.average_first_audio_ms) / done
+        self.average_synthesis_ms += (synthesis_ms - self.average_synthesis_ms) / done
+        self.average_playback_ms += (playback_ms - self.average_playback_ms) / done
+        self.logger.info(f"语音播放完成: 排队{queue_ms:.0f}ms，首句音频{first_audio_ms:.0f}ms，"
+                         f"合成{synthesis_ms:.0f}ms，播放{playback_ms:.0f}ms")
+
+    def _notify(self, event: str, text: str) -> None:
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(event, text)
+        except Exception as e:
+            self.logger.error(f"通知说话事件失败: {e}")
+
+    def flush(self) -> None:
+        """阻塞直到此前提交的所有话播放完毕"""
+        self._queue.join()
+        self._playback_queue.join()
+
+    def close(self) -> None:
+        """播放完剩余的话后停止合成和播放线程"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取语音合成统计
+
+        Returns:
+            待播放数、历史最大待播放数、已提交/播放/失败的段数、播放的句数，
+            每段话的平均排队时间、首句音频延迟、合成和播放耗时(毫秒)，以及缓存统计
+        """
+        return {
+            **(self.cache.get_stats() if self.cache is not None else {}),
+            "pending_speech": self.pending,
+            "max_pending_speech": self.max_pending,
+            "submitted_speech": self.submitted,
+            "spoken": self.spoken,
+            "failed_speech": self.failed,
+            "spoken_sentences": self.sentences,
+            "speech_queue_ms": round(self.average_queue_ms, 1),
+            "first_audio_ms": round(self.average_first_audio_ms, 1),
+            "synthesis_ms": round(self.average_synthesis_ms, 1),
+            "playback_ms": round(self.average_playback_ms, 1)
+        }
@@ -0,0 +1,147 @@
+"""视觉工作池模块
+将人脸检测、HOG特征提取和人脸裁剪编码放到事件循环之外执行，充分利用多核CPU
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.utils.face_recognition import FaceRecognition
+
+# 工作进程中的人脸识别实例，由进程初始化函数创建
+_process_recognition: Optional[FaceRecognition] = None
+
+
+def _init_process_worker() -> None:
+    """工作进程初始化：每个进程加载一次检测器，并限制OpenCV内部线程数避免过度订阅"""
+    global _process_recognition
+    cv2.setNumThreads(1)
+    _process_recognition = FaceRecognition()
+
+
+def _process_shared_frame(shm_name: str, shape: Tuple[int, ...], dtype: str):
+    """在工作进程中从共享内存读取帧并处理"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        faces, encodings, face_images = _process_recognition.process_frame(frame)
+        del frame
+        return np.asarray(faces), encodings, face_images
+    finally:
+        shm.close()
+
+
+class _SharedFrameSlots:
+    """可复用的共享内存帧缓冲区，避免每帧创建和销毁共享内存"""
+    def __init__(self, count: int):
+        self.count = count
+        self._free: Optional[asyncio.Queue] = None
+        self._slots: List[Optional[shared_memory.SharedMemory]] = [None] * count
+
+    async def acquire(self, nbytes: int) -> Tuple[int, shared_memory.SharedMemory]:
+        if self._free is None:
+            self._free = asyncio.Queue()
+            for index in range(self.count):
+                self._free.put_nowait(index)
+        index = await self._free.get()
+        slot = self._slots[index]
+        if slot is None or slot.size < nbytes:
+            if slot is not None:
+                slot.close()
+                slot.unlink()
+            slot = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._slots[index] = slot
+        return index, slot
+
+    def release(self, index: int) -> None:
+        self._free.put_nowait(index)
+
+    def close(self) -> None:
+        for slot in self._slots:
+            if slot is not None:
+                slot.close()
+                slot.unlink()
+        self._slots = [None] * self.count
+
+
+class FaceWorkerPool:
+    """人脸处理工作池
+
+    mode="thread": 线程池，OpenCV在计算时释放GIL，帧直接在进程内共享，无需拷贝；
+    mode="process": 进程池，帧通过共享内存传递给工作进程，只回传检测结果。
+    """
+    def __init__(self, mode: str = "thread", workers: int = 0):
+        """
+        Args:
+            mode: "thread" 或 "process"
+            workers: 工作线程/进程数，0表示使用CPU核心数
+        """
+        self.logger = logging.getLogger("FaceWorkerPool")
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.pending = 0
+        if mode == "process":
+            if os.name == "posix":
+                # 在创建工作进程前启动资源跟踪进程，使工作进程与主进程共用同一个跟踪进程。
+                # 否则先于共享内存启动的工作进程会各自启动跟踪进程，附加共享内存时登记的缓冲区
+                # 会在工作进程退出时被误删并报告泄漏；共用时重复登记没有影响，由主进程负责释放
+                resource_tracker.ensure_running()
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_process_worker)
+            self._slots = _SharedFrameSlots(self.workers + 1)
+        elif mode == "thread":
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="face-worker")
+            self._local = threading.local()
+        else:
+            raise ValueError(f"未知的工作池模式: {mode}")
+        self.logger.info(f"人脸工作池已创建: 模式={mode}, 工作数={self.workers}")
+
+    def _thread_recognition(self) -> FaceRecognition:
+        """每个工作线程一个检测器实例（级联分类器不是线程安全的）"""
+        recognition = getattr(self._local, "recognition", None)
+        if recognition is None:
+            recognition = FaceRecognition()
+            self._local.recognition = recognition
+        return recognition
+
+    def _process_in_thread(self, frame: np.ndarray):
+        faces, encodings, face_images = self._thread_recognition().process_frame(frame)
+        return np.asarray(faces), encodings, face_images
+
+    async def process_frame(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """异步检测人脸并提取特征
+
+        Args:
+            frame: 输入图像，OpenCV格式（BGR）
+
+        Returns:
+            人脸边界框数组，人脸特征矩阵（每行一个人脸），人脸图像Base64编码列表
+        """
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            if self.mode == "thread":
+                return await loop.run_in_executor(self.executor, self._process_in_thread, frame)
+
+            frame = np.ascontiguousarray(frame)
+            index, slot = await self._slots.acquire(frame.nbytes)
+            try:
+                np.ndarray(frame.shape, dtype=frame.dtype, buffer=slot.buf)[...] = frame
+                return await loop.run_in_executor(
+                    self.executor, _process_shared_frame, slot.name, frame.shape, frame.dtype.str
+                )
+            finally:
+                self._slots.release(index)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        """关闭工作池并释放共享内存"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.mode == "process":
+            self._slots.close()
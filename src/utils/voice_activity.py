@@ -0,0 +1,199 @@
+"""语音活动检测模块
+按帧判断是否有语音，检测到语音开始和结束（带拖尾时间）后立即切出一段话，
+不必等到固定的收听超时或单句时长上限
+"""
+import time
+import logging
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Any, Optional, Union
+from collections import deque
+
+import numpy as np
+
+
+@dataclass
+class Utterance:
+    """切分出的一段话"""
+    audio: bytes                # 16位单声道PCM，包含开头的预留音频和结尾的拖尾
+    sample_rate: int
+    sample_width: int
+    speech_start_time: float    # 判定开始说话的第一个语音帧的采集时间（time.monotonic）
+    speech_end_time: float      # 最后一个语音帧的采集时间（time.monotonic）
+    endpoint_time: float        # 判定语音结束的时间（time.monotonic）
+    truncated: bool = False     # 是否因超过单句时长上限而被截断
+    stream: Any = None          # 流式识别时随说话送入音频的识别会话
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / (self.sample_rate * self.sample_width)
+
+
+class EnergyVAD:
+    """能量加过零率的语音检测
+
+    帧能量（RMS）超过阈值且过零率不高于max_zcr时判为语音，可排除能量较高的宽带噪声；
+    能量超过两倍阈值时不再检查过零率，避免漏掉清辅音较重的语音。
+    """
+    def __init__(self, threshold: Union[float, Callable[[], float]] = 300.0, max_zcr: float = 0.35):
+        """
+        Args:
+            threshold: 能量阈值，或返回当前阈值的函数（例如由采集线程持续校准的阈值）
+            max_zcr: 语音帧的最大过零率（每个采样的过零次数）
+        """
+        self.threshold = threshold
+        self.max_zcr = max_zcr
+
+    def is_speech(self, frame: bytes, sample_rate: int) -> bool:
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        if samples.size == 0:
+            return False
+        threshold = self.threshold() if callable(self.threshold) else self.threshold
+        energy = float(np.sqrt(np.mean(np.square(samples))))
+        if energy < threshold:
+            return False
+        if energy >= threshold * 2:
+            return True
+        zcr = float(np.count_nonzero(np.diff(np.signbit(samples)))) / samples.size
+        return zcr <= self.max_zcr
+
+
+class WebRTCVAD:
+    """基于webrtcvad的语音检测（可选依赖），帧长须为10/20/30毫秒"""
+    def __init__(self, aggressiveness: int = 2):
+        import webrtcvad
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def is_speech(self, frame: bytes, sample_rate: int) -> bool:
+        return self.vad.is_speech(frame, sample_rate)
+
+
+def create_vad(backend: str = "energy", threshold: Union[float, Callable[[], float]] = 300.0,
+               max_zcr: float = 0.35, aggressiveness: int = 2):
+    """按配置创建语音检测器，webrtcvad未安装时回退到能量检测
+
+    Args:
+        backend: "energy" 或 "webrtc"
+        threshold: 能量检测的阈值或阈值函数
+        max_zcr: 能量检测的最大过零率
+        aggressiveness: webrtcvad的激进程度（0-3）
+    """
+    if backend == "webrtc":
+        try:
+            return WebRTCVAD(aggressiveness)
+        except ImportError:
+            logging.getLogger("VoiceActivity").warning("未安装webrtcvad，使用能量加过零率检测")
+    elif backend != "energy":
+        raise ValueError(f"未知的语音检测方式: {backend}")
+    return EnergyVAD(threshold, max_zcr)
+
+
+class SpeechSegmenter:
+    """按帧的语音端点检测
+
+    连续start_ms的语音帧判为开始，开始前pre_roll_ms的音频一并保留；之后连续hangover_ms没有语音即判为结束，
+    立即输出这段话。超过max_seconds时截断输出，避免长时间说话迟迟得不到识别。
+    """
+    def __init__(self, vad, sample_rate: int = 16000, sample_width: int = 2, frame_ms: int = 30,
+                 start_ms: int = 90, hangover_ms: int = 400, pre_roll_ms: int = 300, max_seconds: float = 15.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            vad: 语音检测器，提供 is_speech(frame, sample_rate)
+            sample_rate: 采样率
+            sample_width: 采样字节数
+            frame_ms: 帧长(毫秒)
+            start_ms: 判定语音开始所需的连续语音时长(毫秒)
+            hangover_ms: 判定语音结束所需的连续静音时长(毫秒)
+            pre_roll_ms: 语音开始前保留的音频时长(毫秒)
+            max_seconds: 单句时长上限(秒)
+            clock: 计时函数
+        """
+        self.vad = vad
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.frame_ms = frame_ms
+        self.frame_bytes = sample_rate * frame_ms // 1000 * sample_width
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.max_frames = max(1, int(max_seconds * 1000 // frame_ms))
+        self.clock = clock
+        self._pre_roll: Deque[bytes] = deque(maxlen=max(self.start_frames, pre_roll_ms // frame_ms))
+        self._frames = []
+        self._in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._speech_start_time = 0.0
+        self._speech_end_time = 0.0
+
+        self.utterances = 0
+        self.truncated = 0
+
+    @property
+    def in_speech(self) -> bool:
+        return self._in_speech
+
+    def current_audio(self) -> bytes:
+        """当前这段话已切出的音频（包括预留音频）"""
+        return b"".join(self._frames)
+
+    def process(self, frame: bytes, capture_time: Optional[float] = None) -> Optional[Utterance]:
+        """处理一帧音频
+
+        Args:
+            frame: 一帧PCM音频
+            capture_time: 该帧结束时的采集时间，None表示当前时间
+
+        Returns:
+            检测到一段话结束时返回该段话，否则返回None
+        """
+        capture_time = self.clock() if capture_time is None else capture_time
+        speech = self.vad.is_speech(frame, self.sample_rate)
+
+        if not self._in_speech:
+            self._pre_roll.append(frame)
+            self._voiced_run = self._voiced_run + 1 if speech else 0
+            if self._voiced_run >= self.start_frames:
+                self._in_speech = True
+                self._frames = list(self._pre_roll)
+                self._pre_roll.clear()
+                self._silent_run = 0
+                self._speech_start_time = capture_time - self.start_frames * self.frame_ms / 1000
+                self._speech_end_time = capture_time
+            return None
+
+        self._frames.append(frame)
+        if speech:
+            self._silent_run = 0
+            self._speech_end_time = capture_time
+        else:
+            self._silent_run += 1
+        if self._silent_run >= self.hangover_frames:
+            return self._emit(truncated=False)
+        if len(self._frames) >= self.max_frames:
+            return self._emit(truncated=True)
+        return None
+
+    def flush(self) -> Optional[Utterance]:
+        """音频流结束时输出正在切分的这段话
+
+        Returns:
+            正在说话时返回已切出的这段话，否则返回None
+        """
+        self._pre_roll.clear()
+        self._voiced_run = 0
+        if not self._in_speech:
+            return None
+        return self._emit(truncated=False)
+
+    def _emit(self, truncated: bool) -> Utterance:
+        utterance = Utterance(b"".join(self._frames), self.sample_rate, self.sample_width,
+                              self._speech_start_time, self._speech_end_time, self.clock(), truncated)
+        self._frames = []
+        self._in_speech = False
+        self._voiced_run = 0
+        self.utterances += 1
+        self.truncated += int(truncated)
+        return utterance
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"utterances": self.utterances, "truncated_utterances": self.truncated}
@@ -7,6 +7,8 @@ import asyncio
 import json
 import os
 
+from config import SPEECH_RECOGNITION
+
 app = FastAPI()
 
 # 获取当前文件所在目录的绝对路径
@@ -48,23 +50,42 @@ async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     websocket_connections.add(websocket)
     print(f"WebSocket连接已建立，当前连接数: {len(websocket_connections)}")
+    # 浏览器麦克风音频以二进制帧（16位单声道PCM）推送给听觉智能体，每个连接一路输入
+    client_id = f"web-{id(websocket)}"
     
     try:
-        # 发送初始状态消息
+        # 发送初始状态消息，告知浏览器麦克风音频的采样率
         await websocket.send_text(json.dumps({
             "type": "status",
-            "content": "connected"
+            "content": "connected",
+            "audio_sample_rate": SPEECH_RECOGNITION['sample_rate']
         }))
         
         # 保持连接活跃
         while True:
             try:
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                data = await websocket.receive()
+                if data["type"] == "websocket.disconnect":
+                    break
+                
+                # 处理麦克风音频：只入队不等待，不会拖慢其他连接和视觉画面的广播
+                if data.get("bytes") is not None:
+                    from src.agents.ear_agent import ear_instance
+                    if ear_instance:
+                        ear_instance.push_remote_audio(client_id, data["bytes"])
+                    continue
+                
+                message = json.loads(data["text"])
                 print(f"收到客户端消息: {message}")
                 
+                # 浏览器停止录音
+                if message.get('type') == 'audio_stop':
+                    from src.agents.ear_agent import ear_instance
+                    if ear_instance:
+                        ear_instance.close_remote_input(client_id)
+                
                 # 处理文本消息
-                if message.get('type') == 'text':
+                elif message.get('type') == 'text':
                     # 转发消息给大脑智能体
                     try:
                         from src.brain.brain_agent import brain_instance
@@ -112,6 +133,9 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         print(f"WebSocket错误: {e}")
     finally:
+        from src.agents.ear_agent import ear_instance
+        if ear_instance:
+            ear_instance.close_remote_input(client_id)
         if websocket in websocket_connections:
             websocket_connections.remove(websocket)
         print(f"WebSocket连接已关闭，剩余连接数: {len(websocket_connections)}")